@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger("backend.benchmark")
+
+# Run with e.g.
+#   python -m backend.benchmark --reset --executions-per-version 200 --output bench.json
+#   python -m backend.benchmark --reset --compare bench.json
+# --reset deletes every prompt and execution in the target database; on anything but SQLite it
+# also needs --force-reset.
+# Settings are read at import time, so the backend is imported only after the environment
+# (database URL, fake provider) has been configured from the command line.
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    concurrency: int
+    elapsed_seconds: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    status_codes: dict[str, int]
+    rss_delta_kb: int
+    peak_traced_kb: int | None = None
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[["SeedData", random.Random], str]
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SeedData:
+    prompt_ids: list[uuid.UUID]
+    version_ids: list[uuid.UUID]
+
+
+SCENARIOS = [
+    Scenario(
+        "execute",
+        "POST",
+        lambda seed, rng: f"/execute/{rng.choice(seed.version_ids)}",
+        {"bypass_cache": "true"},
+    ),
+    Scenario("list_executions", "GET", lambda seed, rng: "/executions", {"limit": 100}),
+    Scenario("list_evaluations", "GET", lambda seed, rng: "/evaluations", {"limit": 100}),
+    Scenario("prompt_versions", "GET", lambda seed, rng: f"/prompts/{rng.choice(seed.prompt_ids)}/versions"),
+    Scenario(
+        "version_stats",
+        "GET",
+        lambda seed, rng: f"/prompts/{rng.choice(seed.prompt_ids)}/versions/stats",
+    ),
+]
+
+
+def _configure_environment(args: argparse.Namespace) -> None:
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ.setdefault("FAKE_LLM_LATENCY_MEDIAN_MS", str(args.llm_latency_ms))
+    # The benchmark measures the service, not the client-side quota.
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+    os.environ.setdefault("JOB_WORKERS_ENABLED", "false")
+
+
+def _import_backend() -> dict[str, Any]:
+    try:
+        from backend import database, main, models
+        from backend.services.evaluation_service import EvaluationService
+        from backend.services.stats_service import stats_service
+    except ModuleNotFoundError as exc:
+        if exc.name != "backend":
+            raise
+        import database
+        import main
+        import models
+        from services.evaluation_service import EvaluationService
+        from services.stats_service import stats_service
+    return {
+        "database": database,
+        "app": main.app,
+        "models": models,
+        "stats_service": stats_service,
+        "overall_score": EvaluationService._overall,
+    }
+
+
+def _reset_sqlite(database_url: str) -> None:
+    prefix = "sqlite:///"
+    if database_url.startswith(prefix):
+        path = Path(database_url[len(prefix):])
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+async def seed(backend: dict[str, Any], args: argparse.Namespace, rng: random.Random) -> SeedData:
+    from sqlalchemy import delete, insert
+
+    database, models, overall_score = backend["database"], backend["models"], backend["overall_score"]
+    await database.init_db()
+
+    prompt_rows, version_rows, execution_rows, evaluation_rows = [], [], [], []
+    now = datetime.now(timezone.utc)
+    for prompt_index in range(args.prompts):
+        prompt_id = uuid.uuid4()
+        prompt_rows.append({"id": prompt_id, "name": f"benchmark-{prompt_index}", "created_at": now})
+        for version_number in range(1, args.versions_per_prompt + 1):
+            version_id = uuid.uuid4()
+            version_rows.append(
+                {
+                    "id": version_id,
+                    "prompt_id": prompt_id,
+                    "version_number": version_number,
+                    "content": f"Benchmark prompt {prompt_index} version {version_number}.",
+                    "created_at": now,
+                }
+            )
+            for _ in range(args.executions_per_version):
+                execution_id = uuid.uuid4()
+                created_at = now - timedelta(seconds=rng.uniform(0, 30 * 86400))
+                execution_rows.append(
+                    {
+                        "id": execution_id,
+                        "prompt_version_id": version_id,
+                        "response_text": " ".join(["lorem"] * rng.randint(50, 400)),
+                        "response_time": rng.lognormvariate(0.0, 0.5),
+                        "created_at": created_at,
+                    }
+                )
+                accuracy, clarity, hallucination = rng.uniform(50, 100), rng.uniform(50, 100), rng.uniform(0, 50)
+                evaluation_rows.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "execution_id": execution_id,
+                        "accuracy_score": accuracy,
+                        "clarity_score": clarity,
+                        "hallucination_score": hallucination,
+                        "overall_score": overall_score(accuracy, clarity, hallucination),
+                        "created_at": created_at,
+                    }
+                )
+
+    async with database.AsyncSessionLocal() as db:
+        if args.reset:
+            for model in (models.Evaluation, models.Execution, models.PromptVersion, models.Prompt):
+                await db.execute(delete(model))
+        for model, rows in (
+            (models.Prompt, prompt_rows),
+            (models.PromptVersion, version_rows),
+            (models.Execution, execution_rows),
+            (models.Evaluation, evaluation_rows),
+        ):
+            for start in range(0, len(rows), args.seed_batch_size):
+                await db.execute(insert(model), rows[start : start + args.seed_batch_size])
+        await backend["stats_service"].rebuild(db)
+        await db.commit()
+
+    logger.info(
+        "Seeded %s prompts, %s versions, %s executions",
+        len(prompt_rows),
+        len(version_rows),
+        len(execution_rows),
+    )
+    return SeedData(
+        prompt_ids=[row["id"] for row in prompt_rows],
+        version_ids=[row["id"] for row in version_rows],
+    )
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: Any, scenario: Scenario, seed_data: SeedData, args: argparse.Namespace, rng: random.Random
+) -> ScenarioResult:
+    latencies: list[float] = []
+    status_codes: dict[str, int] = {}
+    errors: list[str] = []
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(scenario.path(seed_data, rng))
+
+    async def worker() -> None:
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, path, params=scenario.params)
+                key = str(response.status_code)
+            except Exception as exc:
+                key = "error"
+                if len(errors) < 10:
+                    errors.append(str(exc))
+            latencies.append(time.perf_counter() - started)
+            status_codes[key] = status_codes.get(key, 0) + 1
+
+    if args.trace_memory:
+        tracemalloc.reset_peak()
+    rss_before = _rss_kb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return ScenarioResult(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        elapsed_seconds=round(elapsed, 4),
+        throughput_rps=round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        p50_ms=round(_percentile(latencies, 0.50) * 1000, 3),
+        p95_ms=round(_percentile(latencies, 0.95) * 1000, 3),
+        p99_ms=round(_percentile(latencies, 0.99) * 1000, 3),
+        max_ms=round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        status_codes=status_codes,
+        rss_delta_kb=_rss_kb() - rss_before,
+        peak_traced_kb=tracemalloc.get_traced_memory()[1] // 1024 if args.trace_memory else None,
+        errors=errors,
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def drive(backend: dict[str, Any], seed_data: SeedData, args: argparse.Namespace, rng: random.Random) -> dict:
+    import httpx
+
+    app = backend["app"]
+    server_task: asyncio.Task | None = None
+    if args.mode == "uvicorn":
+        import uvicorn
+
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60)
+    else:
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    selected = [scenario for scenario in SCENARIOS if not args.scenarios or scenario.name in args.scenarios]
+    results: dict[str, dict] = {}
+    try:
+        for scenario in selected:
+            for _ in range(args.warmup):
+                await client.request(scenario.method, scenario.path(seed_data, rng), params=scenario.params)
+            result = await run_scenario(client, scenario, seed_data, args, rng)
+            results[scenario.name] = asdict(result)
+            logger.info(
+                "%-18s %8.1f req/s  p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  %s",
+                scenario.name,
+                result.throughput_rps,
+                result.p50_ms,
+                result.p95_ms,
+                result.p99_ms,
+                result.status_codes,
+            )
+    finally:
+        await client.aclose()
+        if server_task is not None:
+            server.should_exit = True
+            await server_task
+        else:
+            await app.router.shutdown()
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = previous[metric], result[metric]
+            change = (after - before) / before if before else 0.0
+            logger.info("%-18s %-7s %9.2f -> %9.2f (%+.1f%%)", name, metric, before, after, change * 100)
+            if change > max_regression:
+                regressions.append(f"{name} {metric} regressed {change:+.1%} ({before:.2f} -> {after:.2f} ms)")
+        before, after = previous["throughput_rps"], result["throughput_rps"]
+        if before and (before - after) / before > max_regression:
+            regressions.append(f"{name} throughput dropped from {before:.1f} to {after:.1f} req/s")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    backend = _import_backend()
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        seed_data = await seed(backend, args, rng)
+        results = await drive(backend, seed_data, args, rng)
+    finally:
+        await backend["database"].engine.dispose()
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": args.database_url.split("://", 1)[0],
+            "mode": args.mode,
+            "prompts": args.prompts,
+            "versions_per_prompt": args.versions_per_prompt,
+            "executions_per_version": args.executions_per_version,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmark")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--reset", action="store_true", help="Delete all prompts and executions before seeding.")
+    parser.add_argument("--force-reset", action="store_true", help="Allow --reset on a non-SQLite database.")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--prompts", type=int, default=10)
+    parser.add_argument("--versions-per-prompt", type=int, default=5)
+    parser.add_argument("--executions-per-version", type=int, default=100)
+    parser.add_argument("--seed-batch-size", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="*", choices=[scenario.name for scenario in SCENARIOS])
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="Baseline JSON from an earlier run.")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.reset and not args.database_url.startswith("sqlite") and not args.force_reset:
+        parser.error("--reset on a non-SQLite database deletes its data; add --force-reset to confirm")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    _configure_environment(args)
+    if args.reset:
+        _reset_sqlite(args.database_url)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        logger.info("Wrote %s", args.output)
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.max_regression)
+        for regression in regressions:
+            logger.error("REGRESSION: %s", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,25 @@
+import os
 from functools import lru_cache
-from typing import Optional
+from pathlib import Path
+from typing import Literal, Optional
 
-from dotenv import load_dotenv
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-load_dotenv()
-load_dotenv(".env")
-load_dotenv(".env.local")
-load_dotenv("../.env")
-load_dotenv("../.env.local")
+_BACKEND_DIR = Path(__file__).resolve().parent
+
+# Read once by pydantic-settings; later files take precedence and real environment variables win
+# over all of them. The anchored paths keep working whichever directory the app is started from.
+_ENV_FILES = tuple(
+    str(directory / name)
+    for directory in (_BACKEND_DIR.parent, _BACKEND_DIR)
+    for name in (".env", ".env.local")
+) + (".env", ".env.local")
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
-        env_file=(".env", ".env.local", "../.env", "../.env.local"),
+        env_file=_ENV_FILES,
         env_file_encoding="utf-8",
         extra="ignore",
     )
@@ -24,15 +29,133 @@ class Settings(BaseSettings):
     api_prefix: str = Field(default="", alias="API_PREFIX")
 
     database_url: str = Field(default="sqlite:///./llmops.db", alias="DATABASE_URL")
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_recycle_seconds: int = Field(default=1800, alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_timeout_seconds: float = Field(default=30.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    # Total connections all serving workers may open. When set, each worker's pool is sized from
+    # its share of the budget instead of DB_POOL_SIZE/DB_MAX_OVERFLOW.
+    db_connection_budget: int = Field(default=0, alias="DB_CONNECTION_BUDGET")
+    # Off by default so serving processes never run DDL; use `python -m backend.manage init-db`.
+    db_create_schema_on_startup: bool = Field(default=False, alias="DB_CREATE_SCHEMA_ON_STARTUP")
 
     gemini_api_key: str = Field(default="", alias="GEMINI_API_KEY")
     gemini_model_name: str = Field(default="gemini-2.5-pro", alias="GEMINI_MODEL_NAME")
+    gemini_api_base_url: str = Field(
+        default="https://generativelanguage.googleapis.com/v1beta", alias="GEMINI_API_BASE_URL"
+    )
 
+    llm_provider: Literal["gemini", "fake"] = Field(default="gemini", alias="LLM_PROVIDER")
+    fake_llm_model_name: str = Field(default="fake-llm", alias="FAKE_LLM_MODEL_NAME")
+    fake_llm_latency_median_ms: float = Field(default=200.0, alias="FAKE_LLM_LATENCY_MEDIAN_MS")
+    fake_llm_latency_sigma: float = Field(default=0.5, alias="FAKE_LLM_LATENCY_SIGMA")
+    fake_llm_error_rate: float = Field(default=0.0, alias="FAKE_LLM_ERROR_RATE")
+    fake_llm_rate_limit_rate: float = Field(default=0.0, alias="FAKE_LLM_RATE_LIMIT_RATE")
+    fake_llm_output_words: int = Field(default=120, alias="FAKE_LLM_OUTPUT_WORDS")
+    fake_llm_stream_chunks: int = Field(default=8, alias="FAKE_LLM_STREAM_CHUNKS")
+    fake_llm_seed: int = Field(default=0, alias="FAKE_LLM_SEED")
     llm_timeout_seconds: float = Field(default=60.0, alias="LLM_TIMEOUT_SECONDS")
+    # Streams get LLM_TIMEOUT_SECONDS for the first chunk and this long between later ones.
+    llm_stream_idle_timeout_seconds: float = Field(default=30.0, alias="LLM_STREAM_IDLE_TIMEOUT_SECONDS")
     llm_max_retries: int = Field(default=2, alias="LLM_MAX_RETRIES")
+    llm_max_concurrency: int = Field(default=64, alias="LLM_MAX_CONCURRENCY")
+    llm_max_connections: int = Field(default=100, alias="LLM_MAX_CONNECTIONS")
+    llm_max_keepalive_connections: int = Field(default=20, alias="LLM_MAX_KEEPALIVE_CONNECTIONS")
+    llm_keepalive_expiry_seconds: float = Field(default=30.0, alias="LLM_KEEPALIVE_EXPIRY_SECONDS")
+    # Concurrent identical requests share one in-flight call. "linked" records one execution per
+    # request (followers point at the leader); "shared" hands every caller the leader's execution.
+    coalesce_enabled: bool = Field(default=True, alias="COALESCE_ENABLED")
+    coalesce_mode: Literal["linked", "shared"] = Field(default="linked", alias="COALESCE_MODE")
+    llm_requests_per_minute: int = Field(default=1000, alias="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(default=1_000_000, alias="LLM_TOKENS_PER_MINUTE")
+    llm_estimated_output_tokens: int = Field(default=512, alias="LLM_ESTIMATED_OUTPUT_TOKENS")
+    llm_backoff_base_seconds: float = Field(default=0.5, alias="LLM_BACKOFF_BASE_SECONDS")
+    llm_backoff_max_seconds: float = Field(default=8.0, alias="LLM_BACKOFF_MAX_SECONDS")
+    llm_circuit_failure_threshold: int = Field(default=5, alias="LLM_CIRCUIT_FAILURE_THRESHOLD")
+    llm_circuit_reset_seconds: float = Field(default=30.0, alias="LLM_CIRCUIT_RESET_SECONDS")
+
+    llm_cache_enabled: bool = Field(default=False, alias="LLM_CACHE_ENABLED")
+    llm_cache_max_entries: int = Field(default=10_000, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_ttl_seconds: float = Field(default=3600.0, alias="LLM_CACHE_TTL_SECONDS")
+    llm_cache_persistent: bool = Field(default=False, alias="LLM_CACHE_PERSISTENT")
+
+    evaluation_cache_enabled: bool = Field(default=True, alias="EVALUATION_CACHE_ENABLED")
+    evaluation_cache_max_entries: int = Field(default=50_000, alias="EVALUATION_CACHE_MAX_ENTRIES")
+    evaluation_cache_warm_limit: int = Field(default=10_000, alias="EVALUATION_CACHE_WARM_LIMIT")
+    # Applies to the shared tier only; the in-process cache is bounded by its size.
+    evaluation_cache_shared_ttl_seconds: float = Field(default=604_800.0, alias="EVALUATION_CACHE_SHARED_TTL_SECONDS")
+    evaluation_batch_size: int = Field(default=8, alias="EVALUATION_BATCH_SIZE")
+    evaluation_batch_max_chars: int = Field(default=24_000, alias="EVALUATION_BATCH_MAX_CHARS")
+
+    batch_max_items: int = Field(default=1000, alias="BATCH_MAX_ITEMS")
+    batch_max_concurrency: int = Field(default=8, alias="BATCH_MAX_CONCURRENCY")
+
+    export_batch_size: int = Field(default=1000, alias="EXPORT_BATCH_SIZE")
+
+    response_blobs_enabled: bool = Field(default=True, alias="RESPONSE_BLOBS_ENABLED")
+    response_compression: Literal["zlib", "zstd", "none"] = Field(default="zlib", alias="RESPONSE_COMPRESSION")
+    response_compression_level: int = Field(default=6, alias="RESPONSE_COMPRESSION_LEVEL")
+    response_compression_min_bytes: int = Field(default=256, alias="RESPONSE_COMPRESSION_MIN_BYTES")
+    response_blob_migration_batch_size: int = Field(default=1000, alias="RESPONSE_BLOB_MIGRATION_BATCH_SIZE")
+
+    # Retention is off while the day counts are 0; run it with `python -m backend.manage apply-retention`.
+    retention_response_days: int = Field(default=0, alias="RETENTION_RESPONSE_DAYS")
+    retention_archive_days: int = Field(default=0, alias="RETENTION_ARCHIVE_DAYS")
+    retention_archive_dir: str = Field(default="./archive", alias="RETENTION_ARCHIVE_DIR")
+    retention_batch_size: int = Field(default=1000, alias="RETENTION_BATCH_SIZE")
+    retention_batch_pause_seconds: float = Field(default=0.1, alias="RETENTION_BATCH_PAUSE_SECONDS")
+
+    experiment_alpha: float = Field(default=0.05, alias="EXPERIMENT_ALPHA")
+    experiment_effect_size: float = Field(default=0.5, alias="EXPERIMENT_EFFECT_SIZE")
+    experiment_min_pairs: int = Field(default=20, alias="EXPERIMENT_MIN_PAIRS")
+    experiment_max_pairs: int = Field(default=200, alias="EXPERIMENT_MAX_PAIRS")
+    experiment_max_concurrency: int = Field(default=8, alias="EXPERIMENT_MAX_CONCURRENCY")
+
+    prompt_cache_enabled: bool = Field(default=True, alias="PROMPT_CACHE_ENABLED")
+    prompt_cache_max_entries: int = Field(default=10_000, alias="PROMPT_CACHE_MAX_ENTRIES")
+    prompt_cache_ttl_seconds: float = Field(default=300.0, alias="PROMPT_CACHE_TTL_SECONDS")
+
+    prompt_import_batch_size: int = Field(default=1000, alias="PROMPT_IMPORT_BATCH_SIZE")
+    prompt_import_max_errors: int = Field(default=100, alias="PROMPT_IMPORT_MAX_ERRORS")
+
+    template_cache_max_entries: int = Field(default=1000, alias="TEMPLATE_CACHE_MAX_ENTRIES")
+    dataset_max_rows: int = Field(default=1_000_000, alias="DATASET_MAX_ROWS")
+    dataset_insert_batch_size: int = Field(default=1000, alias="DATASET_INSERT_BATCH_SIZE")
+    dataset_run_max_concurrency: int = Field(default=32, alias="DATASET_RUN_MAX_CONCURRENCY")
+    dataset_run_page_size: int = Field(default=500, alias="DATASET_RUN_PAGE_SIZE")
+    dataset_run_progress_interval_seconds: float = Field(default=2.0, alias="DATASET_RUN_PROGRESS_INTERVAL_SECONDS")
+
+    pipeline_generation_workers: int = Field(default=16, alias="PIPELINE_GENERATION_WORKERS")
+    pipeline_evaluation_workers: int = Field(default=16, alias="PIPELINE_EVALUATION_WORKERS")
+    pipeline_queue_size: int = Field(default=256, alias="PIPELINE_QUEUE_SIZE")
+    pipeline_write_batch_size: int = Field(default=100, alias="PIPELINE_WRITE_BATCH_SIZE")
+
+    job_workers_enabled: bool = Field(default=True, alias="JOB_WORKERS_ENABLED")
+    job_worker_concurrency: int = Field(default=4, alias="JOB_WORKER_CONCURRENCY")
+    job_poll_interval_seconds: float = Field(default=1.0, alias="JOB_POLL_INTERVAL_SECONDS")
+    # A running job's worker renews its lease every third of this; jobs whose lease lapses are
+    # requeued, or failed once they have been attempted job_max_attempts times.
+    job_lease_seconds: float = Field(default=60.0, alias="JOB_LEASE_SECONDS")
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    job_max_wait_seconds: float = Field(default=60.0, alias="JOB_MAX_WAIT_SECONDS")
+
+    # `python -m backend.serve` runs this many uvicorn worker processes; 0 means one per CPU.
+    serve_workers: int = Field(default=1, alias="SERVE_WORKERS")
+    serve_host: str = Field(default="0.0.0.0", alias="SERVE_HOST")
+    serve_port: int = Field(default=8000, alias="SERVE_PORT")
+    # SQLite file shared by the workers on one host for generation/evaluation caches and worker
+    # heartbeats; empty keeps every cache private to its process.
+    shared_cache_path: str = Field(default="", alias="SHARED_CACHE_PATH")
+    # Per namespace; the oldest entries are dropped beyond it.
+    shared_cache_max_entries: int = Field(default=100_000, alias="SHARED_CACHE_MAX_ENTRIES")
+    worker_heartbeat_interval_seconds: float = Field(default=5.0, alias="WORKER_HEARTBEAT_INTERVAL_SECONDS")
 
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
 
+    @property
+    def serve_worker_count(self) -> int:
+        return self.serve_workers if self.serve_workers > 0 else os.cpu_count() or 1
+
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
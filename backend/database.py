@@ -1,28 +1,144 @@
-from collections.abc import Generator
+import logging
+from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy import Connection, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 try:
     from backend.config import settings
+    from backend.services.metrics_service import DB_POOL_CHECKOUTS, DB_POOL_CONNECTIONS, DB_POOL_STATE, metrics
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
     from config import settings
+    from services.metrics_service import DB_POOL_CHECKOUTS, DB_POOL_CONNECTIONS, DB_POOL_STATE, metrics
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-)
+logger = logging.getLogger(__name__)
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+psycopg",
+    "postgresql": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+}
+
+
+def async_database_url(url: str) -> str:
+    scheme, separator, rest = url.partition("://")
+    if not separator:
+        return url
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def pool_share(budget: int, workers: int) -> tuple[int, int]:
+    # Splits a worker's share of the connection budget into a steady pool and burst overflow, so
+    # pool_size + max_overflow across all workers never exceeds the budget.
+    per_worker = max(1, budget // max(1, workers))
+    pool_size = max(1, per_worker // 2)
+    return pool_size, per_worker - pool_size
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": True}
+    # aiosqlite uses a NullPool/StaticPool, which take no sizing arguments.
+    if url.startswith("sqlite"):
+        return options
+    pool_size, max_overflow = settings.db_pool_size, settings.db_max_overflow
+    if settings.db_connection_budget > 0:
+        pool_size, max_overflow = pool_share(settings.db_connection_budget, settings.serve_worker_count)
+        if settings.db_connection_budget < settings.serve_worker_count:
+            logger.warning("DB_CONNECTION_BUDGET is below one connection per worker; the budget will be exceeded")
+        logger.info(
+            "DB pool per worker: size=%s, overflow=%s (budget %s across %s workers)",
+            pool_size,
+            max_overflow,
+            settings.db_connection_budget,
+            settings.serve_worker_count,
+        )
+    options.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=settings.db_pool_timeout_seconds,
+    )
+    return options
+
+
+_database_url = async_database_url(settings.database_url)
+
+engine = create_async_engine(_database_url, **_engine_options(_database_url))
+
+event.listen(engine.sync_engine, "checkout", lambda *args: DB_POOL_CHECKOUTS.inc())
+event.listen(engine.sync_engine, "connect", lambda *args: DB_POOL_CONNECTIONS.inc())
+
+
+def pool_status() -> dict[str, int] | None:
+    pool = engine.sync_engine.pool
+    # NullPool (SQLite) keeps no connections, so it has no size or overflow to report.
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "size": pool.size(),
+    }
+
+
+def _collect_pool_state() -> None:
+    for state, value in (pool_status() or {}).items():
+        DB_POOL_STATE.set(value, state=state)
+
+
+metrics.register_collector(_collect_pool_state)
+
+AsyncSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def init_db() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_schema)
+
+
+# create_all only creates missing tables; columns and indexes added to existing
+# tables are applied here. Only nullable columns can be added this way.
+def _upgrade_schema(conn: Connection) -> None:
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable:
+                logger.warning("Cannot add non-nullable column %s.%s automatically", table.name, column.name)
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            logger.info("Added column %s.%s", table.name, column.name)
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(conn, checkfirst=True)
+                logger.info("Created index %s", index.name)
+
+        # SQLite stores datetimes as text. Rows written by CURRENT_TIMESTAMP lack the fractional
+        # seconds SQLAlchemy writes, which breaks ordering and equality in keyset pagination.
+        if conn.dialect.name == "sqlite" and "created_at" in table.columns:
+            conn.execute(
+                text(
+                    f"UPDATE {table.name} SET created_at = created_at || '.000000' "
+                    "WHERE length(created_at) = 19"
+                )
+            )
@@ -1,4 +1,10 @@
+import asyncio
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from time import perf_counter
+
+_import_started = perf_counter()
 
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
@@ -7,18 +13,38 @@ from fastapi.responses import JSONResponse
 
 try:
     from backend.config import settings
-    from backend.database import Base, engine
+    from backend.database import engine, init_db
+    from backend.routers.dataset_router import router as dataset_router
     from backend.routers.execution_router import router as execution_router
+    from backend.routers.experiment_router import router as experiment_router
+    from backend.routers.job_router import router as job_router
     from backend.routers.prompt_router import router as prompt_router
-    from backend.schemas import HealthResponse
+    from backend.routers.system_router import router as system_router
+    from backend.schemas import HealthResponse, ListWorkerHealthResponse, WorkerHealthResponse
+    from backend.services.evaluation_service import evaluation_service
+    from backend.services.health_service import worker_health
+    from backend.services.job_service import job_worker
+    from backend.services.llm_service import llm_service
+    from backend.services.metrics_service import STARTUP_PHASE_SECONDS, MetricsMiddleware
+    from backend.services.pipeline_service import execution_pipeline
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
     from config import settings
-    from database import Base, engine
+    from database import engine, init_db
+    from routers.dataset_router import router as dataset_router
     from routers.execution_router import router as execution_router
+    from routers.experiment_router import router as experiment_router
+    from routers.job_router import router as job_router
     from routers.prompt_router import router as prompt_router
-    from schemas import HealthResponse
+    from routers.system_router import router as system_router
+    from schemas import HealthResponse, ListWorkerHealthResponse, WorkerHealthResponse
+    from services.evaluation_service import evaluation_service
+    from services.health_service import worker_health
+    from services.job_service import job_worker
+    from services.llm_service import llm_service
+    from services.metrics_service import STARTUP_PHASE_SECONDS, MetricsMiddleware
+    from services.pipeline_service import execution_pipeline
 
 
 logging.basicConfig(
@@ -28,6 +54,9 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title=settings.app_name)
 
+startup_phases: dict[str, float] = {"import": perf_counter() - _import_started}
+_background_tasks: set[asyncio.Task] = set()
+
 # ✅ Proper CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -38,11 +67,62 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+async def _warm_evaluation_cache() -> None:
+    started = perf_counter()
+    try:
+        warmed = await evaluation_service.warm_cache()
+    except Exception as exc:
+        logger.warning("Evaluation cache warm-up failed: %s", exc)
+        return
+    elapsed = perf_counter() - started
+    STARTUP_PHASE_SECONDS.set(elapsed, phase="evaluation_cache_warm")
+    logger.info("Warmed evaluation cache with %s entries in %.3fs", warmed, elapsed)
+
+
+@contextmanager
+def _startup_phase(name: str) -> Iterator[None]:
+    started = perf_counter()
+    yield
+    startup_phases[name] = perf_counter() - started
 
 
 @app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
+async def on_startup() -> None:
+    if settings.db_create_schema_on_startup:
+        with _startup_phase("schema"):
+            await init_db()
+    # The cache fills while the app already serves; until then evaluations just miss it.
+    task = asyncio.create_task(_warm_evaluation_cache())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    with _startup_phase("pipeline"):
+        await execution_pipeline.start()
+    if settings.job_workers_enabled:
+        with _startup_phase("job_worker"):
+            await job_worker.start()
+    worker_health.start()
+
+    for name, seconds in startup_phases.items():
+        STARTUP_PHASE_SECONDS.set(seconds, phase=name)
+    logger.info(
+        "Startup finished in %.3fs (%s)",
+        sum(startup_phases.values()),
+        ", ".join(f"{name}={seconds:.3f}s" for name, seconds in startup_phases.items()),
+    )
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    for task in list(_background_tasks):
+        task.cancel()
+    await worker_health.stop()
+    await job_worker.stop()
+    await execution_pipeline.stop()
+    await llm_service.aclose()
+    await engine.dispose()
 
 
 @app.exception_handler(RequestValidationError)
@@ -71,6 +151,10 @@ async def unhandled_exception_handler(
 
 app.include_router(prompt_router, prefix=settings.api_prefix)
 app.include_router(execution_router, prefix=settings.api_prefix)
+app.include_router(job_router, prefix=settings.api_prefix)
+app.include_router(dataset_router, prefix=settings.api_prefix)
+app.include_router(experiment_router, prefix=settings.api_prefix)
+app.include_router(system_router, prefix=settings.api_prefix)
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -79,4 +163,17 @@ async def health() -> HealthResponse:
         status="ok",
         app=settings.app_name,
         environment=settings.environment,
-    )
\ No newline at end of file
+    )
+
+
+@app.get("/health/worker", response_model=WorkerHealthResponse)
+async def worker_health_check() -> WorkerHealthResponse:
+    # Reports on whichever worker process answered the request.
+    return WorkerHealthResponse(**worker_health.snapshot())
+
+
+@app.get("/health/workers", response_model=ListWorkerHealthResponse)
+async def list_worker_health() -> ListWorkerHealthResponse:
+    return ListWorkerHealthResponse(
+        workers=[WorkerHealthResponse(**worker) for worker in await worker_health.list_workers()]
+    )
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import logging
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal, engine, init_db
+    from backend.services.blob_service import blob_service
+    from backend.services.retention_service import retention_service
+    from backend.services.stats_service import stats_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal, engine, init_db
+    from services.blob_service import blob_service
+    from services.retention_service import retention_service
+    from services.stats_service import stats_service
+
+logger = logging.getLogger("backend.manage")
+
+
+async def init_schema(args: argparse.Namespace) -> None:
+    # The schema itself is created or upgraded by init_db before every command runs.
+    logger.info("Database schema is up to date")
+
+
+async def rebuild_stats(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        processed = await stats_service.rebuild(db)
+        await db.commit()
+    logger.info("Rebuilt version stats from %s executions", processed)
+
+
+async def migrate_response_blobs(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        migrated = await blob_service.migrate_inline(db, settings.response_blob_migration_batch_size)
+    logger.info("Migrated %s inline responses to compressed blobs", migrated)
+    if migrated and engine.dialect.name == "sqlite":
+        logger.info("Run VACUUM on the SQLite database to return the freed space to the filesystem")
+
+
+async def apply_retention(args: argparse.Namespace) -> None:
+    if settings.retention_archive_days <= 0 and settings.retention_response_days <= 0:
+        logger.info("No retention policy configured; set RETENTION_ARCHIVE_DAYS and/or RETENTION_RESPONSE_DAYS")
+        return
+    async with AsyncSessionLocal() as db:
+        summary = await retention_service.apply(db)
+    logger.info(
+        "Archived %s executions, pruned %s responses, deleted %s response blobs",
+        summary.archived_executions,
+        summary.pruned_responses,
+        summary.deleted_blobs,
+    )
+    for path in summary.archive_files:
+        logger.info("Archive written to %s", path)
+
+
+COMMANDS = {
+    "init-db": (init_schema, "Create missing tables, columns and indexes; run before starting the API."),
+    "rebuild-stats": (rebuild_stats, "Recompute per-version score and latency statistics from history."),
+    "migrate-response-blobs": (
+        migrate_response_blobs,
+        "Move inline execution response text into compressed, deduplicated blob storage.",
+    ),
+    "apply-retention": (
+        apply_retention,
+        "Archive and delete old executions and drop old response text in bounded batches.",
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run() -> None:
+        try:
+            await init_db()
+            await COMMANDS[args.command][0](args)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,11 +24,18 @@ except ModuleNotFoundError:
     from database import Base
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Prompt(Base):
     __tablename__ = "prompts"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    # Highest version number handed out; NULL until the first allocation, which seeds it from
+    # max(version_number). See prompt_service.allocate_version_numbers.
+    version_counter: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     versions: Mapped[list["PromptVersion"]] = relationship(
@@ -29,7 +48,10 @@ class Prompt(Base):
 
 class PromptVersion(Base):
     __tablename__ = "prompt_versions"
-    __table_args__ = (UniqueConstraint("prompt_id", "version_number", name="uq_prompt_version_number"),)
+    __table_args__ = (
+        UniqueConstraint("prompt_id", "version_number", name="uq_prompt_version_number"),
+        Index("ix_prompt_versions_prompt_content_hash", "prompt_id", "content_hash"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     prompt_id: Mapped[uuid.UUID] = mapped_column(
@@ -40,6 +62,7 @@ class PromptVersion(Base):
     )
     version_number: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     prompt: Mapped["Prompt"] = relationship(back_populates="versions")
@@ -52,6 +75,10 @@ class PromptVersion(Base):
 
 class Execution(Base):
     __tablename__ = "executions"
+    __table_args__ = (
+        Index("ix_executions_created_at_id", "created_at", "id"),
+        Index("ix_executions_version_created_at_id", "prompt_version_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     prompt_version_id: Mapped[uuid.UUID] = mapped_column(
@@ -60,9 +87,29 @@ class Execution(Base):
         nullable=False,
         index=True,
     )
+    # Empty when the body lives in response_blobs (response_hash is set); rows written before
+    # blob storage, or with it disabled, keep the text inline.
     response_text: Mapped[str] = mapped_column(Text, nullable=False)
+    response_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), ForeignKey("response_blobs.hash"), nullable=True, index=True
+    )
     response_time: Mapped[float] = mapped_column(Float, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    time_to_first_token: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    coalesced_from_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("executions.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    dataset_run_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("dataset_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    dataset_row_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("dataset_rows.id", ondelete="SET NULL"), nullable=True
+    )
+    experiment_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("experiments.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
 
     prompt_version: Mapped["PromptVersion"] = relationship(back_populates="executions")
     evaluation: Mapped[Optional["Evaluation"]] = relationship(
@@ -75,6 +122,7 @@ class Execution(Base):
 
 class Evaluation(Base):
     __tablename__ = "evaluations"
+    __table_args__ = (Index("ix_evaluations_created_at_id", "created_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     execution_id: Mapped[uuid.UUID] = mapped_column(
@@ -88,6 +136,175 @@ class Evaluation(Base):
     clarity_score: Mapped[float] = mapped_column(Float, nullable=False)
     hallucination_score: Mapped[float] = mapped_column(Float, nullable=False)
     overall_score: Mapped[float] = mapped_column(Float, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    evaluator_model: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    evaluator_template_version: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    response_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    evaluation_time: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
 
     execution: Mapped["Execution"] = relationship(back_populates="evaluation")
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache_entries"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    response_text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+
+
+# Running Welford state and log-bucket histogram of one metric of one prompt version.
+class MetricStatsColumns:
+    prompt_version_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("prompt_versions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    metric: Mapped[str] = mapped_column(String(64), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    mean: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    min_value: Mapped[float] = mapped_column(Float, nullable=False)
+    max_value: Mapped[float] = mapped_column(Float, nullable=False)
+    histogram: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+
+
+class VersionMetricStats(MetricStatsColumns, Base):
+    __tablename__ = "version_metric_stats"
+
+
+# Metric state of executions moved out by retention archiving. Stats rebuilds start from these
+# rows, so version statistics still cover history that is no longer in the hot tables.
+class ArchivedMetricStats(MetricStatsColumns, Base):
+    __tablename__ = "archived_metric_stats"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_created_at", "status", "created_at"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    payload: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    worker_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # New on every claim; a worker slot only writes while the row still carries its token.
+    lease_token: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class Dataset(Base):
+    __tablename__ = "datasets"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    # Column names as a JSON array; each row stores only its values, in this order.
+    columns: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+
+
+class DatasetRow(Base):
+    __tablename__ = "dataset_rows"
+    __table_args__ = (UniqueConstraint("dataset_id", "row_index", name="uq_dataset_rows_dataset_row_index"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dataset_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("datasets.id", ondelete="CASCADE"), nullable=False
+    )
+    row_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    values: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class DatasetRun(Base):
+    __tablename__ = "dataset_runs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    dataset_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("datasets.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    prompt_version_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("prompt_versions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    job_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    use_cache: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    total_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    succeeded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ResponseBlob(Base):
+    __tablename__ = "response_blobs"
+
+    # sha256 of the UTF-8 response text, so identical responses are stored once.
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(8), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+
+
+class Experiment(Base):
+    __tablename__ = "experiments"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    version_a_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("prompt_versions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    version_b_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("prompt_versions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    job_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    metric: Mapped[str] = mapped_column(String(32), nullable=False, default="overall_score")
+    variables: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    alpha: Mapped[float] = mapped_column(Float, nullable=False)
+    effect_size: Mapped[float] = mapped_column(Float, nullable=False)
+    min_pairs: Mapped[int] = mapped_column(Integer, nullable=False)
+    max_pairs: Mapped[int] = mapped_column(Integer, nullable=False)
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    use_cache: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Running (Welford) state, saved after every round so a requeued job resumes where it stopped.
+    pairs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed_pairs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    mean_a: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2_a: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    mean_b: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2_b: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    mean_diff: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    m2_diff: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    p_value: Mapped[float] = mapped_column(Float, nullable=False, default=1.0)
+    winner_version_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    stop_reason: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=_utcnow, server_default=func.now()
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,153 @@
+import io
+import json
+import tempfile
+from typing import Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.database import get_db
+    from backend.models import Dataset
+    from backend.schemas import (
+        DatasetResponse,
+        DatasetRowResponse,
+        DatasetRunCreate,
+        DatasetRunResponse,
+        ListDatasetRowsResponse,
+        ListDatasetRunsResponse,
+        ListDatasetsResponse,
+    )
+    from backend.services.dataset_service import DatasetServiceError, dataset_service, row_bindings
+    from backend.services.execution_service import NotFoundError
+    from backend.services.job_service import job_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from database import get_db
+    from models import Dataset
+    from schemas import (
+        DatasetResponse,
+        DatasetRowResponse,
+        DatasetRunCreate,
+        DatasetRunResponse,
+        ListDatasetRowsResponse,
+        ListDatasetRunsResponse,
+        ListDatasetsResponse,
+    )
+    from services.dataset_service import DatasetServiceError, dataset_service, row_bindings
+    from services.execution_service import NotFoundError
+    from services.job_service import job_service
+
+router = APIRouter(prefix="/datasets", tags=["datasets"])
+
+# Uploads larger than this are spooled to disk instead of being held in memory.
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def to_dataset_response(dataset: Dataset) -> DatasetResponse:
+    return DatasetResponse(
+        id=dataset.id,
+        name=dataset.name,
+        columns=json.loads(dataset.columns),
+        row_count=dataset.row_count,
+        created_at=dataset.created_at,
+    )
+
+
+@router.post("", response_model=DatasetResponse, status_code=status.HTTP_201_CREATED)
+async def import_dataset(
+    request: Request,
+    name: str = Query(min_length=1, max_length=255),
+    format: Literal["csv", "jsonl"] = "csv",
+    db: AsyncSession = Depends(get_db),
+) -> DatasetResponse:
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            dataset = await dataset_service.import_dataset(db, name, format, stream)
+        except DatasetServiceError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        finally:
+            stream.detach()
+    return to_dataset_response(dataset)
+
+
+@router.get("", response_model=ListDatasetsResponse)
+async def list_datasets(db: AsyncSession = Depends(get_db)) -> ListDatasetsResponse:
+    datasets = await dataset_service.list_datasets(db)
+    return ListDatasetsResponse(datasets=[to_dataset_response(dataset) for dataset in datasets])
+
+
+@router.get("/{dataset_id}", response_model=DatasetResponse)
+async def get_dataset(dataset_id: UUID, db: AsyncSession = Depends(get_db)) -> DatasetResponse:
+    try:
+        dataset = await dataset_service.get_dataset(db, dataset_id)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return to_dataset_response(dataset)
+
+
+@router.get("/{dataset_id}/rows", response_model=ListDatasetRowsResponse)
+async def list_dataset_rows(
+    dataset_id: UUID,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[int] = Query(default=None, ge=0),
+    db: AsyncSession = Depends(get_db),
+) -> ListDatasetRowsResponse:
+    try:
+        dataset = await dataset_service.get_dataset(db, dataset_id)
+        rows, next_cursor = await dataset_service.list_rows(db, dataset_id, limit=limit, after=cursor)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    columns = json.loads(dataset.columns)
+    return ListDatasetRowsResponse(
+        rows=[
+            DatasetRowResponse(id=row.id, row_index=row.row_index, values=row_bindings(columns, json.loads(row.values)))
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+@router.post("/{dataset_id}/runs", response_model=DatasetRunResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_dataset_run(
+    dataset_id: UUID, payload: DatasetRunCreate, db: AsyncSession = Depends(get_db)
+) -> DatasetRunResponse:
+    try:
+        run = await dataset_service.create_run(
+            db,
+            dataset_id,
+            payload.version_id,
+            concurrency=payload.concurrency,
+            use_cache=not payload.bypass_cache,
+        )
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except DatasetServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+
+    job = await job_service.submit(db, "dataset_run", {"run_id": str(run.id)})
+    run.job_id = job.id
+    await db.commit()
+    await db.refresh(run)
+    return DatasetRunResponse.model_validate(run)
+
+
+@router.get("/{dataset_id}/runs", response_model=ListDatasetRunsResponse)
+async def list_dataset_runs(dataset_id: UUID, db: AsyncSession = Depends(get_db)) -> ListDatasetRunsResponse:
+    runs = await dataset_service.list_runs(db, dataset_id)
+    return ListDatasetRunsResponse(runs=[DatasetRunResponse.model_validate(run) for run in runs])
+
+
+@router.get("/{dataset_id}/runs/{run_id}", response_model=DatasetRunResponse)
+async def get_dataset_run(dataset_id: UUID, run_id: UUID, db: AsyncSession = Depends(get_db)) -> DatasetRunResponse:
+    try:
+        run = await dataset_service.get_run(db, dataset_id, run_id)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return DatasetRunResponse.model_validate(run)
@@ -1,38 +1,98 @@
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 try:
     from backend.database import get_db
     from backend.schemas import (
+        BatchExecutionRequest,
+        BatchExecutionResponse,
         EvaluationResponse,
+        EvaluationScores,
         ExecutionResponse,
         ExecutionWithEvaluationResponse,
+        ExecuteRequest,
         ListEvaluationsResponse,
         ListExecutionsResponse,
+        RescoreFailure,
+        RescoreRequest,
+        RescoreResponse,
     )
-    from backend.services.execution_service import ExecutionServiceError, NotFoundError, execution_service
+    from backend.services.execution_service import (
+        ExecutionFilters,
+        ExecutionServiceError,
+        NotFoundError,
+        build_batch_response,
+        execution_service,
+    )
+    from backend.services.export_service import export_service
+    from backend.services.template_service import TemplateError
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
     from database import get_db
     from schemas import (
+        BatchExecutionRequest,
+        BatchExecutionResponse,
         EvaluationResponse,
+        EvaluationScores,
         ExecutionResponse,
         ExecutionWithEvaluationResponse,
+        ExecuteRequest,
         ListEvaluationsResponse,
         ListExecutionsResponse,
+        RescoreFailure,
+        RescoreRequest,
+        RescoreResponse,
+    )
+    from services.execution_service import (
+        ExecutionFilters,
+        ExecutionServiceError,
+        NotFoundError,
+        build_batch_response,
+        execution_service,
     )
-    from services.execution_service import ExecutionServiceError, NotFoundError, execution_service
+    from services.export_service import export_service
+    from services.template_service import TemplateError
 
 router = APIRouter(tags=["executions"])
 
 
+@router.post("/execute/batch", response_model=BatchExecutionResponse)
+async def execute_batch(payload: BatchExecutionRequest, db: AsyncSession = Depends(get_db)) -> BatchExecutionResponse:
+    try:
+        outcomes = await execution_service.execute_batch(
+            items=[(item.version_id, item.repeat) for item in payload.items],
+            db=db,
+            concurrency=payload.concurrency,
+            use_cache=not payload.bypass_cache,
+        )
+    except ExecutionServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return build_batch_response(outcomes)
+
+
 @router.post("/execute/{version_id}", response_model=ExecutionWithEvaluationResponse, status_code=status.HTTP_201_CREATED)
-async def execute_prompt(version_id: UUID, db: Session = Depends(get_db)) -> ExecutionWithEvaluationResponse:
+async def execute_prompt(
+    version_id: UUID,
+    payload: Optional[ExecuteRequest] = None,
+    bypass_cache: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> ExecutionWithEvaluationResponse:
     try:
-        execution, evaluation = await execution_service.execute_prompt_version(version_id=version_id, db=db)
+        execution, evaluation = await execution_service.execute_prompt_version(
+            version_id=version_id,
+            db=db,
+            use_cache=not bypass_cache,
+            variables=payload.variables if payload else None,
+        )
         return ExecutionWithEvaluationResponse(
             execution=ExecutionResponse.model_validate(execution),
             evaluation={
@@ -44,17 +104,140 @@ async def execute_prompt(version_id: UUID, db: Session = Depends(get_db)) -> Exe
         )
     except NotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except TemplateError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
     except ExecutionServiceError as exc:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
 
 
+@router.post("/execute/{version_id}/stream")
+async def execute_prompt_stream(
+    version_id: UUID,
+    payload: Optional[ExecuteRequest] = None,
+    bypass_cache: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    try:
+        content = execution_service.render_prompt(
+            version_id,
+            await execution_service.get_version_content(version_id, db),
+            payload.variables if payload else None,
+        )
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except TemplateError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for item in execution_service.stream_execution(version_id, content, use_cache=not bypass_cache):
+                if isinstance(item, str):
+                    yield f"event: token\ndata: {json.dumps({'text': item})}\n\n"
+                    continue
+                execution, evaluation = item
+                result = ExecutionWithEvaluationResponse(
+                    execution=ExecutionResponse.model_validate(execution),
+                    evaluation=EvaluationScores.model_validate(evaluation),
+                )
+                yield f"event: result\ndata: {result.model_dump_json()}\n\n"
+        except ExecutionServiceError as exc:
+            yield f"event: error\ndata: {json.dumps({'detail': str(exc)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def get_execution_filters(
+    prompt_id: Optional[UUID] = None,
+    version_id: Optional[UUID] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    dataset_run_id: Optional[UUID] = None,
+    experiment_id: Optional[UUID] = None,
+) -> ExecutionFilters:
+    return ExecutionFilters(
+        prompt_id=prompt_id,
+        version_id=version_id,
+        created_after=created_after,
+        created_before=created_before,
+        dataset_run_id=dataset_run_id,
+        experiment_id=experiment_id,
+    )
+
+
 @router.get("/executions", response_model=ListExecutionsResponse)
-async def get_executions(db: Session = Depends(get_db)) -> ListExecutionsResponse:
-    executions = execution_service.list_executions(db)
-    return ListExecutionsResponse(executions=[ExecutionResponse.model_validate(item) for item in executions])
+async def get_executions(
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_response_text: bool = True,
+    response_text_max_chars: Optional[int] = Query(default=None, ge=1),
+    filters: ExecutionFilters = Depends(get_execution_filters),
+    db: AsyncSession = Depends(get_db),
+) -> ListExecutionsResponse:
+    try:
+        executions, next_cursor = await execution_service.list_executions(
+            db,
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            include_response_text=include_response_text,
+            response_text_max_chars=response_text_max_chars,
+        )
+    except ExecutionServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return ListExecutionsResponse(
+        executions=[ExecutionResponse.model_validate(item) for item in executions],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/executions/export")
+async def export_executions(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    include_response_text: bool = True,
+    filters: ExecutionFilters = Depends(get_execution_filters),
+) -> StreamingResponse:
+    if format == "csv":
+        return StreamingResponse(
+            export_service.stream_csv(filters, include_response_text),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="executions.csv"'},
+        )
+    return StreamingResponse(
+        export_service.stream_ndjson(filters, include_response_text),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.get("/evaluations", response_model=ListEvaluationsResponse)
-async def get_evaluations(db: Session = Depends(get_db)) -> ListEvaluationsResponse:
-    evaluations = execution_service.list_evaluations(db)
-    return ListEvaluationsResponse(evaluations=[EvaluationResponse.model_validate(item) for item in evaluations])
+async def get_evaluations(
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    filters: ExecutionFilters = Depends(get_execution_filters),
+    db: AsyncSession = Depends(get_db),
+) -> ListEvaluationsResponse:
+    try:
+        evaluations, next_cursor = await execution_service.list_evaluations(
+            db, filters=filters, limit=limit, cursor=cursor
+        )
+    except ExecutionServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return ListEvaluationsResponse(
+        evaluations=[EvaluationResponse.model_validate(item) for item in evaluations],
+        next_cursor=next_cursor,
+    )
+
+
+@router.post("/evaluations/rescore", response_model=RescoreResponse)
+async def rescore_executions(payload: RescoreRequest, db: AsyncSession = Depends(get_db)) -> RescoreResponse:
+    try:
+        outcome = await execution_service.rescore_executions(execution_ids=payload.execution_ids, db=db)
+    except ExecutionServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return RescoreResponse(
+        rescored=len(outcome.evaluations),
+        failures=[
+            RescoreFailure(execution_id=execution_id, error=error) for execution_id, error in outcome.failures.items()
+        ],
+        evaluations=[EvaluationResponse.model_validate(item) for item in outcome.evaluations],
+    )
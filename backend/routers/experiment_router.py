@@ -0,0 +1,106 @@
+import math
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.database import get_db
+    from backend.models import Experiment
+    from backend.schemas import ExperimentArmStats, ExperimentCreate, ExperimentResponse, ListExperimentsResponse
+    from backend.services.execution_service import NotFoundError
+    from backend.services.experiment_service import ExperimentServiceError, experiment_service
+    from backend.services.job_service import job_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from database import get_db
+    from models import Experiment
+    from schemas import ExperimentArmStats, ExperimentCreate, ExperimentResponse, ListExperimentsResponse
+    from services.execution_service import NotFoundError
+    from services.experiment_service import ExperimentServiceError, experiment_service
+    from services.job_service import job_service
+
+router = APIRouter(prefix="/experiments", tags=["experiments"])
+
+
+def _stddev(m2: float, count: int) -> float:
+    return math.sqrt(max(m2 / (count - 1), 0.0)) if count > 1 else 0.0
+
+
+def to_experiment_response(experiment: Experiment) -> ExperimentResponse:
+    return ExperimentResponse(
+        id=experiment.id,
+        name=experiment.name,
+        job_id=experiment.job_id,
+        status=experiment.status,
+        metric=experiment.metric,
+        alpha=experiment.alpha,
+        min_pairs=experiment.min_pairs,
+        max_pairs=experiment.max_pairs,
+        pairs=experiment.pairs,
+        failed_pairs=experiment.failed_pairs,
+        a=ExperimentArmStats(
+            version_id=experiment.version_a_id,
+            mean=experiment.mean_a,
+            stddev=_stddev(experiment.m2_a, experiment.pairs),
+        ),
+        b=ExperimentArmStats(
+            version_id=experiment.version_b_id,
+            mean=experiment.mean_b,
+            stddev=_stddev(experiment.m2_b, experiment.pairs),
+        ),
+        mean_difference=experiment.mean_diff,
+        p_value=experiment.p_value,
+        stop_reason=experiment.stop_reason,
+        winner_version_id=experiment.winner_version_id,
+        error=experiment.error,
+        created_at=experiment.created_at,
+        finished_at=experiment.finished_at,
+    )
+
+
+@router.post("", response_model=ExperimentResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_experiment(payload: ExperimentCreate, db: AsyncSession = Depends(get_db)) -> ExperimentResponse:
+    try:
+        experiment = await experiment_service.create_experiment(
+            db,
+            payload.version_a_id,
+            payload.version_b_id,
+            name=payload.name,
+            metric=payload.metric,
+            variables=payload.variables,
+            alpha=payload.alpha,
+            effect_size=payload.effect_size,
+            min_pairs=payload.min_pairs,
+            max_pairs=payload.max_pairs,
+            concurrency=payload.concurrency,
+            use_cache=payload.use_cache,
+        )
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ExperimentServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+
+    job = await job_service.submit(db, "experiment", {"experiment_id": str(experiment.id)})
+    experiment.job_id = job.id
+    await db.commit()
+    await db.refresh(experiment)
+    return to_experiment_response(experiment)
+
+
+@router.get("", response_model=ListExperimentsResponse)
+async def list_experiments(
+    limit: int = Query(default=100, ge=1, le=1000), db: AsyncSession = Depends(get_db)
+) -> ListExperimentsResponse:
+    experiments = await experiment_service.list_experiments(db, limit=limit)
+    return ListExperimentsResponse(experiments=[to_experiment_response(item) for item in experiments])
+
+
+@router.get("/{experiment_id}", response_model=ExperimentResponse)
+async def get_experiment(experiment_id: UUID, db: AsyncSession = Depends(get_db)) -> ExperimentResponse:
+    try:
+        experiment = await experiment_service.get_experiment(db, experiment_id)
+    except NotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return to_experiment_response(experiment)
@@ -0,0 +1,112 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.database import get_db
+    from backend.models import Job
+    from backend.schemas import BatchExecutionRequest, ExecuteRequest, JobResponse
+    from backend.services.prompt_service import prompt_cache
+    from backend.services.job_service import job_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import get_db
+    from models import Job
+    from schemas import BatchExecutionRequest, ExecuteRequest, JobResponse
+    from services.prompt_service import prompt_cache
+    from services.job_service import job_service
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def to_job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/execute/batch", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_batch_execution(payload: BatchExecutionRequest, db: AsyncSession = Depends(get_db)) -> JobResponse:
+    total = sum(item.repeat for item in payload.items)
+    if total > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch expands to {total} executions; the limit is {settings.batch_max_items}.",
+        )
+    job = await job_service.submit(
+        db,
+        "execute_batch",
+        {
+            "items": [[str(item.version_id), item.repeat] for item in payload.items],
+            "concurrency": payload.concurrency,
+            "use_cache": not payload.bypass_cache,
+        },
+    )
+    return to_job_response(job)
+
+
+@router.post("/execute/{version_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_execution(
+    version_id: UUID,
+    payload: Optional[ExecuteRequest] = None,
+    bypass_cache: bool = False,
+    db: AsyncSession = Depends(get_db),
+) -> JobResponse:
+    if await prompt_cache.get_version(db, version_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prompt version not found.")
+    job = await job_service.submit(
+        db,
+        "execute",
+        {
+            "version_id": str(version_id),
+            "use_cache": not bypass_cache,
+            "variables": payload.variables if payload else None,
+        },
+    )
+    return to_job_response(job)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: UUID,
+    wait: float = Query(default=0.0, ge=0.0, description="Seconds to long-poll for the job to finish."),
+    db: AsyncSession = Depends(get_db),
+) -> JobResponse:
+    if wait > 0:
+        job = await job_service.wait(db, job_id, min(wait, settings.job_max_wait_seconds))
+    else:
+        job = await job_service.get(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return to_job_response(job)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: UUID, db: AsyncSession = Depends(get_db)) -> StreamingResponse:
+    if await job_service.get(db, job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+
+    async def events() -> AsyncIterator[str]:
+        async for job in job_service.watch(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {job.status}\ndata: {to_job_response(job).model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
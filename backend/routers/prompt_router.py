@@ -1,8 +1,8 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 try:
     from backend.database import get_db
@@ -10,11 +10,18 @@ try:
     from backend.schemas import (
         ListPromptVersionsResponse,
         ListPromptsResponse,
+        ListVersionStatsResponse,
+        MetricStatsResponse,
         PromptCreate,
+        PromptImportError,
+        PromptImportResponse,
         PromptResponse,
         PromptVersionCreate,
         PromptVersionResponse,
+        VersionStatsResponse,
     )
+    from backend.services.prompt_service import PromptServiceError, iter_lines, prompt_cache, prompt_service
+    from backend.services.stats_service import stats_service
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
@@ -23,55 +30,94 @@ except ModuleNotFoundError as exc:
     from schemas import (
         ListPromptVersionsResponse,
         ListPromptsResponse,
+        ListVersionStatsResponse,
+        MetricStatsResponse,
         PromptCreate,
+        PromptImportError,
+        PromptImportResponse,
         PromptResponse,
         PromptVersionCreate,
         PromptVersionResponse,
+        VersionStatsResponse,
     )
+    from services.prompt_service import PromptServiceError, iter_lines, prompt_cache, prompt_service
+    from services.stats_service import stats_service
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
 
 @router.get("", response_model=ListPromptsResponse)
-async def list_prompts(db: Session = Depends(get_db)) -> ListPromptsResponse:
-    prompts = db.query(Prompt).all()
+async def list_prompts(db: AsyncSession = Depends(get_db)) -> ListPromptsResponse:
+    prompts = (await db.scalars(select(Prompt))).all()
     return ListPromptsResponse(prompts=[PromptResponse.model_validate(p) for p in prompts])
 
 
 @router.post("", response_model=PromptResponse, status_code=status.HTTP_201_CREATED)
-async def create_prompt(payload: PromptCreate, db: Session = Depends(get_db)) -> Prompt:
+async def create_prompt(payload: PromptCreate, db: AsyncSession = Depends(get_db)) -> Prompt:
     prompt = Prompt(name=payload.name)
     db.add(prompt)
-    db.commit()
-    db.refresh(prompt)
+    await db.commit()
+    await db.refresh(prompt)
+    prompt_cache.remember_prompt(prompt.id)
     return prompt
 
 
+@router.post("/import", response_model=PromptImportResponse)
+async def import_prompts(
+    request: Request, dedup: bool = True, db: AsyncSession = Depends(get_db)
+) -> PromptImportResponse:
+    # JSONL body, one version per line: {"prompt": "<name>" or "prompt_id": "<uuid>", "content": "..."}.
+    # Prompts named in the file are created if missing; with dedup, content the prompt already has
+    # is skipped, so re-running an import is a no-op.
+    summary = await prompt_service.import_jsonl(db, iter_lines(request.stream()), dedup=dedup)
+    return PromptImportResponse(
+        lines=summary.lines,
+        prompts_created=summary.prompts_created,
+        versions_created=summary.versions_created,
+        duplicates=summary.duplicates,
+        error_count=summary.error_count,
+        errors=[PromptImportError(line=line, error=error) for line, error in summary.errors],
+    )
+
+
 @router.get("/{id}/versions", response_model=ListPromptVersionsResponse)
-async def list_prompt_versions(id: UUID, db: Session = Depends(get_db)) -> ListPromptVersionsResponse:
-    prompt = db.query(Prompt).filter(Prompt.id == id).first()
-    if not prompt:
+async def list_prompt_versions(id: UUID, db: AsyncSession = Depends(get_db)) -> ListPromptVersionsResponse:
+    if not await prompt_cache.prompt_exists(db, id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found")
-    
-    versions = db.query(PromptVersion).filter(PromptVersion.prompt_id == id).order_by(PromptVersion.version_number).all()
+
+    versions = (
+        await db.scalars(
+            select(PromptVersion).where(PromptVersion.prompt_id == id).order_by(PromptVersion.version_number)
+        )
+    ).all()
     return ListPromptVersionsResponse(versions=[PromptVersionResponse.model_validate(v) for v in versions])
 
 
-@router.post("/{id}/version", response_model=PromptVersionResponse, status_code=status.HTTP_201_CREATED)
-async def create_prompt_version(id: UUID, payload: PromptVersionCreate, db: Session = Depends(get_db)) -> PromptVersion:
-    prompt = db.query(Prompt).filter(Prompt.id == id).first()
-    if not prompt:
+@router.get("/{id}/versions/stats", response_model=ListVersionStatsResponse)
+async def get_prompt_version_stats(id: UUID, db: AsyncSession = Depends(get_db)) -> ListVersionStatsResponse:
+    if not await prompt_cache.prompt_exists(db, id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found")
 
-    latest_version: int = (
-        db.query(func.max(PromptVersion.version_number)).filter(PromptVersion.prompt_id == id).scalar() or 0
+    version_stats = await stats_service.version_stats(db, id)
+    return ListVersionStatsResponse(
+        versions=[
+            VersionStatsResponse(
+                version_id=version.id,
+                version_number=version.version_number,
+                execution_count=metrics["response_time"].count if "response_time" in metrics else 0,
+                metrics={name: MetricStatsResponse.model_validate(summary) for name, summary in metrics.items()},
+            )
+            for version, metrics in version_stats
+        ]
     )
-    version = PromptVersion(
-        prompt_id=id,
-        version_number=latest_version + 1,
-        content=payload.content,
-    )
-    db.add(version)
-    db.commit()
-    db.refresh(version)
-    return version
+
+
+@router.post("/{id}/version", response_model=PromptVersionResponse, status_code=status.HTTP_201_CREATED)
+async def create_prompt_version(
+    id: UUID, payload: PromptVersionCreate, db: AsyncSession = Depends(get_db)
+) -> PromptVersion:
+    # The version-number allocation fails for an unknown prompt, so no separate existence check.
+    try:
+        return await prompt_service.create_version(db, id, payload.content)
+    except PromptServiceError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found") from exc
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+try:
+    from backend.schemas import CacheStatsResponse, EvaluationCacheStats, GenerationCacheStats, PromptCacheStats
+    from backend.services.cache_service import generation_cache
+    from backend.services.evaluation_service import evaluation_service
+    from backend.services.llm_service import llm_service
+    from backend.services.metrics_service import metrics
+    from backend.services.prompt_service import prompt_cache
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from schemas import CacheStatsResponse, EvaluationCacheStats, GenerationCacheStats, PromptCacheStats
+    from services.cache_service import generation_cache
+    from services.evaluation_service import evaluation_service
+    from services.llm_service import llm_service
+    from services.metrics_service import metrics
+    from services.prompt_service import prompt_cache
+
+router = APIRouter(tags=["system"])
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def get_cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(
+        generation=GenerationCacheStats(**generation_cache.stats(), coalesced=llm_service.in_flight.coalesced),
+        evaluation=EvaluationCacheStats(**evaluation_service.cache_stats()),
+        prompts=PromptCacheStats(**prompt_cache.stats()),
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
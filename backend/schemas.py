@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Any, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -27,9 +28,24 @@ class PromptVersionResponse(BaseModel):
     prompt_id: UUID
     version_number: int
     content: str
+    content_hash: Optional[str] = None
     created_at: datetime
 
 
+class PromptImportError(BaseModel):
+    line: int
+    error: str
+
+
+class PromptImportResponse(BaseModel):
+    lines: int
+    prompts_created: int
+    versions_created: int
+    duplicates: int
+    error_count: int
+    errors: list[PromptImportError]
+
+
 class ListPromptsResponse(BaseModel):
     prompts: list[PromptResponse]
 
@@ -38,6 +54,30 @@ class ListPromptVersionsResponse(BaseModel):
     versions: list[PromptVersionResponse]
 
 
+class MetricStatsResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    count: int
+    mean: float
+    stddev: float
+    min: float
+    max: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class VersionStatsResponse(BaseModel):
+    version_id: UUID
+    version_number: int
+    execution_count: int
+    metrics: dict[str, MetricStatsResponse]
+
+
+class ListVersionStatsResponse(BaseModel):
+    versions: list[VersionStatsResponse]
+
+
 class EvaluationScores(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -52,8 +92,13 @@ class ExecutionResponse(BaseModel):
 
     id: UUID
     prompt_version_id: UUID
-    response_text: str
+    response_text: Optional[str] = None
     response_time: float
+    time_to_first_token: Optional[float] = None
+    coalesced_from_id: Optional[UUID] = None
+    dataset_run_id: Optional[UUID] = None
+    dataset_row_id: Optional[UUID] = None
+    experiment_id: Optional[UUID] = None
     created_at: datetime
 
 
@@ -71,18 +116,238 @@ class EvaluationResponse(BaseModel):
     clarity_score: float
     hallucination_score: float
     overall_score: float
+    evaluation_time: Optional[float] = None
     created_at: datetime
 
 
 class ListExecutionsResponse(BaseModel):
     executions: list[ExecutionResponse]
+    next_cursor: Optional[str] = None
 
 
 class ListEvaluationsResponse(BaseModel):
     evaluations: list[EvaluationResponse]
+    next_cursor: Optional[str] = None
+
+
+class ExecuteRequest(BaseModel):
+    variables: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchExecutionItem(BaseModel):
+    version_id: UUID
+    repeat: int = Field(default=1, ge=1, le=100)
+
+
+class BatchExecutionRequest(BaseModel):
+    items: list[BatchExecutionItem] = Field(min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    bypass_cache: bool = False
+
+
+class BatchExecutionItemResult(BaseModel):
+    version_id: UUID
+    status: Literal["succeeded", "failed"]
+    execution: Optional[ExecutionResponse] = None
+    evaluation: Optional[EvaluationScores] = None
+    error: Optional[str] = None
+
+
+class BatchExecutionResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: list[BatchExecutionItemResult]
+
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    kind: str
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class DatasetResponse(BaseModel):
+    id: UUID
+    name: str
+    columns: list[str]
+    row_count: int
+    created_at: datetime
+
+
+class ListDatasetsResponse(BaseModel):
+    datasets: list[DatasetResponse]
+
+
+class DatasetRowResponse(BaseModel):
+    id: UUID
+    row_index: int
+    values: dict[str, Any]
+
+
+class ListDatasetRowsResponse(BaseModel):
+    rows: list[DatasetRowResponse]
+    next_cursor: Optional[int] = None
+
+
+class DatasetRunCreate(BaseModel):
+    version_id: UUID
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    bypass_cache: bool = False
+
+
+class DatasetRunResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    dataset_id: UUID
+    prompt_version_id: UUID
+    job_id: Optional[UUID] = None
+    status: str
+    concurrency: int
+    use_cache: bool
+    total_rows: int
+    succeeded: int
+    failed: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class ListDatasetRunsResponse(BaseModel):
+    runs: list[DatasetRunResponse]
+
+
+class ExperimentCreate(BaseModel):
+    version_a_id: UUID
+    version_b_id: UUID
+    name: Optional[str] = Field(default=None, max_length=255)
+    metric: Literal["overall_score", "accuracy_score", "clarity_score", "hallucination_score", "response_time"] = (
+        "overall_score"
+    )
+    variables: dict[str, Any] = Field(default_factory=dict)
+    alpha: Optional[float] = Field(default=None, gt=0, lt=0.5)
+    effect_size: Optional[float] = Field(default=None, gt=0)
+    min_pairs: Optional[int] = Field(default=None, ge=2)
+    max_pairs: Optional[int] = Field(default=None, ge=2)
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    use_cache: bool = False
+
+
+class ExperimentArmStats(BaseModel):
+    version_id: UUID
+    mean: float
+    stddev: float
+
+
+class ExperimentResponse(BaseModel):
+    id: UUID
+    name: Optional[str] = None
+    job_id: Optional[UUID] = None
+    status: str
+    metric: str
+    alpha: float
+    min_pairs: int
+    max_pairs: int
+    pairs: int
+    failed_pairs: int
+    a: ExperimentArmStats
+    b: ExperimentArmStats
+    mean_difference: float
+    p_value: float
+    stop_reason: Optional[str] = None
+    winner_version_id: Optional[UUID] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class ListExperimentsResponse(BaseModel):
+    experiments: list[ExperimentResponse]
+
+
+class RescoreRequest(BaseModel):
+    execution_ids: list[UUID] = Field(min_length=1)
+
+
+class RescoreFailure(BaseModel):
+    execution_id: UUID
+    error: str
+
+
+class RescoreResponse(BaseModel):
+    rescored: int
+    failures: list[RescoreFailure]
+    evaluations: list[EvaluationResponse]
+
+
+class GenerationCacheStats(BaseModel):
+    enabled: bool
+    shared: bool
+    persistent: bool
+    entries: int
+    hits: int
+    misses: int
+    memory_hits: int
+    shared_hits: int
+    persistent_hits: int
+    writes: int
+    coalesced: int = 0
+    hit_rate: float
+
+
+class EvaluationCacheStats(BaseModel):
+    enabled: bool
+    shared: bool
+    template_version: str
+    entries: int
+    hits: int
+    misses: int
+    shared_hits: int
+    hit_rate: float
+    coalesced: int = 0
+
+
+class PromptCacheStats(BaseModel):
+    enabled: bool
+    versions: int
+    prompts: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class CacheStatsResponse(BaseModel):
+    generation: GenerationCacheStats
+    evaluation: EvaluationCacheStats
+    prompts: PromptCacheStats
 
 
 class HealthResponse(BaseModel):
     status: str
     app: str
     environment: str
+
+
+class WorkerHealthResponse(BaseModel):
+    worker_id: str
+    pid: int
+    started_at: datetime
+    uptime_seconds: float
+    heartbeat_at: datetime
+    pipeline_running: bool
+    pipeline_queue_depths: dict[str, int]
+    job_worker_running: bool
+    in_flight_generations: int
+    db_pool: Optional[dict[str, int]] = None
+
+
+class ListWorkerHealthResponse(BaseModel):
+    workers: list[WorkerHealthResponse]
@@ -0,0 +1,41 @@
+import logging
+import os
+
+import uvicorn
+
+try:
+    from backend.config import settings
+
+    APP = "backend.main:app"
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+
+    APP = "main:app"
+
+logger = logging.getLogger("backend.serve")
+
+
+# Production entry point: `python -m backend.serve` runs SERVE_WORKERS uvicorn processes. Run
+# `python -m backend.manage init-db` first; workers do not change the schema.
+def main() -> None:
+    logging.basicConfig(level=getattr(logging, settings.log_level.upper(), logging.INFO))
+    workers = settings.serve_worker_count
+    # Worker processes read the resolved count to size their share of DB_CONNECTION_BUDGET.
+    os.environ["SERVE_WORKERS"] = str(workers)
+    if workers > 1 and not settings.shared_cache_path:
+        logger.info("SHARED_CACHE_PATH is not set; each worker keeps its own generation and evaluation caches")
+    logger.info("Serving %s on %s:%s with %s workers", APP, settings.serve_host, settings.serve_port, workers)
+    uvicorn.run(
+        APP,
+        host=settings.serve_host,
+        port=settings.serve_port,
+        workers=workers,
+        log_level=settings.log_level.lower(),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
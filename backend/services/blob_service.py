@@ -0,0 +1,158 @@
+import logging
+import zlib
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import Select, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.models import Execution, ResponseBlob
+    from backend.services.evaluation_service import hash_response
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from models import Execution, ResponseBlob
+    from services.evaluation_service import hash_response
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+# UTF-8 needs at most four bytes per character, which bounds how much of a blob to inflate
+# when only a prefix of the text is wanted.
+_MAX_BYTES_PER_CHAR = 4
+
+
+class BlobServiceError(Exception):
+    pass
+
+
+class BlobService:
+    def __init__(self, enabled: bool, codec: str, level: int, min_bytes: int) -> None:
+        if codec == CODEC_ZSTD and zstandard is None:
+            logger.warning("RESPONSE_COMPRESSION=zstd but the zstandard package is not installed; using zlib")
+            codec = CODEC_ZLIB
+        self.enabled = enabled
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+
+    def encode(self, text: str) -> tuple[str, bytes]:
+        raw = text.encode("utf-8")
+        if self.codec == CODEC_NONE or len(raw) < self.min_bytes:
+            return CODEC_NONE, raw
+        if self.codec == CODEC_ZSTD:
+            packed = zstandard.ZstdCompressor(level=self.level).compress(raw)
+        else:
+            packed = zlib.compress(raw, self.level)
+        # Short or high-entropy responses can grow when compressed.
+        if len(packed) >= len(raw):
+            return CODEC_NONE, raw
+        return self.codec, packed
+
+    @staticmethod
+    def decode(codec: str, data: bytes, max_chars: int | None = None) -> str:
+        limit = max_chars * _MAX_BYTES_PER_CHAR if max_chars else -1
+        if codec == CODEC_NONE:
+            raw = data if limit < 0 else data[:limit]
+        elif codec == CODEC_ZLIB:
+            raw = zlib.decompressobj().decompress(data, max(limit, 0))
+        elif codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise BlobServiceError("Response blob is zstd-compressed but zstandard is not installed.")
+            with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                raw = reader.read(limit)
+        else:
+            raise BlobServiceError(f"Unknown response blob codec: {codec}")
+        text = raw.decode("utf-8", errors="ignore" if max_chars else "strict")
+        return text[:max_chars] if max_chars else text
+
+    @staticmethod
+    def _insert(db: AsyncSession) -> Any:
+        if db.get_bind().dialect.name == "postgresql":
+            return postgresql_insert(ResponseBlob)
+        return sqlite_insert(ResponseBlob)
+
+    async def store(self, db: AsyncSession, texts: Iterable[str]) -> dict[str, str]:
+        # Returns text -> hash. Only blobs not already stored are compressed and inserted; the
+        # conflict clause covers writers racing on the same new response.
+        hashes = {text: hash_response(text) for text in texts}
+        if not hashes:
+            return hashes
+        existing = set(
+            (await db.scalars(select(ResponseBlob.hash).where(ResponseBlob.hash.in_(set(hashes.values()))))).all()
+        )
+        rows = []
+        for text, digest in hashes.items():
+            if digest in existing:
+                continue
+            existing.add(digest)
+            codec, data = self.encode(text)
+            rows.append({"hash": digest, "codec": codec, "data": data, "size": len(text.encode("utf-8"))})
+        if rows:
+            await db.execute(self._insert(db).on_conflict_do_nothing(index_elements=["hash"]), rows)
+        return hashes
+
+    async def migrate_inline(self, db: AsyncSession, batch_size: int) -> int:
+        # Moves inline response_text into blobs, committing per batch so it can be stopped and rerun.
+        migrated = 0
+        last_id = None
+        while True:
+            stmt = select(Execution.id, Execution.response_text).where(Execution.response_hash.is_(None))
+            if last_id is not None:
+                stmt = stmt.where(Execution.id > last_id)
+            rows = (await db.execute(stmt.order_by(Execution.id).limit(batch_size))).all()
+            if not rows:
+                return migrated
+            hashes = await self.store(db, {row.response_text for row in rows})
+            await db.execute(
+                update(Execution),
+                [{"id": row.id, "response_hash": hashes[row.response_text], "response_text": ""} for row in rows],
+            )
+            await db.commit()
+            migrated += len(rows)
+            last_id = rows[-1].id
+            logger.info("Moved %s execution responses to blob storage", migrated)
+
+
+def with_response_text(stmt: Select, max_chars: int | None = None) -> Select:
+    # Adds what resolve_response_text needs; the blob join is only paid for when text is requested.
+    inline = func.substr(Execution.response_text, 1, max_chars) if max_chars else Execution.response_text
+    return stmt.add_columns(
+        inline.label("inline_response_text"),
+        Execution.response_hash.label("response_hash"),
+        ResponseBlob.codec.label("response_codec"),
+        ResponseBlob.data.label("response_data"),
+    ).outerjoin(ResponseBlob, ResponseBlob.hash == Execution.response_hash)
+
+
+def resolve_response_text(row: Any, max_chars: int | None = None, memo: dict[str, str] | None = None) -> str:
+    # Pass a memo when resolving many rows: repeated responses are then inflated once.
+    if row.response_data is None:
+        return row.inline_response_text
+    if memo is not None and row.response_hash in memo:
+        return memo[row.response_hash]
+    text = BlobService.decode(row.response_codec, row.response_data, max_chars)
+    if memo is not None:
+        memo[row.response_hash] = text
+    return text
+
+
+blob_service = BlobService(
+    enabled=settings.response_blobs_enabled,
+    codec=settings.response_compression,
+    level=settings.response_compression_level,
+    min_bytes=settings.response_compression_min_bytes,
+)
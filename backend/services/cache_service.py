@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import LLMCacheEntry
+    from backend.services.metrics_service import CACHE_REQUESTS, COALESCED_REQUESTS
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import LLMCacheEntry
+    from services.metrics_service import CACHE_REQUESTS, COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._entries: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class PersistentCacheTier:
+    def __init__(self, ttl_seconds: float | None) -> None:
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+
+    async def get(self, key: str) -> str | None:
+        async with AsyncSessionLocal() as db:
+            entry = await db.get(LLMCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.expires_at is not None and _as_utc(entry.expires_at) <= datetime.now(timezone.utc):
+                await db.delete(entry)
+                await db.commit()
+                return None
+            return entry.response_text
+
+    async def set(self, key: str, model_name: str, value: str) -> None:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.ttl_seconds) if self.ttl_seconds else None
+        async with AsyncSessionLocal() as db:
+            await db.merge(
+                LLMCacheEntry(
+                    key=key,
+                    model_name=model_name,
+                    response_text=value,
+                    created_at=now,
+                    expires_at=expires_at,
+                )
+            )
+            await db.commit()
+
+
+# Cross-process tier for the workers of one host: a SQLite file in WAL mode that each worker opens.
+# Calls run in worker threads, each with its own connection, and expiry uses wall-clock time so all
+# processes agree on it.
+class SharedCacheTier:
+    # Expired and surplus rows are pruned once every PRUNE_EVERY writes rather than on each one.
+    PRUNE_EVERY = 100
+
+    def __init__(
+        self, path: str, namespace: str, ttl_seconds: float | None = None, max_entries: int | None = None
+    ) -> None:
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self.max_entries = max_entries if max_entries and max_entries > 0 else None
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS shared_cache (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                "value TEXT NOT NULL, expires_at REAL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _get_many(self, keys: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        now = time.time()
+        connection = self._connect()
+        # Stays under SQLite's default limit on bound parameters.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = connection.execute(
+                f"SELECT key, value FROM shared_cache WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (self.namespace, *chunk, now),
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def _set_many(self, items: list[tuple[str, str]], ttl_seconds: float | None) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO shared_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                [(self.namespace, key, value, expires_at) for key, value in items],
+            )
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(connection)
+            self._writes += 1
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "DELETE FROM shared_cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+        )
+        if self.max_entries is not None:
+            # A namespace writes with one TTL, so the entries expiring first are the oldest; entries
+            # without a TTL are kept last.
+            connection.execute(
+                "DELETE FROM shared_cache WHERE namespace = ? AND key IN (SELECT key FROM shared_cache "
+                "WHERE namespace = ? ORDER BY expires_at IS NULL DESC, expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+
+    def _delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM shared_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def _entries(self) -> dict[str, str]:
+        rows = self._connect().execute(
+            "SELECT key, value FROM shared_cache WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.namespace, time.time()),
+        ).fetchall()
+        return dict(rows)
+
+    async def get(self, key: str) -> str | None:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        keys = list(keys)
+        return await asyncio.to_thread(self._get_many, keys) if keys else {}
+
+    async def set(self, key: str, value: str, ttl_seconds: float | None = None) -> None:
+        await self.set_many([(key, value)], ttl_seconds)
+
+    async def set_many(self, items: Iterable[tuple[str, str]], ttl_seconds: float | None = None) -> None:
+        items = list(items)
+        if items:
+            await asyncio.to_thread(self._set_many, items, ttl_seconds or self.ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def entries(self) -> dict[str, str]:
+        return await asyncio.to_thread(self._entries)
+
+
+def shared_cache_tier(namespace: str, ttl_seconds: float | None = None) -> SharedCacheTier | None:
+    if not settings.shared_cache_path:
+        return None
+    return SharedCacheTier(settings.shared_cache_path, namespace, ttl_seconds, settings.shared_cache_max_entries)
+
+
+class CoalescedCallCancelled(Exception):
+    pass
+
+
+# Single-flight: the first caller for a key leads and does the work; callers arriving while it
+# is in flight await the leader's result instead of repeating the call. Nothing is kept afterwards.
+class SingleFlight(Generic[K, V]):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._in_flight: dict[K, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def join(self, key: K) -> asyncio.Future | None:
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc(layer=self.name)
+        return future
+
+    def lead(self, key: K) -> None:
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+
+    def finish(self, key: K, result: V | BaseException) -> None:
+        future = self._in_flight.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):
+                # A cancelled leader must not cancel the followers.
+                result = CoalescedCallCancelled("The coalesced request was cancelled.")
+            future.set_exception(result)
+            # Mark the exception as retrieved; there may be no followers to observe it.
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def run(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        future = self.join(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        self.lead(key)
+        try:
+            result = await call()
+        except BaseException as exc:
+            self.finish(key, exc)
+            raise
+        self.finish(key, result)
+        return result
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    shared_hits: int = 0
+    persistent_hits: int = 0
+    writes: int = 0
+
+
+class GenerationCache:
+    def __init__(self, enabled: bool, max_entries: int, ttl_seconds: float | None, persistent: bool) -> None:
+        self.enabled = enabled
+        self._memory: LRUCache[str, str] = LRUCache(max_entries, ttl_seconds)
+        self._shared = shared_cache_tier("generation", ttl_seconds)
+        self._persistent = PersistentCacheTier(ttl_seconds) if persistent else None
+        self._stats = CacheStats()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, params: dict[str, Any] | None = None) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([model_name, prompt_hash, params or {}], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        value = self._memory.get(key)
+        if value is not None:
+            self._stats.hits += 1
+            self._stats.memory_hits += 1
+            CACHE_REQUESTS.inc(cache="generation", result="memory_hit")
+            return value
+
+        if self._shared is not None:
+            try:
+                value = await self._shared.get(key)
+            except Exception as exc:
+                logger.warning("Shared generation cache read failed: %s", exc)
+                value = None
+            if value is not None:
+                self._memory.set(key, value)
+                self._stats.hits += 1
+                self._stats.shared_hits += 1
+                CACHE_REQUESTS.inc(cache="generation", result="shared_hit")
+                return value
+
+        if self._persistent is not None:
+            try:
+                value = await self._persistent.get(key)
+            except Exception as exc:
+                logger.warning("Persistent generation cache read failed: %s", exc)
+                value = None
+            if value is not None:
+                self._memory.set(key, value)
+                self._stats.hits += 1
+                self._stats.persistent_hits += 1
+                CACHE_REQUESTS.inc(cache="generation", result="persistent_hit")
+                return value
+
+        self._stats.misses += 1
+        CACHE_REQUESTS.inc(cache="generation", result="miss")
+        return None
+
+    async def set(self, key: str, model_name: str, value: str) -> None:
+        self._memory.set(key, value)
+        self._stats.writes += 1
+        if self._shared is not None:
+            try:
+                await self._shared.set(key, value)
+            except Exception as exc:
+                logger.warning("Shared generation cache write failed: %s", exc)
+        if self._persistent is not None:
+            try:
+                await self._persistent.set(key, model_name, value)
+            except Exception as exc:
+                logger.warning("Persistent generation cache write failed: %s", exc)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self._stats.hits + self._stats.misses
+        return {
+            "enabled": self.enabled,
+            "shared": self._shared is not None,
+            "persistent": self._persistent is not None,
+            "entries": len(self._memory),
+            **asdict(self._stats),
+            "hit_rate": self._stats.hits / lookups if lookups else 0.0,
+        }
+
+
+generation_cache = GenerationCache(
+    enabled=settings.llm_cache_enabled,
+    max_entries=settings.llm_cache_max_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    persistent=settings.llm_cache_persistent,
+)
@@ -0,0 +1,297 @@
+import asyncio
+import csv
+import json
+import logging
+from datetime import datetime, timezone
+from typing import IO, Any, Iterator
+from uuid import UUID
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Dataset, DatasetRow, DatasetRun, Execution
+    from backend.services.execution_service import NotFoundError
+    from backend.services.pipeline_service import execution_pipeline
+    from backend.services.prompt_service import prompt_cache
+    from backend.services.template_service import template_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Dataset, DatasetRow, DatasetRun, Execution
+    from services.execution_service import NotFoundError
+    from services.pipeline_service import execution_pipeline
+    from services.prompt_service import prompt_cache
+    from services.template_service import template_service
+
+logger = logging.getLogger(__name__)
+
+RUN_QUEUED = "queued"
+RUN_RUNNING = "running"
+RUN_COMPLETED = "completed"
+RUN_FAILED = "failed"
+
+
+class DatasetServiceError(Exception):
+    pass
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def row_bindings(columns: list[str], values: list[Any]) -> dict[str, Any]:
+    # Rows imported before a JSONL column first appeared are shorter than the column list.
+    return {name: values[index] if index < len(values) else None for index, name in enumerate(columns)}
+
+
+def _read_csv(stream: IO[str], columns: list[str]) -> Iterator[list[Any]]:
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if not header:
+        raise DatasetServiceError("CSV input needs a header row.")
+    columns.extend(name.strip() for name in header)
+    for record in reader:
+        if not record:
+            continue
+        if len(record) != len(columns):
+            raise DatasetServiceError(
+                f"CSV line {reader.line_num} has {len(record)} fields; the header has {len(columns)}."
+            )
+        yield record
+
+
+def _read_jsonl(stream: IO[str], columns: list[str]) -> Iterator[list[Any]]:
+    positions: dict[str, int] = {}
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise DatasetServiceError(f"JSONL line {line_number} is not valid JSON: {exc.msg}") from exc
+        if not isinstance(record, dict):
+            raise DatasetServiceError(f"JSONL line {line_number} must be a JSON object.")
+        for name in record:
+            if name not in positions:
+                positions[name] = len(columns)
+                columns.append(name)
+        values: list[Any] = [None] * len(columns)
+        for name, value in record.items():
+            values[positions[name]] = value
+        yield values
+
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl}
+
+
+class DatasetService:
+    @staticmethod
+    async def import_dataset(db: AsyncSession, name: str, format: str, stream: IO[str]) -> Dataset:
+        reader = READERS.get(format)
+        if reader is None:
+            raise DatasetServiceError(f"Unsupported dataset format: {format}")
+
+        dataset = Dataset(name=name, columns="[]", row_count=0)
+        db.add(dataset)
+        columns: list[str] = []
+        batch: list[dict[str, Any]] = []
+        row_count = 0
+        try:
+            await db.flush()
+            for values in reader(stream, columns):
+                if row_count >= settings.dataset_max_rows:
+                    raise DatasetServiceError(f"Dataset exceeds the limit of {settings.dataset_max_rows} rows.")
+                batch.append({"dataset_id": dataset.id, "row_index": row_count, "values": _dumps(values)})
+                row_count += 1
+                if len(batch) >= settings.dataset_insert_batch_size:
+                    await db.execute(insert(DatasetRow), batch)
+                    batch = []
+            if batch:
+                await db.execute(insert(DatasetRow), batch)
+            if len(set(columns)) != len(columns):
+                raise DatasetServiceError("Dataset column names must be unique.")
+            dataset.columns = _dumps(columns)
+            dataset.row_count = row_count
+            await db.commit()
+        except UnicodeDecodeError as exc:
+            await db.rollback()
+            raise DatasetServiceError("Dataset must be UTF-8 encoded.") from exc
+        except Exception:
+            await db.rollback()
+            raise
+        await db.refresh(dataset)
+        return dataset
+
+    @staticmethod
+    async def list_datasets(db: AsyncSession) -> list[Dataset]:
+        result = await db.scalars(select(Dataset).order_by(Dataset.created_at.desc()))
+        return list(result.all())
+
+    @staticmethod
+    async def get_dataset(db: AsyncSession, dataset_id: UUID) -> Dataset:
+        dataset = await db.get(Dataset, dataset_id)
+        if dataset is None:
+            raise NotFoundError("Dataset not found.")
+        return dataset
+
+    @staticmethod
+    async def list_rows(
+        db: AsyncSession, dataset_id: UUID, limit: int, after: int | None = None
+    ) -> tuple[list[DatasetRow], int | None]:
+        stmt = select(DatasetRow).where(DatasetRow.dataset_id == dataset_id)
+        if after is not None:
+            stmt = stmt.where(DatasetRow.row_index > after)
+        rows = list((await db.scalars(stmt.order_by(DatasetRow.row_index).limit(limit + 1))).all())
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1].row_index
+        return rows, next_cursor
+
+    async def create_run(
+        self,
+        db: AsyncSession,
+        dataset_id: UUID,
+        version_id: UUID,
+        concurrency: int | None = None,
+        use_cache: bool = True,
+    ) -> DatasetRun:
+        dataset = await self.get_dataset(db, dataset_id)
+        version = await prompt_cache.get_version(db, version_id)
+        if version is None:
+            raise NotFoundError("Prompt version not found.")
+        missing = template_service.get(version_id, version.content).variables.difference(json.loads(dataset.columns))
+        if missing:
+            raise DatasetServiceError(f"Dataset has no columns for template variables: {', '.join(sorted(missing))}")
+
+        run = DatasetRun(
+            dataset_id=dataset.id,
+            prompt_version_id=version_id,
+            status=RUN_QUEUED,
+            concurrency=min(concurrency or settings.batch_max_concurrency, settings.dataset_run_max_concurrency),
+            use_cache=use_cache,
+            total_rows=dataset.row_count,
+            succeeded=0,
+            failed=0,
+        )
+        db.add(run)
+        await db.flush()
+        return run
+
+    @staticmethod
+    async def list_runs(db: AsyncSession, dataset_id: UUID) -> list[DatasetRun]:
+        result = await db.scalars(
+            select(DatasetRun).where(DatasetRun.dataset_id == dataset_id).order_by(DatasetRun.created_at.desc())
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def get_run(db: AsyncSession, dataset_id: UUID, run_id: UUID) -> DatasetRun:
+        run = await db.get(DatasetRun, run_id, populate_existing=True)
+        if run is None or run.dataset_id != dataset_id:
+            raise NotFoundError("Dataset run not found.")
+        return run
+
+    @staticmethod
+    async def _update_run(run_id: UUID, **values: Any) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(DatasetRun).where(DatasetRun.id == run_id).values(**values))
+            await session.commit()
+
+    async def execute_run(self, payload: dict[str, Any], db: AsyncSession) -> dict[str, Any]:
+        run = await db.get(DatasetRun, UUID(payload["run_id"]))
+        if run is None:
+            raise DatasetServiceError("Dataset run not found.")
+        run_id, version_id, use_cache = run.id, run.prompt_version_id, run.use_cache
+        dataset = await db.get(Dataset, run.dataset_id)
+        version = await prompt_cache.get_version(db, version_id)
+        if dataset is None or version is None:
+            raise DatasetServiceError("Dataset or prompt version no longer exists.")
+        columns: list[str] = json.loads(dataset.columns)
+        dataset_id, row_count, concurrency = dataset.id, dataset.row_count, run.concurrency
+        template = template_service.get(version_id, version.content)
+
+        # Rows that already produced an execution (from an earlier, interrupted attempt) are skipped,
+        # so a requeued job resumes instead of starting over.
+        completed_rows = set(
+            (await db.scalars(select(Execution.dataset_row_id).where(Execution.dataset_run_id == run_id))).all()
+        )
+        # Each read is followed by a rollback so the job's session never sits idle in a transaction
+        # (and holds a pooled connection) while the rows' LLM calls are awaited.
+        await db.rollback()
+        counts = {"succeeded": len(completed_rows), "failed": 0}
+        await self._update_run(
+            run_id, status=RUN_RUNNING, total_rows=row_count, error=None, finished_at=None, **counts
+        )
+
+        async def report_progress() -> None:
+            while True:
+                await asyncio.sleep(settings.dataset_run_progress_interval_seconds)
+                await self._update_run(run_id, **counts)
+
+        async def run_row(row_id: UUID, values: list[Any]) -> None:
+            try:
+                await execution_pipeline.submit(
+                    version_id,
+                    template.render(row_bindings(columns, values)),
+                    use_cache=use_cache,
+                    dataset_run_id=run_id,
+                    dataset_row_id=row_id,
+                    coalesce=False,
+                    pack_evaluation=True,
+                )
+                counts["succeeded"] += 1
+            except Exception as exc:
+                logger.warning("Dataset run %s row %s failed: %s", run_id, row_id, exc)
+                counts["failed"] += 1
+            finally:
+                semaphore.release()
+
+        # The semaphore is taken before each task is created, so at most `concurrency` rows are in
+        # flight and only one page of rows is held in memory at a time.
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks: set[asyncio.Task] = set()
+        reporter = asyncio.create_task(report_progress())
+        try:
+            last_index = -1
+            while True:
+                page = (
+                    await db.execute(
+                        select(DatasetRow.id, DatasetRow.row_index, DatasetRow.values)
+                        .where(DatasetRow.dataset_id == dataset_id, DatasetRow.row_index > last_index)
+                        .order_by(DatasetRow.row_index)
+                        .limit(settings.dataset_run_page_size)
+                    )
+                ).all()
+                await db.rollback()
+                if not page:
+                    break
+                last_index = page[-1].row_index
+                for row in page:
+                    if row.id in completed_rows:
+                        continue
+                    await semaphore.acquire()
+                    task = asyncio.create_task(run_row(row.id, json.loads(row.values)))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except Exception as exc:
+            await self._update_run(
+                run_id, status=RUN_FAILED, error=str(exc), finished_at=datetime.now(timezone.utc), **counts
+            )
+            raise
+        finally:
+            for task in (*tasks, reporter):
+                task.cancel()
+            await asyncio.gather(*tasks, reporter, return_exceptions=True)
+
+        await self._update_run(run_id, status=RUN_COMPLETED, finished_at=datetime.now(timezone.utc), **counts)
+        return {"run_id": str(run_id), "total_rows": row_count, **counts}
+
+
+dataset_service = DatasetService()
@@ -1,13 +1,48 @@
+import asyncio
+import hashlib
 import json
+import logging
 import re
-from dataclasses import dataclass
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import select
 
 try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Evaluation
+    from backend.services.cache_service import LRUCache, SingleFlight, shared_cache_tier
     from backend.services.llm_service import LLMServiceError, llm_service
+    from backend.services.metrics_service import CACHE_REQUESTS
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Evaluation
+    from services.cache_service import LRUCache, SingleFlight, shared_cache_tier
     from services.llm_service import LLMServiceError, llm_service
+    from services.metrics_service import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_PROMPT_TEMPLATE = (
+    "You are an LLM response evaluator. Score the following response on a 0-100 scale and "
+    "return ONLY valid JSON in this exact format: "
+    '{{"accuracy": number, "clarity": number, "hallucination_risk": number}}. '
+    "Response to evaluate: {response_text}"
+)
+BATCH_EVALUATION_PROMPT_TEMPLATE = (
+    "You are an LLM response evaluator. Score each of the following responses independently on a 0-100 "
+    "scale and return ONLY a valid JSON array with one object per response in this exact format: "
+    '[{{"index": number, "accuracy": number, "clarity": number, "hallucination_risk": number}}]. '
+    "Each response is wrapped in <response index=N> tags. Responses to evaluate:\n{responses}"
+)
+# Any change to the rubric changes this version and so invalidates memoized scores.
+EVALUATION_TEMPLATE_VERSION = hashlib.sha256(
+    (EVALUATION_PROMPT_TEMPLATE + BATCH_EVALUATION_PROMPT_TEMPLATE).encode("utf-8")
+).hexdigest()[:16]
 
 
 class EvaluationServiceError(Exception):
@@ -20,15 +55,70 @@ class EvaluationResult:
     clarity: float
     hallucination_risk: float
     overall_score: float
+    response_hash: str | None = None
+
+
+def hash_response(response_text: str) -> str:
+    return hashlib.sha256(response_text.encode("utf-8")).hexdigest()
 
 
 class EvaluationService:
-    @staticmethod
-    def _extract_json(text: str) -> dict[str, float]:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        payload = match.group(0) if match else text
-        data = json.loads(payload)
+    def __init__(self) -> None:
+        self.model_name = llm_service.model_name
+        self.template_version = EVALUATION_TEMPLATE_VERSION
+        self.cache_enabled = settings.evaluation_cache_enabled
+        self._cache: LRUCache[tuple[str, str, str], EvaluationResult] = LRUCache(
+            settings.evaluation_cache_max_entries
+        )
+        self._shared = None
+        if self.cache_enabled:
+            self._shared = shared_cache_tier("evaluation", settings.evaluation_cache_shared_ttl_seconds)
+        self._in_flight: SingleFlight[tuple[str, str, str], EvaluationResult] = SingleFlight("evaluation")
+        self._hits = 0
+        self._misses = 0
+        self._shared_hits = 0
+
+    def _cache_key(self, response_hash: str) -> tuple[str, str, str]:
+        return self.model_name, self.template_version, response_hash
+
+    def _shared_key(self, response_hash: str) -> str:
+        return ":".join(self._cache_key(response_hash))
+
+    async def _shared_lookup(self, response_hashes: Iterable[str]) -> dict[str, EvaluationResult]:
+        # Scores another worker on this host already paid for; hits are copied into memory.
+        keys = {self._shared_key(response_hash): response_hash for response_hash in response_hashes}
+        try:
+            found = await self._shared.get_many(keys)
+        except Exception as exc:
+            logger.warning("Shared evaluation cache read failed: %s", exc)
+            return {}
+        results = {}
+        for key, value in found.items():
+            result = EvaluationResult(**json.loads(value))
+            self._cache.set(self._cache_key(keys[key]), result)
+            results[keys[key]] = result
+        self._shared_hits += len(results)
+        return results
 
+    async def _share(self, results: Iterable[EvaluationResult]) -> None:
+        if self._shared is None:
+            return
+        try:
+            await self._shared.set_many(
+                (self._shared_key(result.response_hash), json.dumps(asdict(result))) for result in results
+            )
+        except Exception as exc:
+            logger.warning("Shared evaluation cache write failed: %s", exc)
+
+    def _record_lookup(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        CACHE_REQUESTS.inc(cache="evaluation", result="hit" if hit else "miss")
+
+    @staticmethod
+    def _parse_scores(data: dict) -> dict[str, float]:
         accuracy = float(data["accuracy"])
         clarity = float(data["clarity"])
         hallucination_risk = float(data["hallucination_risk"])
@@ -39,34 +129,233 @@ class EvaluationService:
             "hallucination_risk": max(0.0, min(100.0, hallucination_risk)),
         }
 
+    @classmethod
+    def _extract_json(cls, text: str) -> dict[str, float]:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        payload = match.group(0) if match else text
+        return cls._parse_scores(json.loads(payload))
+
+    @classmethod
+    def _extract_json_array(cls, text: str, size: int) -> dict[int, dict[str, float]]:
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        payload = match.group(0) if match else text
+        data = json.loads(payload)
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array of score objects.")
+
+        scores: dict[int, dict[str, float]] = {}
+        for item in data:
+            try:
+                index = int(item["index"])
+                if 0 <= index < size and index not in scores:
+                    scores[index] = cls._parse_scores(item)
+            except (KeyError, ValueError, TypeError):
+                continue
+        return scores
+
+    @staticmethod
+    def _overall(accuracy: float, clarity: float, hallucination_risk: float) -> float:
+        return accuracy * 0.5 + clarity * 0.3 + (100.0 - hallucination_risk) * 0.2
+
     async def evaluate_response(self, response_text: str) -> EvaluationResult:
-        eval_prompt = (
-            "You are an LLM response evaluator. Score the following response on a 0-100 scale and "
-            "return ONLY valid JSON in this exact format: "
-            '{"accuracy": number, "clarity": number, "hallucination_risk": number}. '
-            f"Response to evaluate: {response_text}"
-        )
+        response_hash = hash_response(response_text)
+        if self.cache_enabled:
+            cached = self._cache.get(self._cache_key(response_hash))
+            if cached is None and self._shared is not None:
+                cached = (await self._shared_lookup([response_hash])).get(response_hash)
+            self._record_lookup(cached is not None)
+            if cached is not None:
+                return cached
+
+        if settings.coalesce_enabled:
+            return await self._in_flight.run(
+                self._cache_key(response_hash), lambda: self._evaluate_single(response_text, response_hash)
+            )
+        return await self._evaluate_single(response_text, response_hash)
+
+    async def _evaluate_single(self, response_text: str, response_hash: str) -> EvaluationResult:
+        eval_prompt = EVALUATION_PROMPT_TEMPLATE.format(response_text=response_text)
 
         try:
-            raw = await llm_service.generate_text(eval_prompt)
+            raw = await llm_service.generate_text(eval_prompt, use_cache=False)
             parsed = self._extract_json(raw)
         except (KeyError, ValueError, TypeError, json.JSONDecodeError) as exc:
             raise EvaluationServiceError(f"Invalid evaluation JSON from Gemini: {exc}") from exc
         except LLMServiceError as exc:
             raise EvaluationServiceError(str(exc)) from exc
 
-        overall = (
-            parsed["accuracy"] * 0.5
-            + parsed["clarity"] * 0.3
-            + (100.0 - parsed["hallucination_risk"]) * 0.2
-        )
+        result = self._store(parsed, response_hash)
+        await self._share([result])
+        return result
 
-        return EvaluationResult(
+    def _store(self, parsed: dict[str, float], response_hash: str) -> EvaluationResult:
+        result = EvaluationResult(
             accuracy=parsed["accuracy"],
             clarity=parsed["clarity"],
             hallucination_risk=parsed["hallucination_risk"],
-            overall_score=overall,
+            overall_score=self._overall(parsed["accuracy"], parsed["clarity"], parsed["hallucination_risk"]),
+            response_hash=response_hash,
+        )
+        if self.cache_enabled:
+            self._cache.set(self._cache_key(response_hash), result)
+        return result
+
+    @staticmethod
+    def _pack(items: list[tuple[str, str]], max_items: int, max_chars: int) -> list[list[tuple[str, str]]]:
+        chunks: list[list[tuple[str, str]]] = []
+        current: list[tuple[str, str]] = []
+        current_chars = 0
+        for item in items:
+            size = len(item[1])
+            if current and (len(current) >= max_items or current_chars + size > max_chars):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(item)
+            current_chars += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _evaluate_chunk(
+        self, chunk: list[tuple[str, str]]
+    ) -> dict[str, EvaluationResult | EvaluationServiceError]:
+        if len(chunk) == 1:
+            response_hash, response_text = chunk[0]
+            try:
+                return {response_hash: await self._evaluate_single(response_text, response_hash)}
+            except EvaluationServiceError as exc:
+                return {response_hash: exc}
+
+        eval_prompt = BATCH_EVALUATION_PROMPT_TEMPLATE.format(
+            responses="\n".join(
+                f"<response index={index}>\n{response_text}\n</response>"
+                for index, (_, response_text) in enumerate(chunk)
+            )
         )
+        try:
+            raw = await llm_service.generate_text(eval_prompt, use_cache=False)
+            scores = self._extract_json_array(raw, len(chunk))
+        except (LLMServiceError, ValueError, TypeError, json.JSONDecodeError) as exc:
+            logger.warning("Batch evaluation of %s responses failed, falling back: %s", len(chunk), exc)
+            scores = {}
+
+        results: dict[str, EvaluationResult | EvaluationServiceError] = {
+            chunk[index][0]: self._store(parsed, chunk[index][0]) for index, parsed in scores.items()
+        }
+        await self._share(results.values())
+
+        # Items missing from (or malformed in) the judge's array are re-scored one at a time.
+        missing = [item for index, item in enumerate(chunk) if index not in scores]
+        if missing:
+            logger.info("Falling back to single evaluation for %s of %s responses", len(missing), len(chunk))
+            for fallback in await asyncio.gather(*(self._evaluate_chunk([item]) for item in missing)):
+                results.update(fallback)
+        return results
+
+    async def evaluate_batch(self, response_texts: list[str]) -> list[EvaluationResult | EvaluationServiceError]:
+        hashes = [hash_response(text) for text in response_texts]
+        results: dict[str, EvaluationResult | EvaluationServiceError] = {}
+
+        pending: dict[str, str] = {}
+        for response_hash, response_text in zip(hashes, response_texts):
+            if response_hash in results or response_hash in pending:
+                continue
+            cached = self._cache.get(self._cache_key(response_hash)) if self.cache_enabled else None
+            if cached is not None:
+                results[response_hash] = cached
+            else:
+                pending[response_hash] = response_text
+        if self._shared is not None and pending:
+            for response_hash, cached in (await self._shared_lookup(pending)).items():
+                results[response_hash] = cached
+                del pending[response_hash]
+        if self.cache_enabled:
+            for response_hash in dict.fromkeys(hashes):
+                self._record_lookup(response_hash not in pending)
+
+        # Responses already being judged by another call are awaited rather than judged again.
+        followers: dict[str, asyncio.Future] = {}
+        if settings.coalesce_enabled:
+            for response_hash in list(pending):
+                future = self._in_flight.join(self._cache_key(response_hash))
+                if future is not None:
+                    followers[response_hash] = future
+                    del pending[response_hash]
+                else:
+                    self._in_flight.lead(self._cache_key(response_hash))
+
+        chunks = self._pack(
+            list(pending.items()),
+            max(1, settings.evaluation_batch_size),
+            max(1, settings.evaluation_batch_max_chars),
+        )
+        try:
+            for chunk_results in await asyncio.gather(*(self._evaluate_chunk(chunk) for chunk in chunks)):
+                results.update(chunk_results)
+        finally:
+            if settings.coalesce_enabled:
+                for response_hash in pending:
+                    self._in_flight.finish(
+                        self._cache_key(response_hash),
+                        results.get(response_hash, EvaluationServiceError("Evaluation was cancelled.")),
+                    )
+
+        for response_hash, future in followers.items():
+            try:
+                results[response_hash] = await asyncio.shield(future)
+            except EvaluationServiceError as exc:
+                results[response_hash] = exc
+            except Exception as exc:
+                results[response_hash] = EvaluationServiceError(str(exc))
+
+        return [results[response_hash] for response_hash in hashes]
+
+    async def warm_cache(self) -> int:
+        if not self.cache_enabled or settings.evaluation_cache_warm_limit <= 0:
+            return 0
+
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.scalars(
+                    select(Evaluation)
+                    .where(
+                        Evaluation.evaluator_model == self.model_name,
+                        Evaluation.evaluator_template_version == self.template_version,
+                        Evaluation.response_hash.is_not(None),
+                    )
+                    .order_by(Evaluation.created_at.desc())
+                    .limit(settings.evaluation_cache_warm_limit)
+                )
+            ).all()
+
+        # Oldest first so the most recent rows end up as the most recently used entries.
+        for row in reversed(rows):
+            self._cache.set(
+                self._cache_key(row.response_hash),
+                EvaluationResult(
+                    accuracy=row.accuracy_score,
+                    clarity=row.clarity_score,
+                    hallucination_risk=row.hallucination_score,
+                    overall_score=row.overall_score,
+                    response_hash=row.response_hash,
+                ),
+            )
+        logger.info("Warmed evaluation cache with %s entries", len(rows))
+        return len(rows)
+
+    def cache_stats(self) -> dict[str, float | int | bool | str]:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.cache_enabled,
+            "shared": self._shared is not None,
+            "template_version": self.template_version,
+            "entries": len(self._cache),
+            "hits": self._hits,
+            "misses": self._misses,
+            "shared_hits": self._shared_hits,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "coalesced": self._in_flight.coalesced,
+        }
 
 
 evaluation_service = EvaluationService()
@@ -1,18 +1,53 @@
-from uuid import UUID
+import asyncio
+import base64
+import json
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from time import perf_counter
+from typing import Any
+from uuid import UUID
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 try:
+    from backend.config import settings
     from backend.models import Evaluation, Execution, PromptVersion
-    from backend.services.evaluation_service import EvaluationServiceError, evaluation_service
+    from backend.schemas import (
+        BatchExecutionItemResult,
+        BatchExecutionResponse,
+        EvaluationScores,
+        ExecutionResponse,
+    )
+    from backend.services.blob_service import resolve_response_text, with_response_text
+    from backend.services.cache_service import SingleFlight
+    from backend.services.evaluation_service import EvaluationResult, EvaluationServiceError, evaluation_service
     from backend.services.llm_service import LLMServiceError, llm_service
+    from backend.services.pipeline_service import PipelineError, execution_pipeline
+    from backend.services.prompt_service import prompt_cache
+    from backend.services.stats_service import stats_service
+    from backend.services.template_service import TemplateError, template_service
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
+    from config import settings
     from models import Evaluation, Execution, PromptVersion
-    from services.evaluation_service import EvaluationServiceError, evaluation_service
+    from schemas import (
+        BatchExecutionItemResult,
+        BatchExecutionResponse,
+        EvaluationScores,
+        ExecutionResponse,
+    )
+    from services.blob_service import resolve_response_text, with_response_text
+    from services.cache_service import SingleFlight
+    from services.evaluation_service import EvaluationResult, EvaluationServiceError, evaluation_service
     from services.llm_service import LLMServiceError, llm_service
+    from services.pipeline_service import PipelineError, execution_pipeline
+    from services.prompt_service import prompt_cache
+    from services.stats_service import stats_service
+    from services.template_service import TemplateError, template_service
 
 
 class NotFoundError(Exception):
@@ -23,53 +58,386 @@ class ExecutionServiceError(Exception):
     pass
 
 
+class InvalidCursorError(ExecutionServiceError):
+    pass
+
+
+@dataclass
+class ExecutionFilters:
+    prompt_id: UUID | None = None
+    version_id: UUID | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    dataset_run_id: UUID | None = None
+    experiment_id: UUID | None = None
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor.") from exc
+
+
+def apply_execution_filters(stmt: Select, filters: ExecutionFilters) -> Select:
+    if filters.version_id is not None:
+        stmt = stmt.where(Execution.prompt_version_id == filters.version_id)
+    if filters.dataset_run_id is not None:
+        stmt = stmt.where(Execution.dataset_run_id == filters.dataset_run_id)
+    if filters.experiment_id is not None:
+        stmt = stmt.where(Execution.experiment_id == filters.experiment_id)
+    if filters.prompt_id is not None:
+        stmt = stmt.join(PromptVersion, PromptVersion.id == Execution.prompt_version_id).where(
+            PromptVersion.prompt_id == filters.prompt_id
+        )
+    if filters.created_after is not None:
+        stmt = stmt.where(Execution.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        stmt = stmt.where(Execution.created_at < filters.created_before)
+    return stmt
+
+
+# Newest first, keyed on (created_at, id) so pages stay stable while rows are being inserted.
+def _keyset_page(stmt: Select, created_at_column, id_column, limit: int, cursor: str | None) -> Select:
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                created_at_column < cursor_created_at,
+                and_(created_at_column == cursor_created_at, id_column < cursor_id),
+            )
+        )
+    return stmt.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+@dataclass
+class RescoreOutcome:
+    evaluations: list[Evaluation]
+    failures: dict[UUID, str]
+
+
+@dataclass
+class BatchItemOutcome:
+    version_id: UUID
+    execution: Execution | None = None
+    evaluation: Evaluation | None = None
+    error: str | None = None
+
+
+def build_batch_response(outcomes: list[BatchItemOutcome]) -> BatchExecutionResponse:
+    results = [
+        BatchExecutionItemResult(
+            version_id=outcome.version_id,
+            status="failed" if outcome.error else "succeeded",
+            execution=ExecutionResponse.model_validate(outcome.execution) if outcome.execution else None,
+            evaluation=EvaluationScores.model_validate(outcome.evaluation) if outcome.evaluation else None,
+            error=outcome.error,
+        )
+        for outcome in outcomes
+    ]
+    succeeded = sum(1 for result in results if result.status == "succeeded")
+    return BatchExecutionResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+    )
+
+
 class ExecutionService:
-    async def execute_prompt_version(self, version_id: UUID, db: Session) -> tuple[Execution, Evaluation]:
-        prompt_version = db.query(PromptVersion).filter(PromptVersion.id == version_id).first()
-        if not prompt_version:
+    def __init__(self) -> None:
+        self._in_flight: SingleFlight[tuple[UUID, str], tuple[Execution, Evaluation]] = SingleFlight("execution")
+
+    @staticmethod
+    async def _run(
+        version_id: UUID,
+        content: str,
+        use_cache: bool,
+        dataset_run_id: UUID | None = None,
+        dataset_row_id: UUID | None = None,
+        coalesce: bool = True,
+        pack_evaluation: bool = False,
+    ) -> tuple[Execution, Evaluation]:
+        try:
+            return await execution_pipeline.submit(
+                version_id,
+                content,
+                use_cache=use_cache,
+                dataset_run_id=dataset_run_id,
+                dataset_row_id=dataset_row_id,
+                coalesce=coalesce,
+                pack_evaluation=pack_evaluation,
+            )
+        except (LLMServiceError, EvaluationServiceError, PipelineError) as exc:
+            raise ExecutionServiceError(str(exc)) from exc
+        except Exception as exc:
+            raise ExecutionServiceError(f"Execution pipeline failed: {exc}") from exc
+
+    @staticmethod
+    async def get_version_content(version_id: UUID, db: AsyncSession) -> str:
+        version = await prompt_cache.get_version(db, version_id)
+        if version is None:
             raise NotFoundError("Prompt version not found.")
+        # End the read transaction (if a cache miss opened one) so the connection goes back to the
+        # pool during the LLM calls.
+        await db.rollback()
+        return version.content
+
+    @staticmethod
+    def render_prompt(version_id: UUID, content: str, variables: dict[str, Any] | None = None) -> str:
+        return template_service.render(version_id, content, variables)
+
+    async def execute_prompt_version(
+        self,
+        version_id: UUID,
+        db: AsyncSession,
+        use_cache: bool = True,
+        variables: dict[str, Any] | None = None,
+    ) -> tuple[Execution, Evaluation]:
+        prompt = self.render_prompt(version_id, await self.get_version_content(version_id, db), variables)
+        if not (settings.coalesce_enabled and use_cache):
+            return await self._run(version_id, prompt, use_cache)
+
+        key = (version_id, prompt)
+        future = self._in_flight.join(key)
+        if future is None:
+            return await self._in_flight.run(key, lambda: self._run(version_id, prompt, use_cache))
 
         try:
-            start_time = perf_counter()
-            response_text = await llm_service.generate_text(prompt_version.content)
+            execution, evaluation = await asyncio.shield(future)
+        except ExecutionServiceError:
+            raise
+        except Exception as exc:
+            raise ExecutionServiceError(f"Execution pipeline failed: {exc}") from exc
+        if settings.coalesce_mode == "shared":
+            return execution, evaluation
+        return await self._record_linked(execution, evaluation)
+
+    @staticmethod
+    async def _record_linked(execution: Execution, evaluation: Evaluation) -> tuple[Execution, Evaluation]:
+        eval_result = EvaluationResult(
+            accuracy=evaluation.accuracy_score,
+            clarity=evaluation.clarity_score,
+            hallucination_risk=evaluation.hallucination_score,
+            overall_score=evaluation.overall_score,
+            response_hash=evaluation.response_hash,
+        )
+        try:
+            return await execution_pipeline.submit_evaluated(execution, eval_result, coalesced_from_id=execution.id)
+        except PipelineError as exc:
+            raise ExecutionServiceError(str(exc)) from exc
+
+    @staticmethod
+    async def stream_execution(
+        version_id: UUID, content: str, use_cache: bool = True
+    ) -> AsyncIterator[str | tuple[Execution, Evaluation]]:
+        # Yields generated text chunks as they arrive, then the persisted (execution, evaluation) pair.
+        parts: list[str] = []
+        time_to_first_token: float | None = None
+        start_time = perf_counter()
+        try:
+            async for chunk in llm_service.stream_text(content, use_cache=use_cache):
+                if time_to_first_token is None:
+                    time_to_first_token = perf_counter() - start_time
+                parts.append(chunk)
+                yield chunk
             response_time = perf_counter() - start_time
+            result = await execution_pipeline.submit_generated(
+                version_id, "".join(parts).strip(), response_time, time_to_first_token
+            )
+        except (LLMServiceError, EvaluationServiceError, PipelineError) as exc:
+            raise ExecutionServiceError(str(exc)) from exc
+        except Exception as exc:
+            raise ExecutionServiceError(f"Execution pipeline failed: {exc}") from exc
+        yield result
 
-            execution = Execution(
-                prompt_version_id=prompt_version.id,
-                response_text=response_text,
-                response_time=response_time,
+    async def execute_batch(
+        self,
+        items: list[tuple[UUID, int]],
+        db: AsyncSession,
+        concurrency: int | None = None,
+        use_cache: bool = True,
+    ) -> list[BatchItemOutcome]:
+        total = sum(repeat for _, repeat in items)
+        if total > settings.batch_max_items:
+            raise ExecutionServiceError(
+                f"Batch expands to {total} executions; the limit is {settings.batch_max_items}."
             )
-            db.add(execution)
-            db.flush()
 
-            eval_result = await evaluation_service.evaluate_response(response_text)
+        version_ids = {version_id for version_id, _ in items}
+        versions = await prompt_cache.get_versions(db, version_ids)
+        contents = {version_id: version.content for version_id, version in versions.items()}
+        await db.rollback()
+
+        limit = min(concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+        semaphore = asyncio.Semaphore(max(1, limit))
+
+        async def run_one(version_id: UUID) -> BatchItemOutcome:
+            content = contents.get(version_id)
+            if content is None:
+                return BatchItemOutcome(version_id=version_id, error="Prompt version not found.")
+            async with semaphore:
+                try:
+                    prompt = self.render_prompt(version_id, content)
+                    # Batch items (and their repeats) are separate samples, never one shared call.
+                    execution, evaluation = await self._run(
+                        version_id, prompt, use_cache, coalesce=False, pack_evaluation=True
+                    )
+                except (ExecutionServiceError, TemplateError) as exc:
+                    return BatchItemOutcome(version_id=version_id, error=str(exc))
+            return BatchItemOutcome(version_id=version_id, execution=execution, evaluation=evaluation)
 
-            evaluation = Evaluation(
-                execution_id=execution.id,
-                accuracy_score=eval_result.accuracy,
-                clarity_score=eval_result.clarity,
-                hallucination_score=eval_result.hallucination_risk,
-                overall_score=eval_result.overall_score,
+        return list(
+            await asyncio.gather(*(run_one(version_id) for version_id, repeat in items for _ in range(repeat)))
+        )
+
+    async def rescore_executions(self, execution_ids: list[UUID], db: AsyncSession) -> RescoreOutcome:
+        if len(execution_ids) > settings.batch_max_items:
+            raise ExecutionServiceError(
+                f"Cannot rescore {len(execution_ids)} executions; the limit is {settings.batch_max_items}."
+            )
+
+        rows = (
+            await db.execute(
+                with_response_text(select(Execution.id, Execution.prompt_version_id)).where(
+                    Execution.id.in_(set(execution_ids))
+                )
+            )
+        ).all()
+        memo: dict[str, str] = {}
+        texts = {row.id: resolve_response_text(row, memo=memo) for row in rows}
+        version_ids = {row.prompt_version_id for row in rows}
+        await db.rollback()
+        failures: dict[UUID, str] = {
+            execution_id: "Execution not found." for execution_id in execution_ids if execution_id not in texts
+        }
+
+        ordered_ids = list(texts)
+        start_time = perf_counter()
+        results = await evaluation_service.evaluate_batch([texts[execution_id] for execution_id in ordered_ids])
+        # Only a lone response's time is its own; packed responses share one judge call.
+        evaluation_time = perf_counter() - start_time if len(ordered_ids) == 1 else None
+
+        existing = {
+            evaluation.execution_id: evaluation
+            for evaluation in (
+                await db.scalars(select(Evaluation).where(Evaluation.execution_id.in_(ordered_ids)))
+            ).all()
+        }
+        now = datetime.now(timezone.utc)
+        evaluations: list[Evaluation] = []
+        for execution_id, result in zip(ordered_ids, results):
+            if isinstance(result, Exception):
+                failures[execution_id] = str(result)
+                continue
+            evaluation = existing.get(execution_id) or Evaluation(
+                id=uuid.uuid4(), execution_id=execution_id, created_at=now
             )
+            evaluation.accuracy_score = result.accuracy
+            evaluation.clarity_score = result.clarity
+            evaluation.hallucination_score = result.hallucination_risk
+            evaluation.overall_score = result.overall_score
+            evaluation.evaluator_model = evaluation_service.model_name
+            evaluation.evaluator_template_version = evaluation_service.template_version
+            evaluation.response_hash = result.response_hash
+            evaluation.evaluation_time = evaluation_time
             db.add(evaluation)
-            db.commit()
-            db.refresh(execution)
-            db.refresh(evaluation)
-            return execution, evaluation
-        except (LLMServiceError, EvaluationServiceError) as exc:
-            db.rollback()
-            raise ExecutionServiceError(str(exc)) from exc
+            evaluations.append(evaluation)
+
+        try:
+            await db.flush()
+            # Score changes cannot be subtracted from the running aggregates, so recompute them.
+            await stats_service.rebuild(db, version_ids)
+            await db.commit()
         except Exception as exc:
-            db.rollback()
-            raise ExecutionServiceError(f"Execution pipeline failed: {exc}") from exc
+            await db.rollback()
+            raise ExecutionServiceError(f"Failed to persist evaluations: {exc}") from exc
+        return RescoreOutcome(evaluations=evaluations, failures=failures)
 
     @staticmethod
-    def list_executions(db: Session) -> list[Execution]:
-        return db.query(Execution).order_by(Execution.created_at.desc()).all()
+    async def list_executions(
+        db: AsyncSession,
+        filters: ExecutionFilters | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+        include_response_text: bool = True,
+        response_text_max_chars: int | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        stmt = select(
+            Execution.id,
+            Execution.prompt_version_id,
+            Execution.response_time,
+            Execution.time_to_first_token,
+            Execution.coalesced_from_id,
+            Execution.dataset_run_id,
+            Execution.dataset_row_id,
+            Execution.experiment_id,
+            Execution.created_at,
+        )
+        if include_response_text:
+            stmt = with_response_text(stmt, response_text_max_chars)
+        stmt = apply_execution_filters(stmt, filters or ExecutionFilters())
+        rows = list((await db.execute(_keyset_page(stmt, Execution.created_at, Execution.id, limit, cursor))).all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        # Blob-stored bodies are only inflated here, for the rows on this page that asked for text.
+        memo: dict[str, str] = {}
+        executions = []
+        for row in rows:
+            item = {key: value for key, value in row._mapping.items() if key in ExecutionResponse.model_fields}
+            item["response_text"] = (
+                resolve_response_text(row, response_text_max_chars, memo) if include_response_text else None
+            )
+            executions.append(item)
+        return executions, next_cursor
 
     @staticmethod
-    def list_evaluations(db: Session) -> list[Evaluation]:
-        return db.query(Evaluation).order_by(Evaluation.created_at.desc()).all()
+    async def list_evaluations(
+        db: AsyncSession,
+        filters: ExecutionFilters | None = None,
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> tuple[list[Evaluation], str | None]:
+        filters = filters or ExecutionFilters()
+        stmt = select(Evaluation)
+        # Evaluations carry their own created_at, so only the execution-side filters need the join.
+        if any(
+            value is not None
+            for value in (filters.version_id, filters.prompt_id, filters.dataset_run_id, filters.experiment_id)
+        ):
+            stmt = apply_execution_filters(
+                stmt.join(Execution, Execution.id == Evaluation.execution_id),
+                ExecutionFilters(
+                    prompt_id=filters.prompt_id,
+                    version_id=filters.version_id,
+                    dataset_run_id=filters.dataset_run_id,
+                    experiment_id=filters.experiment_id,
+                ),
+            )
+        if filters.created_after is not None:
+            stmt = stmt.where(Evaluation.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            stmt = stmt.where(Evaluation.created_at < filters.created_before)
+        evaluations = list(
+            (await db.scalars(_keyset_page(stmt, Evaluation.created_at, Evaluation.id, limit, cursor))).all()
+        )
+
+        next_cursor = None
+        if len(evaluations) > limit:
+            evaluations = evaluations[:limit]
+            next_cursor = encode_cursor(evaluations[-1].created_at, evaluations[-1].id)
+        return evaluations, next_cursor
 
 
 execution_service = ExecutionService()
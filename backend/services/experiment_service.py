@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Experiment
+    from backend.services.execution_service import NotFoundError
+    from backend.services.pipeline_service import execution_pipeline
+    from backend.services.prompt_service import prompt_cache
+    from backend.services.stats_service import METRICS
+    from backend.services.template_service import TemplateError, template_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Experiment
+    from services.execution_service import NotFoundError
+    from services.pipeline_service import execution_pipeline
+    from services.prompt_service import prompt_cache
+    from services.stats_service import METRICS
+    from services.template_service import TemplateError, template_service
+
+logger = logging.getLogger(__name__)
+
+EXPERIMENT_QUEUED = "queued"
+EXPERIMENT_RUNNING = "running"
+EXPERIMENT_COMPLETED = "completed"
+EXPERIMENT_FAILED = "failed"
+
+STOP_SIGNIFICANT = "significant"
+STOP_MAX_PAIRS = "max_pairs"
+
+EXPERIMENT_METRICS = ("overall_score", "accuracy_score", "clarity_score", "hallucination_score", "response_time")
+LOWER_IS_BETTER = {"hallucination_score", "response_time"}
+
+
+class ExperimentServiceError(Exception):
+    pass
+
+
+def _welford(count: int, mean: float, m2: float, value: float) -> tuple[float, float]:
+    delta = value - mean
+    mean += delta / count
+    return mean, m2 + delta * (value - mean)
+
+
+def always_valid_p_value(pairs: int, mean_diff: float, m2_diff: float, effect_size: float, previous: float) -> float:
+    # Mixture sequential probability ratio test (mSPRT) on the paired differences, with a normal
+    # mixture whose scale is `effect_size` standard deviations and the variance estimated from the
+    # data. The p-value stays valid however often it is checked, so the experiment may stop as soon
+    # as it drops below alpha.
+    if pairs < 2:
+        return previous
+    variance = m2_diff / (pairs - 1)
+    if variance <= 0:
+        # Identical differences on every pair (e.g. a discrete metric) say nothing about the noise,
+        # so the test stays inconclusive rather than reporting certainty.
+        return previous
+    shrink = pairs * effect_size**2
+    z_squared = pairs * mean_diff**2 / variance
+    log_likelihood_ratio = -0.5 * math.log1p(shrink) + shrink / (1 + shrink) * z_squared / 2
+    return min(previous, math.exp(-log_likelihood_ratio))
+
+
+@dataclass
+class PairResult:
+    a: float
+    b: float
+
+
+class ExperimentService:
+    @staticmethod
+    def _render(version_id: UUID, content: str, variables: dict[str, Any]) -> str:
+        try:
+            return template_service.render(version_id, content, variables)
+        except TemplateError as exc:
+            raise ExperimentServiceError(str(exc)) from exc
+
+    async def create_experiment(
+        self,
+        db: AsyncSession,
+        version_a_id: UUID,
+        version_b_id: UUID,
+        name: str | None = None,
+        metric: str = "overall_score",
+        variables: dict[str, Any] | None = None,
+        alpha: float | None = None,
+        effect_size: float | None = None,
+        min_pairs: int | None = None,
+        max_pairs: int | None = None,
+        concurrency: int | None = None,
+        use_cache: bool = False,
+    ) -> Experiment:
+        if version_a_id == version_b_id:
+            raise ExperimentServiceError("An experiment needs two different prompt versions.")
+        if metric not in EXPERIMENT_METRICS:
+            raise ExperimentServiceError(f"Unsupported metric: {metric}")
+        if use_cache:
+            # Cached generations repeat one sample, which collapses the variance the test relies on.
+            raise ExperimentServiceError("Experiments need fresh samples; use_cache is not supported.")
+        versions = await prompt_cache.get_versions(db, {version_a_id, version_b_id})
+        if len(versions) != 2:
+            raise NotFoundError("Prompt version not found.")
+        variables = variables or {}
+        for version_id, version in versions.items():
+            self._render(version_id, version.content, variables)
+
+        max_pairs = min(max_pairs or settings.experiment_max_pairs, settings.experiment_max_pairs)
+        experiment = Experiment(
+            name=name,
+            version_a_id=version_a_id,
+            version_b_id=version_b_id,
+            status=EXPERIMENT_QUEUED,
+            metric=metric,
+            variables=json.dumps(variables, separators=(",", ":")),
+            alpha=alpha or settings.experiment_alpha,
+            effect_size=effect_size or settings.experiment_effect_size,
+            min_pairs=min(min_pairs or settings.experiment_min_pairs, max_pairs),
+            max_pairs=max_pairs,
+            concurrency=min(concurrency or settings.experiment_max_concurrency, settings.experiment_max_concurrency),
+            use_cache=use_cache,
+        )
+        db.add(experiment)
+        await db.flush()
+        return experiment
+
+    @staticmethod
+    async def list_experiments(db: AsyncSession, limit: int = 100) -> list[Experiment]:
+        result = await db.scalars(select(Experiment).order_by(Experiment.created_at.desc()).limit(limit))
+        return list(result.all())
+
+    @staticmethod
+    async def get_experiment(db: AsyncSession, experiment_id: UUID) -> Experiment:
+        experiment = await db.get(Experiment, experiment_id, populate_existing=True)
+        if experiment is None:
+            raise NotFoundError("Experiment not found.")
+        return experiment
+
+    @staticmethod
+    async def _save(experiment_id: UUID, **values: Any) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Experiment).where(Experiment.id == experiment_id).values(**values))
+            await session.commit()
+
+    async def execute(self, payload: dict[str, Any], db: AsyncSession) -> dict[str, Any]:
+        experiment = await db.get(Experiment, UUID(payload["experiment_id"]))
+        if experiment is None:
+            raise ExperimentServiceError("Experiment not found.")
+        # Detached so its attributes stay readable after the read transaction is released.
+        db.expunge(experiment)
+        versions = await prompt_cache.get_versions(db, {experiment.version_a_id, experiment.version_b_id})
+        await db.rollback()
+        if len(versions) != 2:
+            raise ExperimentServiceError("A prompt version in this experiment no longer exists.")
+
+        variables = json.loads(experiment.variables)
+        prompts = {
+            version_id: self._render(version_id, version.content, variables) for version_id, version in versions.items()
+        }
+        extract = METRICS[experiment.metric]
+        state = {
+            name: getattr(experiment, name)
+            for name in ("pairs", "failed_pairs", "mean_a", "m2_a", "mean_b", "m2_b", "mean_diff", "m2_diff", "p_value")
+        }
+
+        async def run_arm(version_id: UUID) -> float:
+            execution, evaluation = await execution_pipeline.submit(
+                version_id,
+                prompts[version_id],
+                use_cache=False,
+                experiment_id=experiment.id,
+                coalesce=False,
+            )
+            return extract(execution, evaluation)
+
+        async def run_pair() -> PairResult:
+            # Both arms run concurrently, so neither is favoured by load or provider drift.
+            a, b = await asyncio.gather(run_arm(experiment.version_a_id), run_arm(experiment.version_b_id))
+            return PairResult(a=a, b=b)
+
+        await self._save(experiment.id, status=EXPERIMENT_RUNNING, error=None)
+        stop_reason = None
+        try:
+            while stop_reason is None and state["pairs"] < experiment.max_pairs:
+                round_size = min(experiment.concurrency, experiment.max_pairs - state["pairs"])
+                results = await asyncio.gather(*(run_pair() for _ in range(round_size)), return_exceptions=True)
+                for result in results:
+                    if isinstance(result, BaseException):
+                        logger.warning("Experiment %s pair failed: %s", experiment.id, result)
+                        state["failed_pairs"] += 1
+                        continue
+                    state["pairs"] += 1
+                    count = state["pairs"]
+                    state["mean_a"], state["m2_a"] = _welford(count, state["mean_a"], state["m2_a"], result.a)
+                    state["mean_b"], state["m2_b"] = _welford(count, state["mean_b"], state["m2_b"], result.b)
+                    state["mean_diff"], state["m2_diff"] = _welford(
+                        count, state["mean_diff"], state["m2_diff"], result.b - result.a
+                    )
+                    # The variance is estimated from the data, so testing waits for min_pairs: with a
+                    # handful of pairs the estimate is too noisy and inflates the false-positive rate.
+                    if count < experiment.min_pairs:
+                        continue
+                    state["p_value"] = always_valid_p_value(
+                        count, state["mean_diff"], state["m2_diff"], experiment.effect_size, state["p_value"]
+                    )
+                    if state["p_value"] <= experiment.alpha:
+                        stop_reason = STOP_SIGNIFICANT
+                        break
+                await self._save(experiment.id, **state)
+                if all(isinstance(result, BaseException) for result in results):
+                    raise ExperimentServiceError(f"Every pair in the last round failed: {results[0]}")
+        except Exception as exc:
+            await self._save(
+                experiment.id, status=EXPERIMENT_FAILED, error=str(exc), finished_at=datetime.now(timezone.utc)
+            )
+            raise
+
+        winner = None
+        if stop_reason == STOP_SIGNIFICANT:
+            b_better = (state["mean_diff"] < 0) if experiment.metric in LOWER_IS_BETTER else (state["mean_diff"] > 0)
+            winner = experiment.version_b_id if b_better else experiment.version_a_id
+        await self._save(
+            experiment.id,
+            status=EXPERIMENT_COMPLETED,
+            stop_reason=stop_reason or STOP_MAX_PAIRS,
+            winner_version_id=winner,
+            finished_at=datetime.now(timezone.utc),
+        )
+        return {
+            "experiment_id": str(experiment.id),
+            "pairs": state["pairs"],
+            "p_value": state["p_value"],
+            "winner_version_id": str(winner) if winner else None,
+        }
+
+
+experiment_service = ExperimentService()
@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+from sqlalchemy import select
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Evaluation, Execution, Prompt, PromptVersion
+    from backend.services.blob_service import resolve_response_text, with_response_text
+    from backend.services.execution_service import ExecutionFilters, apply_execution_filters
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Evaluation, Execution, Prompt, PromptVersion
+    from services.blob_service import resolve_response_text, with_response_text
+    from services.execution_service import ExecutionFilters, apply_execution_filters
+
+EXPORT_COLUMNS = [
+    "execution_id",
+    "prompt_id",
+    "prompt_name",
+    "prompt_version_id",
+    "version_number",
+    "response_time",
+    "time_to_first_token",
+    "created_at",
+    "accuracy_score",
+    "clarity_score",
+    "hallucination_score",
+    "overall_score",
+    "evaluation_time",
+    "response_text",
+]
+
+
+class ExportService:
+    @staticmethod
+    async def iter_rows(
+        filters: ExecutionFilters, include_response_text: bool = True
+    ) -> AsyncIterator[dict[str, Any]]:
+        stmt = (
+            select(
+                Execution.id.label("execution_id"),
+                PromptVersion.prompt_id,
+                Prompt.name.label("prompt_name"),
+                Execution.prompt_version_id,
+                PromptVersion.version_number,
+                Execution.response_time,
+                Execution.time_to_first_token,
+                Execution.created_at,
+                Evaluation.accuracy_score,
+                Evaluation.clarity_score,
+                Evaluation.hallucination_score,
+                Evaluation.overall_score,
+                Evaluation.evaluation_time,
+            )
+            .join(PromptVersion, PromptVersion.id == Execution.prompt_version_id)
+            .join(Prompt, Prompt.id == PromptVersion.prompt_id)
+            .outerjoin(Evaluation, Evaluation.execution_id == Execution.id)
+        )
+        if include_response_text:
+            stmt = with_response_text(stmt)
+        # The prompt filter is applied directly because PromptVersion is already joined.
+        stmt = apply_execution_filters(
+            stmt,
+            ExecutionFilters(
+                version_id=filters.version_id,
+                created_after=filters.created_after,
+                created_before=filters.created_before,
+                dataset_run_id=filters.dataset_run_id,
+                experiment_id=filters.experiment_id,
+            ),
+        )
+        if filters.prompt_id is not None:
+            stmt = stmt.where(PromptVersion.prompt_id == filters.prompt_id)
+        stmt = stmt.order_by(Execution.created_at, Execution.id).execution_options(
+            yield_per=settings.export_batch_size
+        )
+
+        # The session is owned by the generator so it outlives the request handler.
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for row in result:
+                item = {column: value for column, value in row._mapping.items() if column in EXPORT_COLUMNS}
+                if include_response_text:
+                    item["response_text"] = resolve_response_text(row)
+                yield item
+
+    @staticmethod
+    def _serialize(value: Any) -> Any:
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    async def stream_ndjson(self, filters: ExecutionFilters, include_response_text: bool = True) -> AsyncIterator[str]:
+        buffer: list[str] = []
+        async for row in self.iter_rows(filters, include_response_text):
+            buffer.append(json.dumps({key: self._serialize(value) for key, value in row.items()}))
+            if len(buffer) >= settings.export_batch_size:
+                yield "\n".join(buffer) + "\n"
+                buffer.clear()
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+    async def stream_csv(self, filters: ExecutionFilters, include_response_text: bool = True) -> AsyncIterator[str]:
+        columns = EXPORT_COLUMNS if include_response_text else EXPORT_COLUMNS[:-1]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(columns)
+
+        rows = 0
+        async for row in self.iter_rows(filters, include_response_text):
+            writer.writerow([self._serialize(row[column]) for column in columns])
+            rows += 1
+            if rows % settings.export_batch_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        yield output.getvalue()
+
+
+export_service = ExportService()
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any
+
+try:
+    from backend.config import settings
+    from backend.database import pool_status
+    from backend.services.cache_service import shared_cache_tier
+    from backend.services.job_service import job_worker
+    from backend.services.llm_service import llm_service
+    from backend.services.pipeline_service import execution_pipeline
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import pool_status
+    from services.cache_service import shared_cache_tier
+    from services.job_service import job_worker
+    from services.llm_service import llm_service
+    from services.pipeline_service import execution_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+# Each serving process reports on itself; with a shared cache path it also publishes a heartbeat,
+# so any worker can list the live workers on its host.
+class WorkerHealth:
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = max(0.5, interval_seconds)
+        self._shared = shared_cache_tier("workers")
+        self._started_at = datetime.now(timezone.utc)
+        self._started = monotonic()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def worker_id(self) -> str:
+        # Read per call: a pre-forking server may import this module before the workers fork.
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "pid": os.getpid(),
+            "started_at": self._started_at.isoformat(),
+            "uptime_seconds": monotonic() - self._started,
+            "heartbeat_at": datetime.now(timezone.utc).isoformat(),
+            "pipeline_running": execution_pipeline.running,
+            "pipeline_queue_depths": execution_pipeline.queue_depths(),
+            "job_worker_running": job_worker.running,
+            "in_flight_generations": len(llm_service.in_flight),
+            "db_pool": pool_status(),
+        }
+
+    async def list_workers(self) -> list[dict[str, Any]]:
+        workers = {}
+        if self._shared is not None:
+            try:
+                workers = {key: json.loads(value) for key, value in (await self._shared.entries()).items()}
+            except Exception as exc:
+                logger.warning("Failed to read worker heartbeats: %s", exc)
+        workers[self.worker_id] = self.snapshot()
+        return sorted(workers.values(), key=lambda worker: worker["worker_id"])
+
+    async def _beat(self) -> None:
+        while True:
+            try:
+                # Missing three beats in a row drops the worker from the list.
+                await self._shared.set(
+                    self.worker_id, json.dumps(self.snapshot()), ttl_seconds=3 * self.interval_seconds
+                )
+            except Exception as exc:
+                logger.warning("Worker heartbeat failed: %s", exc)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._shared is not None and self._task is None:
+            self._task = asyncio.create_task(self._beat())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        try:
+            await self._shared.delete(self.worker_id)
+        except Exception as exc:
+            logger.warning("Failed to clear worker heartbeat: %s", exc)
+
+
+worker_health = WorkerHealth(settings.worker_heartbeat_interval_seconds)
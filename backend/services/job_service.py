@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Job
+    from backend.schemas import EvaluationScores, ExecutionResponse, ExecutionWithEvaluationResponse
+    from backend.services.dataset_service import dataset_service
+    from backend.services.execution_service import build_batch_response, execution_service
+    from backend.services.experiment_service import experiment_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Job
+    from schemas import EvaluationScores, ExecutionResponse, ExecutionWithEvaluationResponse
+    from services.dataset_service import dataset_service
+    from services.execution_service import build_batch_response, execution_service
+    from services.experiment_service import experiment_service
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = {JOB_SUCCEEDED, JOB_FAILED}
+
+JobHandler = Callable[[dict[str, Any], AsyncSession], Awaitable[dict[str, Any]]]
+
+
+class JobServiceError(Exception):
+    pass
+
+
+class JobService:
+    def __init__(self) -> None:
+        self._handlers: dict[str, JobHandler] = {}
+        self._submitted = asyncio.Event()
+        self._finished: dict[UUID, asyncio.Event] = {}
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    async def submit(self, db: AsyncSession, kind: str, payload: dict[str, Any]) -> Job:
+        if kind not in self._handlers:
+            raise JobServiceError(f"Unknown job kind: {kind}")
+        job = Job(kind=kind, status=JOB_QUEUED, payload=json.dumps(payload, separators=(",", ":")))
+        db.add(job)
+        await db.commit()
+        self._submitted.set()
+        return job
+
+    @staticmethod
+    async def get(db: AsyncSession, job_id: UUID) -> Job | None:
+        return await db.get(Job, job_id, populate_existing=True)
+
+    async def wait_for_submission(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._submitted.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._submitted.clear()
+
+    async def claim(self, worker_id: str) -> Job | None:
+        async with AsyncSessionLocal() as db:
+            candidate_ids = (
+                await db.scalars(
+                    select(Job.id).where(Job.status == JOB_QUEUED).order_by(Job.created_at).limit(10)
+                )
+            ).all()
+            # The status guard makes the claim atomic even without row locks, so several
+            # workers (or processes) can poll the same table safely.
+            for job_id in candidate_ids:
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JOB_QUEUED)
+                    .values(
+                        status=JOB_RUNNING,
+                        worker_id=worker_id,
+                        lease_token=uuid.uuid4(),
+                        started_at=datetime.now(timezone.utc),
+                        lease_expires_at=self._lease_deadline(),
+                        attempts=Job.attempts + 1,
+                    )
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    return await db.get(Job, job_id)
+        return None
+
+    @staticmethod
+    def _lease_deadline() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=settings.job_lease_seconds)
+
+    async def _renew_lease(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(settings.job_lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(Job)
+                        .where(Job.id == job.id, Job.status == JOB_RUNNING, Job.lease_token == job.lease_token)
+                        .values(lease_expires_at=self._lease_deadline())
+                    )
+                    await db.commit()
+                if result.rowcount == 0:
+                    logger.warning("Job %s is no longer leased by this slot of %s", job.id, job.worker_id)
+                    return
+            except Exception as exc:
+                logger.warning("Failed to renew lease of job %s: %s", job.id, exc)
+
+    async def run(self, job: Job) -> None:
+        handler = self._handlers.get(job.kind)
+        values: dict[str, Any] = {}
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        try:
+            if handler is None:
+                raise JobServiceError(f"Unknown job kind: {job.kind}")
+            async with AsyncSessionLocal() as db:
+                result = await handler(json.loads(job.payload), db)
+            values.update(status=JOB_SUCCEEDED, result=json.dumps(result, separators=(",", ":")))
+        except Exception as exc:
+            logger.warning("Job %s (%s) failed: %s", job.id, job.kind, exc)
+            values.update(status=JOB_FAILED, error=str(exc) or exc.__class__.__name__)
+        finally:
+            heartbeat.cancel()
+        values.update(finished_at=datetime.now(timezone.utc), lease_expires_at=None)
+
+        async with AsyncSessionLocal() as db:
+            # Guarded on the lease: a job requeued to another slot, even in this process, keeps that
+            # slot's outcome.
+            result = await db.execute(
+                update(Job).where(Job.id == job.id, Job.lease_token == job.lease_token).values(**values)
+            )
+            await db.commit()
+        if result.rowcount == 0:
+            logger.warning("Job %s finished after its lease passed to another worker", job.id)
+
+        event = self._finished.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def requeue_expired(self, max_attempts: int) -> int:
+        # Only jobs whose worker stopped renewing the lease are touched; live jobs are never rerun.
+        now = datetime.now(timezone.utc)
+        expired = and_(
+            Job.status == JOB_RUNNING,
+            or_(
+                Job.lease_expires_at < now,
+                # Rows claimed before leases existed.
+                and_(
+                    Job.lease_expires_at.is_(None),
+                    Job.started_at < now - timedelta(seconds=settings.job_lease_seconds),
+                ),
+            ),
+        )
+        async with AsyncSessionLocal() as db:
+            failed = await db.execute(
+                update(Job)
+                .where(expired, Job.attempts >= max_attempts)
+                .values(
+                    status=JOB_FAILED,
+                    error=f"Job lease expired after {max_attempts} attempts.",
+                    lease_expires_at=None,
+                    finished_at=now,
+                )
+            )
+            requeued = await db.execute(
+                update(Job)
+                .where(expired)
+                .values(
+                    status=JOB_QUEUED, worker_id=None, lease_token=None, started_at=None, lease_expires_at=None
+                )
+            )
+            await db.commit()
+        if failed.rowcount:
+            logger.warning("Failed %s jobs that exhausted their attempts", failed.rowcount)
+        if requeued.rowcount:
+            logger.info("Requeued %s jobs with expired leases", requeued.rowcount)
+            self._submitted.set()
+        return requeued.rowcount
+
+    async def _wait_for_change(self, job_id: UUID, timeout: float) -> None:
+        # Jobs finished by this process wake waiters immediately; others are seen on the next poll.
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait(self, db: AsyncSession, job_id: UUID, timeout: float) -> Job | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = await self.get(db, job_id)
+            remaining = deadline - loop.time()
+            if job is None or job.status in TERMINAL_STATUSES:
+                self._finished.pop(job_id, None)
+                return job
+            if remaining <= 0:
+                return job
+            await db.rollback()
+            await self._wait_for_change(job_id, min(settings.job_poll_interval_seconds, remaining))
+
+    async def watch(self, job_id: UUID) -> AsyncIterator[Job | None]:
+        last_status: str | None = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                job = await self.get(db, job_id)
+            if job is None:
+                self._finished.pop(job_id, None)
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield job
+                if job.status in TERMINAL_STATUSES:
+                    self._finished.pop(job_id, None)
+                    return
+            else:
+                yield None
+            await self._wait_for_change(job_id, settings.job_poll_interval_seconds)
+
+
+class JobWorker:
+    def __init__(self, concurrency: int, poll_interval_seconds: float) -> None:
+        self.concurrency = max(1, concurrency)
+        self.poll_interval_seconds = poll_interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._reap_expired()),
+            *(asyncio.create_task(self._loop()) for _ in range(self.concurrency)),
+        ]
+        logger.info("Job worker %s started with %s slots", self.worker_id, self.concurrency)
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _reap_expired() -> None:
+        # Every worker reaps, so jobs of a dead process are picked up without waiting for a restart.
+        while True:
+            try:
+                await job_service.requeue_expired(settings.job_max_attempts)
+            except Exception as exc:
+                logger.warning("Failed to requeue expired jobs: %s", exc)
+            await asyncio.sleep(settings.job_lease_seconds)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                job = await job_service.claim(self.worker_id)
+            except Exception as exc:
+                logger.warning("Failed to claim job: %s", exc)
+                job = None
+            if job is None:
+                await job_service.wait_for_submission(self.poll_interval_seconds)
+                continue
+            await job_service.run(job)
+
+
+async def _run_execute(payload: dict[str, Any], db: AsyncSession) -> dict[str, Any]:
+    execution, evaluation = await execution_service.execute_prompt_version(
+        version_id=UUID(payload["version_id"]),
+        db=db,
+        use_cache=payload.get("use_cache", True),
+        variables=payload.get("variables"),
+    )
+    return ExecutionWithEvaluationResponse(
+        execution=ExecutionResponse.model_validate(execution),
+        evaluation=EvaluationScores.model_validate(evaluation),
+    ).model_dump(mode="json")
+
+
+async def _run_batch(payload: dict[str, Any], db: AsyncSession) -> dict[str, Any]:
+    outcomes = await execution_service.execute_batch(
+        items=[(UUID(version_id), repeat) for version_id, repeat in payload["items"]],
+        db=db,
+        concurrency=payload.get("concurrency"),
+        use_cache=payload.get("use_cache", True),
+    )
+    return build_batch_response(outcomes).model_dump(mode="json")
+
+
+job_service = JobService()
+job_service.register("execute", _run_execute)
+job_service.register("execute_batch", _run_batch)
+job_service.register("dataset_run", dataset_service.execute_run)
+job_service.register("experiment", experiment_service.execute)
+
+job_worker = JobWorker(
+    concurrency=settings.job_worker_concurrency,
+    poll_interval_seconds=settings.job_poll_interval_seconds,
+)
@@ -1,57 +1,303 @@
 import asyncio
 import logging
-
-import google.generativeai as genai
+from collections.abc import AsyncIterator
+from time import perf_counter
+from typing import Any
 
 try:
     from backend.config import settings
+    from backend.services.cache_service import SingleFlight, generation_cache
+    from backend.services.metrics_service import (
+        LLM_CIRCUIT_REJECTIONS,
+        LLM_FAILURES,
+        LLM_REQUEST_SECONDS,
+        LLM_RETRIES,
+    )
+    from backend.services.provider_service import (
+        LLMProvider,
+        ProviderHTTPError,
+        configured_model_name,
+        create_provider,
+    )
+    from backend.services.rate_limit_service import (
+        CIRCUIT_OPEN,
+        AdaptiveRateLimiter,
+        Backoff,
+        CircuitBreaker,
+        CircuitOpenError,
+    )
 except ModuleNotFoundError as exc:
     if exc.name != "backend":
         raise
     from config import settings
+    from services.cache_service import SingleFlight, generation_cache
+    from services.metrics_service import (
+        LLM_CIRCUIT_REJECTIONS,
+        LLM_FAILURES,
+        LLM_REQUEST_SECONDS,
+        LLM_RETRIES,
+    )
+    from services.provider_service import (
+        LLMProvider,
+        ProviderHTTPError,
+        configured_model_name,
+        create_provider,
+    )
+    from services.rate_limit_service import (
+        CIRCUIT_OPEN,
+        AdaptiveRateLimiter,
+        Backoff,
+        CircuitBreaker,
+        CircuitOpenError,
+    )
 
 logger = logging.getLogger(__name__)
 
+RATE_LIMITED_STATUS_CODE = 429
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
 
 class LLMServiceError(Exception):
     pass
 
 
 class LLMService:
-    def __init__(self) -> None:
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel(settings.gemini_model_name)
+    def __init__(self, provider: LLMProvider | None = None) -> None:
+        self._provider = provider
+        self.model_name = provider.model_name if provider else configured_model_name(settings)
         self.timeout_seconds = settings.llm_timeout_seconds
+        self.stream_idle_timeout_seconds = settings.llm_stream_idle_timeout_seconds
         self.max_retries = settings.llm_max_retries
+        self._semaphore = asyncio.Semaphore(max(1, settings.llm_max_concurrency))
+        self.rate_limiter = AdaptiveRateLimiter(settings.llm_requests_per_minute, settings.llm_tokens_per_minute)
+        self.circuit_breaker = CircuitBreaker(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_seconds)
+        self.backoff = Backoff(settings.llm_backoff_base_seconds, settings.llm_backoff_max_seconds)
+        self.in_flight: SingleFlight[str, str] = SingleFlight("generation")
+
+    # Built on first use so importing the app, and serving read-only endpoints, never touches the provider.
+    @property
+    def provider(self) -> LLMProvider:
+        if self._provider is None:
+            self._provider = create_provider(settings)
+        return self._provider
+
+    async def aclose(self) -> None:
+        if self._provider is not None:
+            await self._provider.aclose()
+
+    @staticmethod
+    def _estimate_tokens(prompt: str, params: dict[str, Any] | None) -> int:
+        # Roughly four characters per token, plus the output budget the request allows.
+        output_tokens = (params or {}).get("maxOutputTokens", settings.llm_estimated_output_tokens)
+        return len(prompt) // 4 + int(output_tokens)
+
+    def _settle_usage(self, estimated_tokens: int, total_tokens: int | None) -> None:
+        if total_tokens is not None:
+            self.rate_limiter.settle(estimated_tokens, total_tokens)
+
+    def _check_configured(self) -> None:
+        error = self.provider.configuration_error()
+        if error:
+            raise LLMServiceError(error)
+
+    async def _before_attempt(self, estimated_tokens: int) -> None:
+        try:
+            self.circuit_breaker.before_call()
+        except CircuitOpenError as exc:
+            LLM_CIRCUIT_REJECTIONS.inc()
+            raise LLMServiceError(str(exc)) from exc
+        try:
+            await self.rate_limiter.acquire(estimated_tokens)
+        except BaseException:
+            self.circuit_breaker.release()
+            raise
+
+    def _on_success(self, started: float) -> None:
+        LLM_REQUEST_SECONDS.observe(perf_counter() - started, provider=self.provider.name, outcome="success")
+        self.circuit_breaker.record_success()
+        self.rate_limiter.on_success()
+
+    @staticmethod
+    def _failure_reason(exc: Exception) -> str:
+        if isinstance(exc, ProviderHTTPError):
+            if exc.status_code == RATE_LIMITED_STATUS_CODE:
+                return "rate_limited"
+            return "server_error" if exc.status_code in RETRYABLE_STATUS_CODES else "client_error"
+        if isinstance(exc, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(exc, LLMServiceError):
+            return "empty_response"
+        return "error"
+
+    def _on_failure(self, exc: Exception, started: float) -> tuple[bool, float | None]:
+        # Returns whether the request is worth retrying and any server-requested delay.
+        reason = self._failure_reason(exc)
+        LLM_REQUEST_SECONDS.observe(perf_counter() - started, provider=self.provider.name, outcome=reason)
+        LLM_FAILURES.inc(reason=reason)
+        status_code = exc.status_code if isinstance(exc, ProviderHTTPError) else None
+        if status_code == RATE_LIMITED_STATUS_CODE:
+            self.rate_limiter.on_rate_limited(exc.retry_after)
+            self.circuit_breaker.release()
+            return True, exc.retry_after
+        if status_code is not None and status_code not in RETRYABLE_STATUS_CODES:
+            # The request itself was rejected; the provider is healthy and retrying will not help.
+            self.circuit_breaker.release()
+            return False, None
+        if isinstance(exc, LLMServiceError):
+            self.circuit_breaker.release()
+        else:
+            self.circuit_breaker.record_failure()
+        return True, None
+
+    async def _should_retry(self, exc: Exception, attempt: int, started: float) -> bool:
+        retryable, retry_after = self._on_failure(exc, started)
+        if isinstance(exc, asyncio.TimeoutError):
+            logger.warning("%s timeout on attempt %s", self.provider.name, attempt + 1)
+        else:
+            logger.warning("%s failure on attempt %s: %s", self.provider.name, attempt + 1, exc)
+        if not retryable or attempt >= self.max_retries or self.circuit_breaker.state == CIRCUIT_OPEN:
+            return False
+        LLM_RETRIES.inc(reason=self._failure_reason(exc))
+        await asyncio.sleep(self.backoff.delay(attempt, min(retry_after or 0.0, self.backoff.max_seconds)))
+        return True
+
+    async def _generate_once(self, prompt: str, params: dict[str, Any] | None, estimated_tokens: int = 0) -> str:
+        completion = await self.provider.generate(prompt, params)
+        self._settle_usage(estimated_tokens, completion.total_tokens)
+        return completion.text
+
+    async def _stream_once(
+        self, prompt: str, params: dict[str, Any] | None, estimated_tokens: int = 0
+    ) -> AsyncIterator[str]:
+        total_tokens: int | None = None
+        loop = asyncio.get_running_loop()
+        # A stalled upstream raises asyncio.TimeoutError, which the breaker counts as a failure.
+        deadline = loop.time() + self.timeout_seconds
+        stream = self.provider.stream(prompt, params)
+        try:
+            while True:
+                try:
+                    completion = await asyncio.wait_for(anext(stream), timeout=max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                # Usage is cumulative, so the last reported total is the request's total.
+                if completion.total_tokens is not None:
+                    total_tokens = completion.total_tokens
+                if completion.text:
+                    deadline = loop.time() + self.stream_idle_timeout_seconds
+                    yield completion.text
+        finally:
+            await stream.aclose()
+        self._settle_usage(estimated_tokens, total_tokens)
+
+    async def generate_text(
+        self, prompt: str, params: dict[str, Any] | None = None, use_cache: bool = True, coalesce: bool = True
+    ) -> str:
+        # Callers that bypass the cache want a fresh sample, so they are not coalesced either.
+        if not use_cache:
+            return await self._generate_with_retries(prompt, params)
 
-    async def generate_text(self, prompt: str) -> str:
-        if not settings.gemini_api_key:
-            raise LLMServiceError("GEMINI_API_KEY is not set.")
+        cache_key = generation_cache.make_key(self.model_name, prompt, params)
+        if generation_cache.enabled:
+            cached = await generation_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
+        if settings.coalesce_enabled and coalesce:
+            return await self.in_flight.run(cache_key, lambda: self._generate_and_cache(cache_key, prompt, params))
+        return await self._generate_and_cache(cache_key, prompt, params)
+
+    async def _generate_and_cache(self, cache_key: str, prompt: str, params: dict[str, Any] | None) -> str:
+        text = await self._generate_with_retries(prompt, params)
+        if generation_cache.enabled:
+            await generation_cache.set(cache_key, self.model_name, text)
+        return text
+
+    async def stream_text(
+        self, prompt: str, params: dict[str, Any] | None = None, use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        cache_key: str | None = None
+        if use_cache and generation_cache.enabled:
+            cache_key = generation_cache.make_key(self.model_name, prompt, params)
+            cached = await generation_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        self._check_configured()
+
+        parts: list[str] = []
         last_error: Exception | None = None
 
         for attempt in range(self.max_retries + 1):
+            estimated_tokens = self._estimate_tokens(prompt, params)
+            await self._before_attempt(estimated_tokens)
+            started = perf_counter()
             try:
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(self.model.generate_content, prompt),
-                    timeout=self.timeout_seconds,
-                )
-                text = (response.text or "").strip()
-                if not text:
-                    raise LLMServiceError("Gemini returned an empty response.")
-                return text
-            except asyncio.TimeoutError as exc:
+                async with self._semaphore:
+                    started = perf_counter()
+                    async for chunk in self._stream_once(prompt, params, estimated_tokens):
+                        parts.append(chunk)
+                        yield chunk
+            except Exception as exc:
                 last_error = exc
-                logger.warning("Gemini timeout on attempt %s", attempt + 1)
-                if attempt < self.max_retries:
-                    await asyncio.sleep(min(2**attempt, 4))
+                # Chunks already forwarded to the caller cannot be taken back, so only
+                # failures before the first chunk are retried.
+                if parts:
+                    self._on_failure(exc, started)
+                    raise LLMServiceError(f"{self.provider.name} stream interrupted: {exc}") from exc
+                if not await self._should_retry(exc, attempt, started):
+                    break
+                continue
+            except BaseException:
+                # Cancelled, or the consumer closed the stream: no verdict on the provider, but a
+                # half-open trial must not stay claimed.
+                self.circuit_breaker.release()
+                raise
+            self._on_success(started)
+            last_error = None
+            break
+
+        if last_error is not None and not parts:
+            raise LLMServiceError(f"{self.provider.name} request failed after retries: {last_error}")
+
+        text = "".join(parts).strip()
+        if not text:
+            raise LLMServiceError(f"{self.provider.name} returned an empty response.")
+        if cache_key is not None:
+            await generation_cache.set(cache_key, self.model_name, text)
+
+    async def _generate_with_retries(self, prompt: str, params: dict[str, Any] | None) -> str:
+        self._check_configured()
+
+        last_error: Exception | None = None
+
+        for attempt in range(self.max_retries + 1):
+            estimated_tokens = self._estimate_tokens(prompt, params)
+            await self._before_attempt(estimated_tokens)
+            started = perf_counter()
+            try:
+                async with self._semaphore:
+                    started = perf_counter()
+                    raw = await asyncio.wait_for(
+                        self._generate_once(prompt, params, estimated_tokens), timeout=self.timeout_seconds
+                    )
+                text = raw.strip()
+                if not text:
+                    raise LLMServiceError(f"{self.provider.name} returned an empty response.")
             except Exception as exc:
                 last_error = exc
-                logger.warning("Gemini failure on attempt %s: %s", attempt + 1, exc)
-                if attempt < self.max_retries:
-                    await asyncio.sleep(min(2**attempt, 4))
+                if not await self._should_retry(exc, attempt, started):
+                    break
+                continue
+            except BaseException:
+                # A cancelled attempt says nothing about the provider, but must free a half-open trial.
+                self.circuit_breaker.release()
+                raise
+            self._on_success(started)
+            return text
 
-        raise LLMServiceError(f"Gemini request failed after retries: {last_error}")
+        raise LLMServiceError(f"{self.provider.name} request failed after retries: {last_error}")
 
 
 llm_service = LLMService()
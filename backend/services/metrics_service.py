@@ -0,0 +1,230 @@
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Iterator
+
+# Minimal Prometheus text-format registry. Metrics live in process memory and are rendered on
+# scrape; collectors run first so gauges that mirror external state (pool usage) are current.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        with self._lock:
+            samples = self._samples()
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type_name}\n"
+        return header + "".join(f"{sample}\n" for sample in samples)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        samples = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                samples.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            samples.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            samples.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _register(self, metric: Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "llmops_http_request_duration_seconds",
+    "HTTP request latency by route template, including streamed bodies.",
+    ("method", "route", "status"),
+)
+PIPELINE_STAGE_SECONDS = metrics.histogram(
+    "llmops_pipeline_stage_duration_seconds",
+    "Time spent in each execution pipeline stage (per job for generate, per batch otherwise).",
+    ("stage",),
+)
+PIPELINE_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "llmops_pipeline_queue_wait_seconds",
+    "Time jobs wait in a pipeline queue before a worker picks them up.",
+    ("stage",),
+)
+PIPELINE_QUEUE_DEPTH = metrics.gauge("llmops_pipeline_queue_depth", "Jobs waiting in each pipeline queue.", ("stage",))
+DB_OPERATION_SECONDS = metrics.histogram(
+    "llmops_db_operation_duration_seconds", "Duration of database flushes and commits on the write path.", ("operation",)
+)
+DB_POOL_CHECKOUTS = metrics.counter("llmops_db_pool_checkouts_total", "Connections checked out of the pool.")
+DB_POOL_CONNECTIONS = metrics.counter("llmops_db_pool_connections_total", "New DBAPI connections opened by the pool.")
+DB_POOL_STATE = metrics.gauge("llmops_db_pool_connections", "Pool connections by state.", ("state",))
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llmops_llm_request_duration_seconds", "Latency of individual LLM provider attempts.", ("provider", "outcome")
+)
+LLM_RETRIES = metrics.counter("llmops_llm_retries_total", "LLM attempts that were retried, by reason.", ("reason",))
+LLM_FAILURES = metrics.counter("llmops_llm_failures_total", "LLM attempts that failed, by reason.", ("reason",))
+LLM_CIRCUIT_REJECTIONS = metrics.counter(
+    "llmops_llm_circuit_rejections_total", "LLM calls rejected without a request because the circuit was open."
+)
+CACHE_REQUESTS = metrics.counter("llmops_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+STARTUP_PHASE_SECONDS = metrics.gauge(
+    "llmops_startup_phase_seconds", "Time each phase of the last process startup took.", ("phase",)
+)
+COALESCED_REQUESTS = metrics.counter(
+    "llmops_coalesced_requests_total", "Calls that joined an identical in-flight call instead of repeating it.", ("layer",)
+)
+
+
+# Pure ASGI (rather than BaseHTTPMiddleware) so streamed responses are timed to their last byte.
+class MetricsMiddleware:
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code,
+            )
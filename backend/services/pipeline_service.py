@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from time import perf_counter
+from uuid import UUID
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+try:
+    from backend.config import settings
+    from backend.database import AsyncSessionLocal
+    from backend.models import Evaluation, Execution
+    from backend.services.blob_service import blob_service
+    from backend.services.evaluation_service import EvaluationResult, evaluation_service
+    from backend.services.llm_service import llm_service
+    from backend.services.metrics_service import (
+        DB_OPERATION_SECONDS,
+        PIPELINE_QUEUE_DEPTH,
+        PIPELINE_QUEUE_WAIT_SECONDS,
+        PIPELINE_STAGE_SECONDS,
+        metrics,
+    )
+    from backend.services.stats_service import stats_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import AsyncSessionLocal
+    from models import Evaluation, Execution
+    from services.blob_service import blob_service
+    from services.evaluation_service import EvaluationResult, evaluation_service
+    from services.llm_service import llm_service
+    from services.metrics_service import (
+        DB_OPERATION_SECONDS,
+        PIPELINE_QUEUE_DEPTH,
+        PIPELINE_QUEUE_WAIT_SECONDS,
+        PIPELINE_STAGE_SECONDS,
+        metrics,
+    )
+    from services.stats_service import stats_service
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineError(Exception):
+    pass
+
+
+@dataclass
+class PipelineJob:
+    version_id: UUID
+    content: str
+    future: asyncio.Future = field(repr=False)
+    use_cache: bool = True
+    # Off for callers that want independent samples of the same prompt (repeats, dataset rows,
+    # experiment arms); identical concurrent generations would otherwise share one provider call.
+    coalesce: bool = True
+    # Bulk callers let the judge score this response in one prompt with others queued alongside;
+    # interactive executions are judged alone so their scores do not depend on load.
+    pack_evaluation: bool = False
+    response_text: str = ""
+    response_time: float = 0.0
+    time_to_first_token: float | None = None
+    eval_result: EvaluationResult | None = None
+    evaluation_time: float | None = None
+    coalesced_from_id: UUID | None = None
+    dataset_run_id: UUID | None = None
+    dataset_row_id: UUID | None = None
+    experiment_id: UUID | None = None
+    enqueued_at: float = 0.0
+
+
+def build_execution_rows(job: PipelineJob) -> tuple[Execution, Evaluation]:
+    eval_result = job.eval_result
+    now = datetime.now(timezone.utc)
+    execution = Execution(
+        id=uuid.uuid4(),
+        prompt_version_id=job.version_id,
+        response_text=job.response_text,
+        response_time=job.response_time,
+        time_to_first_token=job.time_to_first_token,
+        coalesced_from_id=job.coalesced_from_id,
+        dataset_run_id=job.dataset_run_id,
+        dataset_row_id=job.dataset_row_id,
+        experiment_id=job.experiment_id,
+        created_at=now,
+    )
+    evaluation = Evaluation(
+        id=uuid.uuid4(),
+        execution_id=execution.id,
+        accuracy_score=eval_result.accuracy,
+        clarity_score=eval_result.clarity,
+        hallucination_score=eval_result.hallucination_risk,
+        overall_score=eval_result.overall_score,
+        evaluator_model=evaluation_service.model_name,
+        evaluator_template_version=evaluation_service.template_version,
+        response_hash=eval_result.response_hash,
+        evaluation_time=job.evaluation_time,
+        created_at=now,
+    )
+    return execution, evaluation
+
+
+# Generation workers -> evaluation workers -> batched DB writer, joined by bounded queues.
+# Only the writer touches the database, and only for one short transaction per batch,
+# so no pooled connection is held across LLM round trips.
+class ExecutionPipeline:
+    def __init__(
+        self,
+        generation_workers: int,
+        evaluation_workers: int,
+        queue_size: int,
+        write_batch_size: int,
+        evaluation_batch_size: int = 1,
+    ) -> None:
+        self.generation_workers = max(1, generation_workers)
+        self.evaluation_workers = max(1, evaluation_workers)
+        self.queue_size = max(1, queue_size)
+        self.write_batch_size = max(1, write_batch_size)
+        self.evaluation_batch_size = max(1, evaluation_batch_size)
+
+        self._generation_queue: asyncio.Queue[PipelineJob] | None = None
+        self._evaluation_queue: asyncio.Queue[PipelineJob] | None = None
+        self._write_queue: asyncio.Queue[PipelineJob] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._start_lock: asyncio.Lock | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.running:
+                return
+
+            self._generation_queue = asyncio.Queue(maxsize=self.queue_size)
+            self._evaluation_queue = asyncio.Queue(maxsize=self.queue_size)
+            self._write_queue = asyncio.Queue(maxsize=self.queue_size)
+
+            self._tasks = [
+                *(asyncio.create_task(self._generation_worker()) for _ in range(self.generation_workers)),
+                *(asyncio.create_task(self._evaluation_worker()) for _ in range(self.evaluation_workers)),
+                asyncio.create_task(self._writer()),
+            ]
+            logger.info(
+                "Execution pipeline started (generation=%s, evaluation=%s, queue=%s)",
+                self.generation_workers,
+                self.evaluation_workers,
+                self.queue_size,
+            )
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for queue in (self._generation_queue, self._evaluation_queue, self._write_queue):
+            while queue is not None and not queue.empty():
+                self._fail(queue.get_nowait(), PipelineError("Execution pipeline shut down."))
+
+    def _queues(self) -> dict[str, asyncio.Queue[PipelineJob] | None]:
+        return {
+            "generation": self._generation_queue,
+            "evaluation": self._evaluation_queue,
+            "write": self._write_queue,
+        }
+
+    async def _put(self, stage: str, job: PipelineJob) -> None:
+        job.enqueued_at = perf_counter()
+        await self._queues()[stage].put(job)
+
+    @staticmethod
+    def _picked_up(stage: str, job: PipelineJob) -> PipelineJob:
+        PIPELINE_QUEUE_WAIT_SECONDS.observe(perf_counter() - job.enqueued_at, stage=stage)
+        return job
+
+    def queue_depths(self) -> dict[str, int]:
+        return {stage: queue.qsize() if queue is not None else 0 for stage, queue in self._queues().items()}
+
+    def collect_metrics(self) -> None:
+        for stage, depth in self.queue_depths().items():
+            PIPELINE_QUEUE_DEPTH.set(depth, stage=stage)
+
+    async def _enqueue(self, stage: str, job: PipelineJob) -> tuple[Execution, Evaluation]:
+        if not self.running:
+            await self.start()
+        await self._put(stage, job)
+        return await job.future
+
+    async def submit(
+        self,
+        version_id: UUID,
+        content: str,
+        use_cache: bool = True,
+        dataset_run_id: UUID | None = None,
+        dataset_row_id: UUID | None = None,
+        experiment_id: UUID | None = None,
+        coalesce: bool = True,
+        pack_evaluation: bool = False,
+    ) -> tuple[Execution, Evaluation]:
+        future = asyncio.get_running_loop().create_future()
+        return await self._enqueue(
+            "generation",
+            PipelineJob(
+                version_id=version_id,
+                content=content,
+                future=future,
+                use_cache=use_cache,
+                coalesce=coalesce,
+                pack_evaluation=pack_evaluation,
+                dataset_run_id=dataset_run_id,
+                dataset_row_id=dataset_row_id,
+                experiment_id=experiment_id,
+            ),
+        )
+
+    async def submit_generated(
+        self,
+        version_id: UUID,
+        response_text: str,
+        response_time: float,
+        time_to_first_token: float | None = None,
+    ) -> tuple[Execution, Evaluation]:
+        # For text generated outside the pipeline (e.g. streamed to a client): evaluate and persist only.
+        future = asyncio.get_running_loop().create_future()
+        return await self._enqueue(
+            "evaluation",
+            PipelineJob(
+                version_id=version_id,
+                content="",
+                future=future,
+                response_text=response_text,
+                response_time=response_time,
+                time_to_first_token=time_to_first_token,
+            ),
+        )
+
+    async def submit_evaluated(
+        self, execution: Execution, eval_result: EvaluationResult, coalesced_from_id: UUID | None = None
+    ) -> tuple[Execution, Evaluation]:
+        # Records another execution from an already generated and judged result.
+        future = asyncio.get_running_loop().create_future()
+        return await self._enqueue(
+            "write",
+            PipelineJob(
+                version_id=execution.prompt_version_id,
+                content="",
+                future=future,
+                response_text=execution.response_text,
+                response_time=execution.response_time,
+                time_to_first_token=execution.time_to_first_token,
+                eval_result=eval_result,
+                coalesced_from_id=coalesced_from_id,
+            ),
+        )
+
+    @staticmethod
+    def _fail(job: PipelineJob, exc: BaseException) -> None:
+        if not job.future.done():
+            job.future.set_exception(exc)
+
+    async def _generation_worker(self) -> None:
+        while True:
+            job = self._picked_up("generation", await self._generation_queue.get())
+            if job.future.done():
+                continue
+            try:
+                start_time = perf_counter()
+                job.response_text = await llm_service.generate_text(
+                    job.content, use_cache=job.use_cache, coalesce=job.coalesce
+                )
+                job.response_time = perf_counter() - start_time
+            except Exception as exc:
+                self._fail(job, exc)
+                continue
+            finally:
+                PIPELINE_STAGE_SECONDS.observe(perf_counter() - start_time, stage="generate")
+            await self._put("evaluation", job)
+
+    async def _evaluate(self, batch: list[PipelineJob]) -> None:
+        start_time = perf_counter()
+        try:
+            results = await evaluation_service.evaluate_batch([job.response_text for job in batch])
+        except Exception as exc:
+            for job in batch:
+                self._fail(job, exc)
+            return
+        finally:
+            evaluation_time = perf_counter() - start_time
+            PIPELINE_STAGE_SECONDS.observe(evaluation_time, stage="evaluate")
+
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                self._fail(job, result)
+                continue
+            job.eval_result = result
+            # A batch's wall time is not any one item's; items judged together record none.
+            job.evaluation_time = evaluation_time if len(batch) == 1 else None
+            await self._put("write", job)
+
+    async def _evaluation_worker(self) -> None:
+        while True:
+            # Packable jobs already queued are judged together, up to the evaluator's batch size;
+            # any other job picked up meanwhile is judged alone.
+            first = self._picked_up("evaluation", await self._evaluation_queue.get())
+            picked = [first]
+            while first.pack_evaluation and len(picked) < self.evaluation_batch_size:
+                try:
+                    picked.append(self._picked_up("evaluation", self._evaluation_queue.get_nowait()))
+                except asyncio.QueueEmpty:
+                    break
+            picked = [job for job in picked if not job.future.done()]
+            packed = [job for job in picked if job.pack_evaluation]
+            groups = [[job] for job in picked if not job.pack_evaluation]
+            if packed:
+                groups.append(packed)
+            await asyncio.gather(*(self._evaluate(group) for group in groups))
+
+    async def _writer(self) -> None:
+        while True:
+            batch = [self._picked_up("write", await self._write_queue.get())]
+            while len(batch) < self.write_batch_size:
+                try:
+                    batch.append(self._picked_up("write", self._write_queue.get_nowait()))
+                except asyncio.QueueEmpty:
+                    break
+
+            with PIPELINE_STAGE_SECONDS.time(stage="persist"):
+                await self._persist(batch)
+
+    async def _persist(self, batch: list[PipelineJob]) -> None:
+        try:
+            rows = await self._write_batch(batch)
+        except Exception as exc:
+            if len(batch) == 1:
+                logger.exception("Failed to persist execution")
+                self._fail(batch[0], PipelineError(f"Failed to persist execution: {exc}"))
+                return
+            # The executions are already generated and judged; halve the batch until only the rows
+            # that cannot be written fail.
+            logger.warning("Failed to persist %s executions, retrying in halves: %s", len(batch), exc)
+            middle = len(batch) // 2
+            await self._persist(batch[:middle])
+            await self._persist(batch[middle:])
+            return
+
+        for job, row in zip(batch, rows):
+            if not job.future.done():
+                job.future.set_result(row)
+
+    @staticmethod
+    async def _write_batch(batch: list[PipelineJob]) -> list[tuple[Execution, Evaluation]]:
+        rows = [build_execution_rows(job) for job in batch]
+        async with AsyncSessionLocal() as db:
+            try:
+                if blob_service.enabled:
+                    hashes = await blob_service.store(db, {job.response_text for job in batch})
+                    for execution, _ in rows:
+                        execution.response_hash = hashes[execution.response_text]
+                        execution.response_text = ""
+                db.add_all([execution for execution, _ in rows])
+                with DB_OPERATION_SECONDS.time(operation="flush"):
+                    await db.flush()
+                db.add_all([evaluation for _, evaluation in rows])
+                await stats_service.record(db, rows)
+                with DB_OPERATION_SECONDS.time(operation="commit"):
+                    await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        if blob_service.enabled:
+            # Callers get the full text back without it being written inline.
+            for job, (execution, _) in zip(batch, rows):
+                set_committed_value(execution, "response_text", job.response_text)
+        return rows
+
+
+execution_pipeline = ExecutionPipeline(
+    generation_workers=settings.pipeline_generation_workers,
+    evaluation_workers=settings.pipeline_evaluation_workers,
+    queue_size=settings.pipeline_queue_size,
+    write_batch_size=settings.pipeline_write_batch_size,
+    evaluation_batch_size=settings.evaluation_batch_size,
+)
+metrics.register_collector(execution_pipeline.collect_metrics)
@@ -0,0 +1,332 @@
+import codecs
+import hashlib
+import json
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.models import Prompt, PromptVersion
+    from backend.services.cache_service import LRUCache
+    from backend.services.metrics_service import CACHE_REQUESTS
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from models import Prompt, PromptVersion
+    from services.cache_service import LRUCache
+    from services.metrics_service import CACHE_REQUESTS
+
+
+class PromptServiceError(Exception):
+    pass
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+@dataclass
+class ImportLine:
+    line_number: int
+    prompt_id: UUID | None
+    prompt_name: str | None
+    content: str
+    content_hash: str
+
+
+@dataclass
+class ImportSummary:
+    lines: int = 0
+    prompts_created: int = 0
+    versions_created: int = 0
+    duplicates: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    error_count: int = 0
+
+
+@dataclass(frozen=True)
+class CachedVersion:
+    prompt_id: UUID
+    content: str
+
+
+# Versions are immutable and prompts are never renamed, so lookups by id can be served from
+# memory. Only positive results are cached: a prompt or version created by another worker is
+# found on the next lookup.
+class PromptCache:
+    def __init__(self, enabled: bool, max_entries: int, ttl_seconds: float | None) -> None:
+        self.enabled = enabled
+        self._versions: LRUCache[UUID, CachedVersion] = LRUCache(max_entries, ttl_seconds)
+        self._prompts: LRUCache[UUID, bool] = LRUCache(max_entries, ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, cache: str, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+    def remember_prompt(self, prompt_id: UUID) -> None:
+        if self.enabled:
+            self._prompts.set(prompt_id, True)
+
+    def remember_version(self, version: PromptVersion) -> None:
+        if self.enabled:
+            self._versions.set(version.id, CachedVersion(version.prompt_id, version.content))
+            self._prompts.set(version.prompt_id, True)
+
+    async def get_versions(self, db: AsyncSession, version_ids: set[UUID]) -> dict[UUID, CachedVersion]:
+        found: dict[UUID, CachedVersion] = {}
+        missing = set()
+        for version_id in version_ids:
+            cached = self._versions.get(version_id) if self.enabled else None
+            if cached is None:
+                missing.add(version_id)
+            else:
+                found[version_id] = cached
+            self._record("prompt_version", cached is not None)
+        if missing:
+            rows = await db.execute(
+                select(PromptVersion.id, PromptVersion.prompt_id, PromptVersion.content).where(
+                    PromptVersion.id.in_(missing)
+                )
+            )
+            for version_id, prompt_id, content in rows:
+                found[version_id] = CachedVersion(prompt_id, content)
+                if self.enabled:
+                    self._versions.set(version_id, found[version_id])
+        return found
+
+    async def get_version(self, db: AsyncSession, version_id: UUID) -> CachedVersion | None:
+        return (await self.get_versions(db, {version_id})).get(version_id)
+
+    async def prompt_exists(self, db: AsyncSession, prompt_id: UUID) -> bool:
+        if self.enabled and self._prompts.get(prompt_id):
+            self._record("prompt", True)
+            return True
+        self._record("prompt", False)
+        exists = await db.scalar(select(Prompt.id).where(Prompt.id == prompt_id)) is not None
+        if exists:
+            self.remember_prompt(prompt_id)
+        return exists
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "versions": len(self._versions),
+            "prompts": len(self._prompts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class PromptService:
+    @staticmethod
+    async def allocate_version_numbers(db: AsyncSession, prompt_id: UUID, count: int = 1) -> int:
+        # Reserves `count` consecutive version numbers and returns the first. The increment is a
+        # single UPDATE, so concurrent writers serialize on the prompt row instead of racing on
+        # max(version_number) and colliding on uq_prompt_version_number.
+        latest = (
+            select(func.max(PromptVersion.version_number))
+            .where(PromptVersion.prompt_id == Prompt.id)
+            .scalar_subquery()
+        )
+        last = await db.scalar(
+            update(Prompt)
+            .where(Prompt.id == prompt_id)
+            .values(version_counter=func.coalesce(Prompt.version_counter, latest, 0) + count)
+            .returning(Prompt.version_counter)
+        )
+        if last is None:
+            raise PromptServiceError("Prompt not found.")
+        return last - count + 1
+
+    async def create_version(self, db: AsyncSession, prompt_id: UUID, content: str) -> PromptVersion:
+        version_number = await self.allocate_version_numbers(db, prompt_id)
+        version = PromptVersion(
+            prompt_id=prompt_id,
+            version_number=version_number,
+            content=content,
+            content_hash=content_hash(content),
+        )
+        db.add(version)
+        await db.commit()
+        await db.refresh(version)
+        prompt_cache.remember_version(version)
+        return version
+
+    @staticmethod
+    def _parse_line(line_number: int, line: str) -> ImportLine:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"invalid JSON: {exc.msg}") from exc
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object")
+
+        content = record.get("content")
+        if not isinstance(content, str) or not content:
+            raise ValueError("'content' must be a non-empty string")
+        prompt_id: UUID | None = None
+        prompt_name: str | None = None
+        if record.get("prompt_id") is not None:
+            try:
+                prompt_id = UUID(str(record["prompt_id"]))
+            except ValueError as exc:
+                raise ValueError("'prompt_id' is not a valid UUID") from exc
+        else:
+            prompt_name = record.get("prompt")
+            if not isinstance(prompt_name, str) or not 1 <= len(prompt_name) <= 255:
+                raise ValueError("'prompt' must be a name of 1-255 characters, or give 'prompt_id'")
+        return ImportLine(line_number, prompt_id, prompt_name, content, content_hash(content))
+
+    @staticmethod
+    def _record_error(summary: ImportSummary, line_number: int, message: str) -> None:
+        summary.error_count += 1
+        if len(summary.errors) < settings.prompt_import_max_errors:
+            summary.errors.append((line_number, message))
+
+    @staticmethod
+    async def _resolve_prompts(db: AsyncSession, batch: list[ImportLine], summary: ImportSummary) -> None:
+        names = {item.prompt_name for item in batch if item.prompt_id is None}
+        ids_by_name: dict[str, UUID] = {}
+        if names:
+            # Names are not unique; an import targets the oldest prompt with that name.
+            rows = await db.execute(
+                select(Prompt.name, Prompt.id).where(Prompt.name.in_(names)).order_by(Prompt.created_at.desc())
+            )
+            ids_by_name = {name: prompt_id for name, prompt_id in rows}
+            now = datetime.now(timezone.utc)
+            missing = [{"id": uuid.uuid4(), "name": name, "created_at": now} for name in names - ids_by_name.keys()]
+            if missing:
+                await db.execute(insert(Prompt), missing)
+                ids_by_name.update((row["name"], row["id"]) for row in missing)
+                summary.prompts_created += len(missing)
+
+        explicit_ids = {item.prompt_id for item in batch if item.prompt_id is not None}
+        known_ids = set()
+        if explicit_ids:
+            known_ids = set((await db.scalars(select(Prompt.id).where(Prompt.id.in_(explicit_ids)))).all())
+        for item in batch:
+            if item.prompt_id is None:
+                item.prompt_id = ids_by_name[item.prompt_name]
+            elif item.prompt_id not in known_ids:
+                item.prompt_id = None
+
+    @staticmethod
+    async def _existing_hashes(db: AsyncSession, prompt_ids: set[UUID]) -> set[tuple[UUID, str]]:
+        # Versions written before content_hash existed are hashed once, on first import.
+        legacy = (
+            await db.execute(
+                select(PromptVersion.id, PromptVersion.content).where(
+                    PromptVersion.prompt_id.in_(prompt_ids), PromptVersion.content_hash.is_(None)
+                )
+            )
+        ).all()
+        if legacy:
+            await db.execute(
+                update(PromptVersion),
+                [{"id": version_id, "content_hash": content_hash(content)} for version_id, content in legacy],
+            )
+        rows = await db.execute(
+            select(PromptVersion.prompt_id, PromptVersion.content_hash).where(PromptVersion.prompt_id.in_(prompt_ids))
+        )
+        return {(prompt_id, digest) for prompt_id, digest in rows}
+
+    async def _import_batch(
+        self, db: AsyncSession, batch: list[ImportLine], dedup: bool, summary: ImportSummary
+    ) -> None:
+        await self._resolve_prompts(db, batch, summary)
+        resolved = []
+        for item in batch:
+            if item.prompt_id is None:
+                self._record_error(summary, item.line_number, "prompt not found")
+            else:
+                resolved.append(item)
+
+        seen = await self._existing_hashes(db, {item.prompt_id for item in resolved}) if dedup else set()
+        by_prompt: dict[UUID, list[ImportLine]] = {}
+        for item in resolved:
+            key = (item.prompt_id, item.content_hash)
+            if key in seen:
+                summary.duplicates += 1
+                continue
+            if dedup:
+                seen.add(key)
+            by_prompt.setdefault(item.prompt_id, []).append(item)
+
+        rows: list[dict[str, Any]] = []
+        now = datetime.now(timezone.utc)
+        for prompt_id, items in by_prompt.items():
+            first = await self.allocate_version_numbers(db, prompt_id, len(items))
+            rows.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "prompt_id": prompt_id,
+                    "version_number": first + offset,
+                    "content": item.content,
+                    "content_hash": item.content_hash,
+                    "created_at": now,
+                }
+                for offset, item in enumerate(items)
+            )
+        if rows:
+            await db.execute(insert(PromptVersion), rows)
+        await db.commit()
+        summary.versions_created += len(rows)
+
+    async def import_jsonl(self, db: AsyncSession, lines: AsyncIterator[str], dedup: bool = True) -> ImportSummary:
+        # Each batch is one transaction: prompts are resolved or created, version numbers reserved
+        # per prompt, and all versions written in one multi-row insert.
+        summary = ImportSummary()
+        batch: list[ImportLine] = []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            summary.lines += 1
+            try:
+                batch.append(self._parse_line(line_number, line))
+            except ValueError as exc:
+                self._record_error(summary, line_number, str(exc))
+                continue
+            if len(batch) >= settings.prompt_import_batch_size:
+                await self._import_batch(db, batch, dedup, summary)
+                batch = []
+        if batch:
+            await self._import_batch(db, batch, dedup, summary)
+        return summary
+
+
+prompt_cache = PromptCache(
+    enabled=settings.prompt_cache_enabled,
+    max_entries=settings.prompt_cache_max_entries,
+    ttl_seconds=settings.prompt_cache_ttl_seconds,
+)
+prompt_service = PromptService()
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+try:
+    from backend.config import Settings
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import Settings
+
+# httpx is only needed once a real provider makes its first request, so it is not imported here.
+if TYPE_CHECKING:
+    import httpx
+
+
+class ProviderHTTPError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: float | None = None) -> None:
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+@dataclass
+class Completion:
+    text: str
+    total_tokens: int | None = None
+
+
+# A provider only turns a prompt into text. Retries, rate limiting, caching and coalescing
+# live in LLMService so they behave the same for every provider.
+class LLMProvider(ABC):
+    name: str
+    model_name: str
+
+    @staticmethod
+    @abstractmethod
+    def configured_model_name(settings: Settings) -> str:
+        ...
+
+    def configuration_error(self) -> str | None:
+        return None
+
+    @abstractmethod
+    async def generate(self, prompt: str, params: dict[str, Any] | None) -> Completion:
+        ...
+
+    @abstractmethod
+    def stream(self, prompt: str, params: dict[str, Any] | None) -> AsyncIterator[Completion]:
+        ...
+
+    async def aclose(self) -> None:
+        return None
+
+
+class GeminiProvider(LLMProvider):
+    name = "Gemini"
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.model_name = self.configured_model_name(settings)
+        self._client: "httpx.AsyncClient | None" = None
+
+    @staticmethod
+    def configured_model_name(settings: Settings) -> str:
+        return settings.gemini_model_name
+
+    def configuration_error(self) -> str | None:
+        return None if self.settings.gemini_api_key else "GEMINI_API_KEY is not set."
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.settings.gemini_api_base_url,
+                headers={"x-goog-api-key": self.settings.gemini_api_key},
+                timeout=httpx.Timeout(self.settings.llm_timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=self.settings.llm_max_connections,
+                    max_keepalive_connections=self.settings.llm_max_keepalive_connections,
+                    keepalive_expiry=self.settings.llm_keepalive_expiry_seconds,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _request_body(prompt: str, params: dict[str, Any] | None) -> dict[str, Any]:
+        body: dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if params:
+            body["generationConfig"] = params
+        return body
+
+    @staticmethod
+    def _extract_text(payload: dict[str, Any]) -> str:
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    @staticmethod
+    def _total_tokens(payload: dict[str, Any] | None) -> int | None:
+        usage = (payload or {}).get("usageMetadata") or {}
+        return int(usage["totalTokenCount"]) if "totalTokenCount" in usage else None
+
+    @staticmethod
+    def _raise_for_status(response: "httpx.Response") -> None:
+        if response.is_success:
+            return
+        try:
+            retry_after = float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            retry_after = None
+        raise ProviderHTTPError(response.status_code, response.reason_phrase, retry_after)
+
+    async def generate(self, prompt: str, params: dict[str, Any] | None) -> Completion:
+        response = await self._get_client().post(
+            f"/models/{self.model_name}:generateContent", json=self._request_body(prompt, params)
+        )
+        self._raise_for_status(response)
+        payload = response.json()
+        return Completion(text=self._extract_text(payload), total_tokens=self._total_tokens(payload))
+
+    async def stream(self, prompt: str, params: dict[str, Any] | None) -> AsyncIterator[Completion]:
+        async with self._get_client().stream(
+            "POST",
+            f"/models/{self.model_name}:streamGenerateContent",
+            params={"alt": "sse"},
+            json=self._request_body(prompt, params),
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+            self._raise_for_status(response)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[len("data:"):])
+                yield Completion(text=self._extract_text(payload), total_tokens=self._total_tokens(payload))
+
+
+_WORDS = (
+    "the model response covers context latency queue prompt version evaluation score pipeline result "
+    "token cache batch request worker signal metric trace sample baseline variance budget"
+).split()
+_RESPONSE_TAG = re.compile(r"<response index=(\d+)>\n(.*?)\n</response>", re.DOTALL)
+
+
+# Offline stand-in for load tests: no network, seeded latency and failures, and output that is a
+# pure function of the prompt. Judge prompts are recognised so evaluation parses as usual.
+class FakeProvider(LLMProvider):
+    name = "Fake LLM"
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.model_name = self.configured_model_name(settings)
+        self._random = random.Random(settings.fake_llm_seed)
+
+    @staticmethod
+    def configured_model_name(settings: Settings) -> str:
+        return settings.fake_llm_model_name
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _scores(self, text: str) -> dict[str, int]:
+        digest = self._digest(text)
+        return {"accuracy": 50 + digest[0] % 51, "clarity": 50 + digest[1] % 51, "hallucination_risk": digest[2] % 51}
+
+    def _respond(self, prompt: str) -> str:
+        if "hallucination_risk" in prompt:
+            items = _RESPONSE_TAG.findall(prompt)
+            if items:
+                return json.dumps([{"index": int(index), **self._scores(text)} for index, text in items])
+            return json.dumps(self._scores(prompt))
+
+        seed = int.from_bytes(self._digest(prompt)[:8], "big")
+        rng = random.Random(seed)
+        return " ".join(rng.choice(_WORDS) for _ in range(max(1, self.settings.fake_llm_output_words)))
+
+    def _latency(self) -> float:
+        median = self.settings.fake_llm_latency_median_ms / 1000
+        if median <= 0:
+            return 0.0
+        return self._random.lognormvariate(0.0, self.settings.fake_llm_latency_sigma) * median
+
+    def _maybe_fail(self) -> None:
+        roll = self._random.random()
+        if roll < self.settings.fake_llm_rate_limit_rate:
+            raise ProviderHTTPError(429, "Too Many Requests", retry_after=1.0)
+        if roll < self.settings.fake_llm_rate_limit_rate + self.settings.fake_llm_error_rate:
+            raise ProviderHTTPError(503, "Service Unavailable")
+
+    def _completion(self, prompt: str, text: str) -> Completion:
+        return Completion(text=text, total_tokens=(len(prompt) + len(text)) // 4)
+
+    async def generate(self, prompt: str, params: dict[str, Any] | None) -> Completion:
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self._completion(prompt, self._respond(prompt))
+
+    async def stream(self, prompt: str, params: dict[str, Any] | None) -> AsyncIterator[Completion]:
+        latency = self._latency()
+        self._maybe_fail()
+        text = self._respond(prompt)
+        chunks = max(1, self.settings.fake_llm_stream_chunks)
+        size = -(-len(text) // chunks)
+        for start in range(0, len(text), size):
+            await asyncio.sleep(latency / chunks)
+            chunk = Completion(text=text[start : start + size])
+            if start + size >= len(text):
+                chunk.total_tokens = self._completion(prompt, text).total_tokens
+            yield chunk
+
+
+PROVIDERS: dict[str, type[LLMProvider]] = {
+    "gemini": GeminiProvider,
+    "fake": FakeProvider,
+}
+
+
+def create_provider(settings: Settings) -> LLMProvider:
+    return PROVIDERS[settings.llm_provider](settings)
+
+
+def configured_model_name(settings: Settings) -> str:
+    # The model name feeds cache keys and evaluator bookkeeping, which must not force the
+    # provider (and its HTTP client) into existence.
+    return PROVIDERS[settings.llm_provider].configured_model_name(settings)
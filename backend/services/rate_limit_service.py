@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = max(1.0, float(per_minute))
+        self.max_rate = self.capacity / 60.0
+        self.rate = self.max_rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        # Takes the tokens now (possibly going negative) and returns how long the caller must wait,
+        # so concurrent callers queue up behind each other instead of racing for the refill.
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= min(amount, self.capacity)
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        self._refill(time.monotonic())
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+# Requests/min and tokens/min buckets whose refill rate backs off multiplicatively on 429s and
+# recovers additively on success (AIMD), plus a shared pause honouring Retry-After.
+class AdaptiveRateLimiter:
+    MIN_RATE_FRACTION = 0.1
+    DECREASE_FACTOR = 0.5
+    INCREASE_FRACTION = 0.02
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+
+    @property
+    def _buckets(self) -> list[TokenBucket]:
+        return [bucket for bucket in (self.requests, self.tokens) if bucket is not None]
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        delay = self._paused_until - time.monotonic()
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if self.tokens is not None and actual_tokens != estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def on_success(self) -> None:
+        for bucket in self._buckets:
+            bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * self.INCREASE_FRACTION)
+
+    def on_rate_limited(self, retry_after: float | None) -> None:
+        for bucket in self._buckets:
+            bucket.rate = max(bucket.max_rate * self.MIN_RATE_FRACTION, bucket.rate * self.DECREASE_FACTOR)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(
+            "LLM provider rate limited; request rate now %.1f/min",
+            self.requests.rate * 60 if self.requests is not None else 0.0,
+        )
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == CIRCUIT_CLOSED:
+            return
+        if self.state == CIRCUIT_OPEN:
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"LLM provider circuit is open; retry in {remaining:.0f}s.")
+            self.state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+        # Half-open lets a single trial call through; everything else keeps failing fast.
+        if self._trial_in_flight:
+            raise CircuitOpenError("LLM provider circuit is half-open; a trial request is in flight.")
+        self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != CIRCUIT_CLOSED:
+            logger.info("LLM provider circuit closed")
+        self.state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != CIRCUIT_OPEN:
+                logger.warning("LLM provider circuit opened after %s consecutive failures", self._failures)
+            self.state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        # The call ended without saying anything about provider health (e.g. a 400 or a 429).
+        self._trial_in_flight = False
+
+
+@dataclass
+class Backoff:
+    base_seconds: float
+    max_seconds: float
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        # Full jitter keeps retrying callers from synchronising into waves.
+        delay = random.uniform(0, min(self.max_seconds, self.base_seconds * 2**attempt))
+        return max(delay, retry_after or 0.0)
@@ -0,0 +1,216 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import and_, delete, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.config import settings
+    from backend.models import Evaluation, Execution, PromptVersion, ResponseBlob
+    from backend.services.blob_service import resolve_response_text, with_response_text
+    from backend.services.stats_service import stats_service
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from models import Evaluation, Execution, PromptVersion, ResponseBlob
+    from services.blob_service import resolve_response_text, with_response_text
+    from services.stats_service import stats_service
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = (
+    Execution.id.label("execution_id"),
+    PromptVersion.prompt_id,
+    Execution.prompt_version_id,
+    PromptVersion.version_number,
+    Execution.response_time,
+    Execution.time_to_first_token,
+    Execution.coalesced_from_id,
+    Execution.dataset_run_id,
+    Execution.dataset_row_id,
+    Execution.experiment_id,
+    Execution.created_at,
+    Evaluation.accuracy_score,
+    Evaluation.clarity_score,
+    Evaluation.hallucination_score,
+    Evaluation.overall_score,
+    Evaluation.evaluator_model,
+    Evaluation.evaluator_template_version,
+    Evaluation.evaluation_time,
+)
+
+
+@dataclass
+class RetentionSummary:
+    archived_executions: int = 0
+    pruned_responses: int = 0
+    deleted_blobs: int = 0
+    archive_files: list[str] = field(default_factory=list)
+
+
+def _serialize(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _write_gzip_member(path: Path, lines: list[str]) -> None:
+    # One gzip member per batch: the archive stays readable with gzip.open however many batches
+    # are appended to it.
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            archive.write(("\n".join(lines) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _append_member(path: Path, pending: Path) -> None:
+    with open(path, "ab") as raw:
+        raw.write(pending.read_bytes())
+        raw.flush()
+        os.fsync(raw.fileno())
+    pending.unlink()
+
+
+# Every step runs in short transactions of at most batch_size rows with a pause between them,
+# so retention can run next to live traffic without holding long locks.
+class RetentionService:
+    def __init__(
+        self, response_days: int, archive_days: int, archive_dir: str, batch_size: int, pause_seconds: float
+    ) -> None:
+        self.response_days = response_days
+        self.archive_days = archive_days
+        self.archive_dir = Path(archive_dir)
+        self.batch_size = max(1, batch_size)
+        self.pause_seconds = pause_seconds
+
+    @staticmethod
+    async def _delete_orphan_blobs(db: AsyncSession, hashes: Iterable[str | None]) -> int:
+        hashes = {digest for digest in hashes if digest}
+        if not hashes:
+            return 0
+        result = await db.execute(
+            delete(ResponseBlob).where(
+                ResponseBlob.hash.in_(hashes),
+                ~exists().where(Execution.response_hash == ResponseBlob.hash),
+            )
+        )
+        return result.rowcount or 0
+
+    async def archive(self, db: AsyncSession, cutoff: datetime, summary: RetentionSummary) -> None:
+        # Writes executions older than the cutoff, with their evaluations and response text, to a
+        # compressed JSONL file, folds their metrics into the archived stats and deletes them.
+        path = self.archive_dir / f"executions-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.jsonl.gz"
+        # Each batch is on disk before its rows are deleted, but joins the archive only once the
+        # delete is committed. A .pending file left by a crash may hold rows still in the database.
+        pending = path.with_name(f"{path.name}.pending")
+        stmt = with_response_text(
+            select(*ARCHIVE_COLUMNS)
+            .join(PromptVersion, PromptVersion.id == Execution.prompt_version_id)
+            .outerjoin(Evaluation, Evaluation.execution_id == Execution.id)
+            .where(Execution.created_at < cutoff)
+            .order_by(Execution.created_at, Execution.id)
+            .limit(self.batch_size)
+        )
+        while True:
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                await db.rollback()
+                return
+            memo: dict[str, str] = {}
+            lines = []
+            for row in rows:
+                record = {
+                    column: _serialize(value)
+                    for column, value in row._mapping.items()
+                    if column not in {"inline_response_text", "response_hash", "response_codec", "response_data"}
+                }
+                record["response_text"] = resolve_response_text(row, memo=memo)
+                lines.append(json.dumps(record, separators=(",", ":")))
+            if not summary.archive_files:
+                self.archive_dir.mkdir(parents=True, exist_ok=True)
+                summary.archive_files.append(str(path))
+            await asyncio.to_thread(_write_gzip_member, pending, lines)
+
+            try:
+                # Rows without an evaluation never reached the version stats either.
+                await stats_service.archive(db, (row for row in rows if row.overall_score is not None))
+                ids = [row.execution_id for row in rows]
+                await db.execute(
+                    update(Execution).where(Execution.coalesced_from_id.in_(ids)).values(coalesced_from_id=None)
+                )
+                await db.execute(delete(Evaluation).where(Evaluation.execution_id.in_(ids)))
+                await db.execute(delete(Execution).where(Execution.id.in_(ids)))
+                deleted_blobs = await self._delete_orphan_blobs(db, (row.response_hash for row in rows))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                pending.unlink(missing_ok=True)
+                raise
+            await asyncio.to_thread(_append_member, path, pending)
+            summary.deleted_blobs += deleted_blobs
+            summary.archived_executions += len(rows)
+            logger.info("Archived %s executions to %s", summary.archived_executions, path)
+            await asyncio.sleep(self.pause_seconds)
+
+    async def prune_responses(self, db: AsyncSession, cutoff: datetime, summary: RetentionSummary) -> None:
+        # Drops the response text of executions older than the cutoff; scores, timings and links stay.
+        last: tuple[datetime, Any] | None = None
+        while True:
+            stmt = select(Execution.id, Execution.created_at, Execution.response_hash).where(
+                Execution.created_at < cutoff,
+                or_(Execution.response_hash.is_not(None), Execution.response_text != ""),
+            )
+            # Keyset on (created_at, id) so each batch starts where the last one ended.
+            if last is not None:
+                stmt = stmt.where(
+                    or_(
+                        Execution.created_at > last[0],
+                        and_(Execution.created_at == last[0], Execution.id > last[1]),
+                    )
+                )
+            rows = (await db.execute(stmt.order_by(Execution.created_at, Execution.id).limit(self.batch_size))).all()
+            if not rows:
+                await db.rollback()
+                return
+            await db.execute(
+                update(Execution)
+                .where(Execution.id.in_([row.id for row in rows]))
+                .values(response_text="", response_hash=None)
+            )
+            summary.deleted_blobs += await self._delete_orphan_blobs(db, (row.response_hash for row in rows))
+            await db.commit()
+            summary.pruned_responses += len(rows)
+            last = (rows[-1].created_at, rows[-1].id)
+            logger.info("Pruned response text of %s executions", summary.pruned_responses)
+            await asyncio.sleep(self.pause_seconds)
+
+    async def apply(self, db: AsyncSession, now: datetime | None = None) -> RetentionSummary:
+        now = now or datetime.now(timezone.utc)
+        summary = RetentionSummary()
+        # Archiving first leaves fewer rows for pruning to touch.
+        if self.archive_days > 0:
+            await self.archive(db, now - timedelta(days=self.archive_days), summary)
+        if self.response_days > 0:
+            await self.prune_responses(db, now - timedelta(days=self.response_days), summary)
+        return summary
+
+
+retention_service = RetentionService(
+    response_days=settings.retention_response_days,
+    archive_days=settings.retention_archive_days,
+    archive_dir=settings.retention_archive_dir,
+    batch_size=settings.retention_batch_size,
+    pause_seconds=settings.retention_batch_pause_seconds,
+)
@@ -0,0 +1,306 @@
+import json
+import logging
+import math
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from backend.models import ArchivedMetricStats, Evaluation, Execution, PromptVersion, VersionMetricStats
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from models import ArchivedMetricStats, Evaluation, Execution, PromptVersion, VersionMetricStats
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced histogram buckets: each bucket spans a factor of GAMMA, so any quantile read
+# back from the histogram is within ~2.5% of the true value regardless of scale.
+GAMMA = 1.05
+_LOG_GAMMA = math.log(GAMMA)
+ZERO_BUCKET = "z"
+
+# Extractors may return None for values a row does not have (e.g. TTFT of non-streamed executions).
+METRICS: dict[str, Callable[[Execution, Evaluation], float | None]] = {
+    "response_time": lambda execution, evaluation: execution.response_time,
+    "time_to_first_token": lambda execution, evaluation: execution.time_to_first_token,
+    "accuracy_score": lambda execution, evaluation: evaluation.accuracy_score,
+    "clarity_score": lambda execution, evaluation: evaluation.clarity_score,
+    "hallucination_score": lambda execution, evaluation: evaluation.hallucination_score,
+    "overall_score": lambda execution, evaluation: evaluation.overall_score,
+}
+
+
+def _bucket(value: float) -> str:
+    if value <= 0:
+        return ZERO_BUCKET
+    return str(math.ceil(math.log(value) / _LOG_GAMMA))
+
+
+def _bucket_value(bucket: str) -> float:
+    if bucket == ZERO_BUCKET:
+        return 0.0
+    return 2 * GAMMA ** int(bucket) / (GAMMA + 1)
+
+
+@dataclass
+class MetricAccumulator:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min_value: float = math.inf
+    max_value: float = -math.inf
+    histogram: Counter = field(default_factory=Counter)
+
+    def add(self, value: float) -> None:
+        # Welford's online update.
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min_value = min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+        self.histogram[_bucket(value)] += 1
+
+    def merge(self, other: "MetricAccumulator") -> None:
+        # Chan et al. pairwise combination of two Welford states.
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+        self.histogram.update(other.histogram)
+
+    @classmethod
+    def from_row(cls, row: VersionMetricStats | ArchivedMetricStats) -> "MetricAccumulator":
+        return cls(
+            count=row.count,
+            mean=row.mean,
+            m2=row.m2,
+            min_value=row.min_value,
+            max_value=row.max_value,
+            histogram=Counter(json.loads(row.histogram or "{}")),
+        )
+
+    def values(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "histogram": json.dumps(dict(self.histogram), separators=(",", ":")),
+            "updated_at": datetime.now(timezone.utc),
+        }
+
+    def apply_to(self, row: VersionMetricStats | ArchivedMetricStats) -> None:
+        for name, value in self.values().items():
+            setattr(row, name, value)
+
+
+@dataclass
+class MetricSummary:
+    count: int
+    mean: float
+    stddev: float
+    min: float
+    max: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def percentile(histogram: dict[str, int], count: int, q: float, lower: float, upper: float) -> float:
+    if count == 0:
+        return 0.0
+    rank = q * (count - 1)
+    seen = 0
+    for bucket in sorted(histogram, key=lambda key: -math.inf if key == ZERO_BUCKET else int(key)):
+        seen += histogram[bucket]
+        if seen > rank:
+            return max(lower, min(upper, _bucket_value(bucket)))
+    return upper
+
+
+def summarize(row: VersionMetricStats) -> MetricSummary:
+    histogram = json.loads(row.histogram or "{}")
+    variance = row.m2 / (row.count - 1) if row.count > 1 else 0.0
+    return MetricSummary(
+        count=row.count,
+        mean=row.mean,
+        stddev=math.sqrt(max(variance, 0.0)),
+        min=row.min_value,
+        max=row.max_value,
+        p50=percentile(histogram, row.count, 0.50, row.min_value, row.max_value),
+        p95=percentile(histogram, row.count, 0.95, row.min_value, row.max_value),
+        p99=percentile(histogram, row.count, 0.99, row.min_value, row.max_value),
+    )
+
+
+class StatsService:
+    @staticmethod
+    def _accumulate(
+        rows: Iterable[tuple[Execution, Evaluation]],
+        accumulators: dict[tuple[UUID, str], MetricAccumulator] | None = None,
+    ) -> dict[tuple[UUID, str], MetricAccumulator]:
+        accumulators = {} if accumulators is None else accumulators
+        for execution, evaluation in rows:
+            for metric, extract in METRICS.items():
+                value = extract(execution, evaluation)
+                if value is None:
+                    continue
+                key = (execution.prompt_version_id, metric)
+                accumulators.setdefault(key, MetricAccumulator()).add(float(value))
+        return accumulators
+
+    @staticmethod
+    def _insert(db: AsyncSession, model: type[VersionMetricStats] | type[ArchivedMetricStats]) -> Any:
+        if db.get_bind().dialect.name == "postgresql":
+            return postgresql_insert(model)
+        return sqlite_insert(model)
+
+    @staticmethod
+    async def _locked_rows(
+        db: AsyncSession, model: type[VersionMetricStats] | type[ArchivedMetricStats], keys: Iterable[tuple[UUID, str]]
+    ) -> dict[tuple[UUID, str], VersionMetricStats | ArchivedMetricStats]:
+        keys = set(keys)
+        if not keys:
+            return {}
+        version_ids = {version_id for version_id, _ in keys}
+        rows = await db.scalars(select(model).where(model.prompt_version_id.in_(version_ids)).with_for_update())
+        locked = {(row.prompt_version_id, row.metric): row for row in rows.all()}
+        return {key: row for key, row in locked.items() if key in keys}
+
+    @staticmethod
+    async def _lock_versions(db: AsyncSession, version_ids: Iterable[UUID] | None) -> None:
+        # Merges and rebuilds of a version take its row lock first, in id order, so a rebuild never
+        # interleaves with a merge. NO KEY UPDATE leaves the key-share locks of execution inserts alone.
+        stmt = select(PromptVersion.id).order_by(PromptVersion.id).with_for_update(key_share=True)
+        if version_ids is not None:
+            stmt = stmt.where(PromptVersion.id.in_(set(version_ids)))
+        await db.execute(stmt)
+
+    async def _merge(
+        self,
+        db: AsyncSession,
+        model: type[VersionMetricStats] | type[ArchivedMetricStats],
+        accumulators: dict[tuple[UUID, str], MetricAccumulator],
+    ) -> None:
+        await self._lock_versions(db, {version_id for version_id, _ in accumulators})
+        existing = await self._locked_rows(db, model, accumulators)
+        missing = [key for key in accumulators if key not in existing]
+        if missing:
+            # Writers racing on a version's first executions may both find no row. The insert skips
+            # rows another writer created meanwhile; those are locked and merged into like the rest.
+            inserted = await db.execute(
+                self._insert(db, model)
+                .on_conflict_do_nothing(index_elements=["prompt_version_id", "metric"])
+                .returning(model.prompt_version_id, model.metric),
+                [
+                    {"prompt_version_id": version_id, "metric": metric, **accumulators[version_id, metric].values()}
+                    for version_id, metric in missing
+                ],
+            )
+            created = {tuple(row) for row in inserted.all()}
+            existing.update(await self._locked_rows(db, model, [key for key in missing if key not in created]))
+        for key, row in existing.items():
+            merged = MetricAccumulator.from_row(row)
+            merged.merge(accumulators[key])
+            merged.apply_to(row)
+
+    async def record(self, db: AsyncSession, rows: list[tuple[Execution, Evaluation]]) -> None:
+        accumulators = self._accumulate(rows)
+        if not accumulators:
+            return
+
+        # A savepoint keeps a stats conflict from failing the executions being written with it.
+        try:
+            async with db.begin_nested():
+                await self._merge(db, VersionMetricStats, accumulators)
+        except Exception as exc:
+            version_ids = {version_id for version_id, _ in accumulators}
+            logger.warning("Failed to update version stats for %s versions: %s", len(version_ids), exc)
+
+    async def archive(self, db: AsyncSession, rows: Iterable[Any]) -> None:
+        # Rows leaving the hot tables; live stats already include them, so only the archive side grows.
+        accumulators = self._accumulate((row, row) for row in rows)
+        if accumulators:
+            await self._merge(db, ArchivedMetricStats, accumulators)
+
+    async def rebuild(self, db: AsyncSession, version_ids: Iterable[UUID] | None = None) -> int:
+        delete_stmt = delete(VersionMetricStats)
+        # Only the metric columns are read; rows expose the same attribute names METRICS uses.
+        source = select(
+            Execution.prompt_version_id,
+            Execution.response_time,
+            Execution.time_to_first_token,
+            Evaluation.accuracy_score,
+            Evaluation.clarity_score,
+            Evaluation.hallucination_score,
+            Evaluation.overall_score,
+        ).join(Evaluation, Evaluation.execution_id == Execution.id)
+        if version_ids is not None:
+            version_ids = list(version_ids)
+            delete_stmt = delete_stmt.where(VersionMetricStats.prompt_version_id.in_(version_ids))
+            source = source.where(Execution.prompt_version_id.in_(version_ids))
+        archived_stmt = select(ArchivedMetricStats)
+        if version_ids is not None:
+            archived_stmt = archived_stmt.where(ArchivedMetricStats.prompt_version_id.in_(version_ids))
+        # Writers recording these versions wait until the rebuilt rows are committed and then merge
+        # into them; their executions are either in the snapshot below or merged afterwards, never both.
+        await self._lock_versions(db, version_ids)
+        await db.execute(delete_stmt)
+
+        # Archived executions are gone from the source query; their state is carried over instead.
+        accumulators: dict[tuple[UUID, str], MetricAccumulator] = {
+            (row.prompt_version_id, row.metric): MetricAccumulator.from_row(row)
+            for row in (await db.scalars(archived_stmt)).all()
+        }
+        processed = 0
+        result = await db.stream(source.execution_options(yield_per=1000))
+        async for row in result:
+            self._accumulate([(row, row)], accumulators)
+            processed += 1
+
+        for (version_id, metric), accumulator in accumulators.items():
+            row = VersionMetricStats(prompt_version_id=version_id, metric=metric)
+            accumulator.apply_to(row)
+            db.add(row)
+        return processed
+
+    @staticmethod
+    async def version_stats(
+        db: AsyncSession, prompt_id: UUID
+    ) -> list[tuple[PromptVersion, dict[str, MetricSummary]]]:
+        versions = (
+            await db.scalars(
+                select(PromptVersion).where(PromptVersion.prompt_id == prompt_id).order_by(PromptVersion.version_number)
+            )
+        ).all()
+        rows = (
+            await db.scalars(
+                select(VersionMetricStats)
+                .join(PromptVersion, PromptVersion.id == VersionMetricStats.prompt_version_id)
+                .where(PromptVersion.prompt_id == prompt_id)
+            )
+        ).all()
+
+        metrics: dict[UUID, dict[str, MetricSummary]] = {}
+        for row in rows:
+            metrics.setdefault(row.prompt_version_id, {})[row.metric] = summarize(row)
+        return [(version, metrics.get(version.id, {})) for version in versions]
+
+
+stats_service = StatsService()
@@ -0,0 +1,81 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+try:
+    from backend.config import settings
+    from backend.services.cache_service import LRUCache
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from services.cache_service import LRUCache
+
+# `{{ name }}` placeholders; any other braces are literal text.
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+
+class TemplateError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    # Literal text alternates with variable names: literals[0], names[0], literals[1], ...
+    literals: tuple[str, ...]
+    names: tuple[str, ...]
+
+    @property
+    def variables(self) -> frozenset[str]:
+        return frozenset(self.names)
+
+    def render(self, bindings: dict[str, Any] | None = None) -> str:
+        if not self.names:
+            return self.literals[0]
+        bindings = bindings or {}
+        missing = self.variables.difference(bindings)
+        if missing:
+            raise TemplateError(f"Missing template variables: {', '.join(sorted(missing))}")
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = bindings[name]
+            if value is None:
+                value = ""
+            elif not isinstance(value, str):
+                value = json.dumps(value)
+            parts.append(value)
+            parts.append(literal)
+        return "".join(parts)
+
+
+def compile_template(content: str) -> CompiledTemplate:
+    literals: list[str] = []
+    names: list[str] = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(content):
+        literals.append(content[position : match.start()])
+        names.append(match.group(1))
+        position = match.end()
+    literals.append(content[position:])
+    return CompiledTemplate(literals=tuple(literals), names=tuple(names))
+
+
+class TemplateService:
+    def __init__(self, max_entries: int) -> None:
+        # Version content never changes, so a compiled template is valid for the version's lifetime.
+        self._cache: LRUCache[UUID, CompiledTemplate] = LRUCache(max_entries)
+
+    def get(self, version_id: UUID, content: str) -> CompiledTemplate:
+        template = self._cache.get(version_id)
+        if template is None:
+            template = compile_template(content)
+            self._cache.set(version_id, template)
+        return template
+
+    def render(self, version_id: UUID, content: str, bindings: dict[str, Any] | None = None) -> str:
+        return self.get(version_id, content).render(bindings)
+
+
+template_service = TemplateService(max_entries=settings.template_cache_max_entries)
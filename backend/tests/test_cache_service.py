@@ -0,0 +1,39 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from backend.services.cache_service import SharedCacheTier
+
+
+def _stored(path: Path, namespace: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM shared_cache WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+
+def test_shared_tier_keeps_newest_entries_within_cap(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        path = tmp_path / "shared.db"
+        tier = SharedCacheTier(str(path), "evaluation", ttl_seconds=60, max_entries=20)
+        tier.PRUNE_EVERY = 5
+        for index in range(200):
+            await tier.set(f"key-{index}", "value")
+
+        assert _stored(path, "evaluation") < 20 + tier.PRUNE_EVERY
+        assert await tier.get("key-199") == "value"
+        assert await tier.get("key-0") is None
+
+    asyncio.run(scenario())
+
+
+def test_shared_tier_prunes_expired_entries(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        path = tmp_path / "shared.db"
+        tier = SharedCacheTier(str(path), "generation", ttl_seconds=0.01)
+        tier.PRUNE_EVERY = 1
+        await tier.set("stale", "value")
+        await asyncio.sleep(0.05)
+        await tier.set("fresh", "value", ttl_seconds=60)
+
+        assert _stored(path, "generation") == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,10 @@
+from backend.services.experiment_service import always_valid_p_value
+
+
+def test_zero_variance_is_inconclusive() -> None:
+    # Every pair differing by exactly the same amount must not read as p = 0.
+    assert always_valid_p_value(50, mean_diff=10.0, m2_diff=0.0, effect_size=0.5, previous=1.0) == 1.0
+
+
+def test_consistent_difference_becomes_significant() -> None:
+    assert always_valid_p_value(50, mean_diff=10.0, m2_diff=49 * 25.0, effect_size=0.5, previous=1.0) < 0.05
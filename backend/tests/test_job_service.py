@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.models import Base, Job
+from backend.services import job_service as job_module
+from backend.services.job_service import JOB_RUNNING, JobService
+
+
+def test_stale_slot_cannot_overwrite_a_reclaimed_job(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def scenario() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        monkeypatch.setattr(job_module, "AsyncSessionLocal", sessions)
+
+        service = JobService()
+
+        async def handler(payload, db):
+            return {"ok": True}
+
+        service.register("noop", handler)
+        async with sessions() as db:
+            await service.submit(db, "noop", {})
+
+        # Both claims come from slots of the same process, so they share a worker id.
+        stale = await service.claim("host:1")
+        async with sessions() as db:
+            await db.execute(
+                update(Job).values(lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await db.commit()
+        assert await service.requeue_expired(max_attempts=3) == 1
+        current = await service.claim("host:1")
+        assert current is not None and current.lease_token != stale.lease_token
+
+        await service.run(stale)
+        async with sessions() as db:
+            job = await service.get(db, current.id)
+        await engine.dispose()
+        assert job.status == JOB_RUNNING
+        assert job.lease_token == current.lease_token
+
+    asyncio.run(scenario())
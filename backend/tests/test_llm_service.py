@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+from backend.services.llm_service import LLMService, LLMServiceError
+from backend.services.provider_service import Completion, LLMProvider
+from backend.services.rate_limit_service import CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN
+
+
+class StubProvider(LLMProvider):
+    name = "Stub"
+    model_name = "stub"
+
+    def __init__(self) -> None:
+        self.hang = True
+
+    @staticmethod
+    def configured_model_name(settings: Any) -> str:
+        return "stub"
+
+    async def generate(self, prompt: str, params: dict[str, Any] | None) -> Completion:
+        if self.hang:
+            await asyncio.Event().wait()
+        return Completion(text=f"echo {prompt}")
+
+    async def stream(self, prompt: str, params: dict[str, Any] | None):
+        yield Completion(text="first ")
+        if self.hang:
+            await asyncio.Event().wait()
+        yield Completion(text="second")
+
+
+def _half_open_service() -> tuple[LLMService, StubProvider]:
+    provider = StubProvider()
+    service = LLMService(provider=provider)
+    service.timeout_seconds = 60
+    breaker = service.circuit_breaker
+    breaker.state = CIRCUIT_OPEN
+    breaker._opened_at = time.monotonic() - breaker.reset_seconds - 1
+    return service, provider
+
+
+def test_cancelled_half_open_trial_releases_circuit() -> None:
+    async def scenario() -> None:
+        service, provider = _half_open_service()
+        trial = asyncio.create_task(service.generate_text("trial", use_cache=False))
+        await asyncio.sleep(0.05)
+        assert service.circuit_breaker.state == CIRCUIT_HALF_OPEN
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+
+        provider.hang = False
+        assert await service.generate_text("next", use_cache=False) == "echo next"
+        assert service.circuit_breaker.state == CIRCUIT_CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_closed_stream_releases_half_open_trial() -> None:
+    async def scenario() -> None:
+        service, provider = _half_open_service()
+        stream = service.stream_text("trial", use_cache=False)
+        assert await stream.__anext__() == "first "
+        # An SSE client disconnect closes the generator mid-stream.
+        await stream.aclose()
+
+        provider.hang = False
+        assert await service.generate_text("next", use_cache=False) == "echo next"
+
+    asyncio.run(scenario())
+
+
+def test_stalled_stream_times_out_and_opens_the_circuit() -> None:
+    async def scenario() -> None:
+        service = LLMService(provider=StubProvider())
+        service.stream_idle_timeout_seconds = 0.05
+        service.circuit_breaker.failure_threshold = 1
+        stream = service.stream_text("stall", use_cache=False)
+        assert await stream.__anext__() == "first "
+        with pytest.raises(LLMServiceError):
+            await stream.__anext__()
+        assert service.circuit_breaker.state == CIRCUIT_OPEN
+
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+import asyncio
+import uuid
+
+from backend.services.pipeline_service import ExecutionPipeline, PipelineError, PipelineJob
+
+
+def test_failed_write_batch_only_fails_the_bad_rows() -> None:
+    async def scenario() -> None:
+        loop = asyncio.get_running_loop()
+        jobs = [
+            PipelineJob(version_id=uuid.uuid4(), content="", future=loop.create_future(), response_text=f"r{index}")
+            for index in range(7)
+        ]
+        bad = jobs[4]
+
+        async def write_batch(batch):
+            if bad in batch:
+                raise ValueError("bad row")
+            return [(job.response_text, None) for job in batch]
+
+        pipeline = ExecutionPipeline(generation_workers=1, evaluation_workers=1, queue_size=10, write_batch_size=8)
+        pipeline._write_batch = write_batch
+        await pipeline._persist(jobs)
+
+        assert isinstance(bad.future.exception(), PipelineError)
+        for job in jobs:
+            if job is not bad:
+                assert job.future.result() == (job.response_text, None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.models import Base, Execution, Prompt, PromptVersion
+from backend.services import retention_service as retention_module
+from backend.services.retention_service import RetentionService, RetentionSummary
+
+
+def test_failed_archive_batch_leaves_no_archived_copy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def scenario() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'retention.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        async with sessions() as db:
+            prompt = Prompt(id=uuid.uuid4(), name="old")
+            version = PromptVersion(id=uuid.uuid4(), prompt_id=prompt.id, version_number=1, content="c")
+            db.add_all([prompt, version])
+            await db.flush()
+            db.add(Execution(prompt_version_id=version.id, response_text="r", response_time=0.1, created_at=old))
+            await db.commit()
+
+        async def failing_archive(db, rows):
+            raise RuntimeError("commit would fail")
+
+        monkeypatch.setattr(retention_module.stats_service, "archive", failing_archive)
+        service = RetentionService(
+            response_days=0, archive_days=1, archive_dir=str(tmp_path / "archive"), batch_size=10, pause_seconds=0
+        )
+        async with sessions() as db:
+            with pytest.raises(RuntimeError):
+                await service.archive(db, datetime.now(timezone.utc) - timedelta(days=1), RetentionSummary())
+
+        async with sessions() as db:
+            remaining = await db.scalar(select(func.count()).select_from(Execution))
+        await engine.dispose()
+        assert remaining == 1
+        assert list((tmp_path / "archive").iterdir()) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import asyncio
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.models import Base, VersionMetricStats
+from backend.services.stats_service import MetricAccumulator, StatsService
+
+
+def _accumulator(*values: float) -> MetricAccumulator:
+    accumulator = MetricAccumulator()
+    for value in values:
+        accumulator.add(value)
+    return accumulator
+
+
+def test_first_insert_race_merges_into_the_winning_row(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        key = (uuid.uuid4(), "overall_score")
+
+        async with sessions() as db:
+            lookup = db.scalars
+
+            async def racing_lookup(*args, **kwargs):
+                # Another writer creates the row right after this one found none.
+                result = await lookup(*args, **kwargs)
+                if db.scalars is racing_lookup:
+                    db.scalars = lookup
+                    async with sessions() as other:
+                        await StatsService()._merge(other, VersionMetricStats, {key: _accumulator(10.0)})
+                        await other.commit()
+                return result
+
+            db.scalars = racing_lookup
+            await StatsService()._merge(db, VersionMetricStats, {key: _accumulator(20.0, 30.0)})
+            await db.commit()
+
+        async with sessions() as db:
+            row = (await db.scalars(select(VersionMetricStats))).one()
+        await engine.dispose()
+        assert row.count == 3
+        assert row.mean == 20.0
+        assert (row.min_value, row.max_value) == (10.0, 30.0)
+
+    asyncio.run(scenario())
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import signal
+
+try:
+    from backend.config import settings
+    from backend.database import engine, init_db
+    from backend.services.evaluation_service import evaluation_service
+    from backend.services.job_service import job_worker
+    from backend.services.llm_service import llm_service
+    from backend.services.pipeline_service import execution_pipeline
+except ModuleNotFoundError as exc:
+    if exc.name != "backend":
+        raise
+    from config import settings
+    from database import engine, init_db
+    from services.evaluation_service import evaluation_service
+    from services.job_service import job_worker
+    from services.llm_service import llm_service
+    from services.pipeline_service import execution_pipeline
+
+logger = logging.getLogger("backend.worker")
+
+
+# Standalone job worker: run with JOB_WORKERS_ENABLED=false on the API processes and
+# `python -m backend.worker` on as many worker hosts as needed.
+async def run() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    if settings.db_create_schema_on_startup:
+        await init_db()
+    await evaluation_service.warm_cache()
+    await execution_pipeline.start()
+    await job_worker.start()
+    try:
+        await stop.wait()
+    finally:
+        await job_worker.stop()
+        await execution_pipeline.stop()
+        await llm_service.aclose()
+        await engine.dispose()
+
+
+def main() -> None:
+    logging.basicConfig(level=getattr(logging, settings.log_level.upper(), logging.INFO))
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()